@@ -0,0 +1,34 @@
+"""
+Migration script to add the prompt variant and report attempt fields to the quiz_responses table.
+"""
+
+import asyncio
+import aiosqlite
+from hospital_quiz_bot.config.settings import settings
+
+# Columns to add, with their SQL types
+variant_columns = {
+    "prompt_variant": "VARCHAR",
+    "report_attempts": "INTEGER",
+}
+
+async def run_migration():
+    """Run the migration to add the prompt variant fields."""
+    # Connect to the database
+    db_path = settings.database.url.replace("sqlite:///", "")
+    async with aiosqlite.connect(db_path) as db:
+        # Add each column to quiz_responses table
+        for column, column_type in variant_columns.items():
+            try:
+                await db.execute(f"ALTER TABLE quiz_responses ADD COLUMN {column} {column_type};")
+                print(f"Added {column} column to quiz_responses table")
+            except Exception as e:
+                print(f"Error adding {column} column to quiz_responses table: {e}")
+                # Continue with the other columns if this one fails
+
+        # Commit the changes
+        await db.commit()
+        print("Migration completed successfully")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
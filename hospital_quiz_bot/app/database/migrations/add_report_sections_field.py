@@ -0,0 +1,32 @@
+"""
+Migration script to add the report sections field to the quiz_responses table.
+"""
+
+import asyncio
+import aiosqlite
+from hospital_quiz_bot.config.settings import settings
+
+# SQL statement for adding the column
+add_report_sections_to_quiz_responses = """
+ALTER TABLE quiz_responses
+ADD COLUMN report_sections JSON;
+"""
+
+async def run_migration():
+    """Run the migration to add the report sections field."""
+    # Connect to the database
+    db_path = settings.database.url.replace("sqlite:///", "")
+    async with aiosqlite.connect(db_path) as db:
+        # Add report_sections column to quiz_responses table
+        try:
+            await db.execute(add_report_sections_to_quiz_responses)
+            print("Added report_sections column to quiz_responses table")
+        except Exception as e:
+            print(f"Error adding report_sections column to quiz_responses table: {e}")
+
+        # Commit the changes
+        await db.commit()
+        print("Migration completed successfully")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -3,19 +3,24 @@ Repository module for the Hospital Quiz Bot.
 This module provides repository classes for data access patterns.
 """
 
-from typing import List, Optional, TypeVar, Generic, Type, Any, Dict
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, TypeVar, Generic, Type, Any, Dict
 
-from sqlalchemy import select, update, delete
+from sqlalchemy import func, or_, select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from hospital_quiz_bot.app.models.base import BaseModel
 from hospital_quiz_bot.app.models.user import User
 from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.models.report_cache import ReportCacheEntry
 from hospital_quiz_bot.config.logging_config import logger
 
 # Generic type for model classes
 T = TypeVar("T", bound=BaseModel)
 
+# Fields of the usage totals of reports
+USAGE_FIELDS = ("reports", "prompt_tokens", "completion_tokens", "cached_tokens", "cost")
+
 
 class BaseRepository(Generic[T]):
     """Base repository class for data access patterns."""
@@ -42,6 +47,12 @@ class BaseRepository(Generic[T]):
         await self.session.flush()
         return entity
     
+    async def add_all(self, entities: List[T]) -> List[T]:
+        """Add new entities, inserted in bulk."""
+        self.session.add_all(entities)
+        await self.session.flush()
+        return entities
+    
     async def update(self, entity: T) -> T:
         """Update an existing entity."""
         self.session.add(entity)
@@ -121,8 +132,167 @@ class QuizResponseRepository(BaseRepository[QuizResponse]):
         ).order_by(QuizResponse.created_at.desc())
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
+    
+    async def stream_completed(
+        self,
+        after_id: int = 0,
+        language: Optional[str] = None,
+        batch_size: int = 100,
+    ) -> AsyncIterator[QuizResponse]:
+        """Stream completed quiz responses in ID order.
+        
+        Uses a server-side cursor. On SQLite an open cursor would lock out concurrent
+        writers, so rows are read in short keyset-paginated queries instead.
+        """
+        def page_stmt(last_id: int):
+            stmt = select(QuizResponse).where(
+                QuizResponse.is_complete == True,
+                QuizResponse.id > last_id,
+            ).order_by(QuizResponse.id)
+            if language:
+                stmt = stmt.where(QuizResponse.language == language)
+            return stmt
+        
+        if self.session.bind.dialect.name != "sqlite":
+            result = await self.session.stream_scalars(
+                page_stmt(after_id).execution_options(yield_per=batch_size)
+            )
+            async for quiz_response in result:
+                yield quiz_response
+            return
+        
+        last_id = after_id
+        while True:
+            result = await self.session.execute(page_stmt(last_id).limit(batch_size))
+            page = list(result.scalars().all())
+            # End the read transaction before handing the rows out
+            await self.session.commit()
+            for quiz_response in page:
+                yield quiz_response
+            if len(page) < batch_size:
+                return
+            last_id = page[-1].id
+    
+    async def update_report(
+        self,
+        quiz_response_id: int,
+        report: str,
+        report_model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached_tokens: Optional[int] = None,
+        cost: Optional[float] = None,
+        latency_ms: Optional[float] = None,
+    ) -> None:
+        """Replace the report of a quiz response with a free-text report, along with the usage of writing it.
         
-    async def create_new(self, user_id: int, session_id: str, language: str = "uk") -> Optional[QuizResponse]:
+        The usage is dated now, so the spending of a regeneration counts towards today's totals and budgets.
+        """
+        stmt = update(QuizResponse).where(
+            QuizResponse.id == quiz_response_id
+        ).values(
+            report=report,
+            report_model=report_model,
+            report_sections=None,
+            prompt_variant=None,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            report_cost=cost,
+            report_latency_ms=latency_ms,
+            report_started_at=datetime.utcnow(),
+        )
+        await self.session.execute(stmt)
+        
+    async def claim_report(self, quiz_response_id: int, ttl: float) -> bool:
+        """Mark the report of a quiz response as being generated, unless it exists or another claim is younger than ttl seconds.
+        
+        The check and the update are one statement, so only one of several processes sharing the database wins.
+        """
+        now = datetime.utcnow()
+        stmt = update(QuizResponse).where(
+            QuizResponse.id == quiz_response_id,
+            QuizResponse.report.is_(None),
+            or_(
+                QuizResponse.report_started_at.is_(None),
+                QuizResponse.report_started_at < now - timedelta(seconds=ttl),
+            ),
+        ).values(report_started_at=now, report_attempts=func.coalesce(QuizResponse.report_attempts, 0) + 1)
+        result = await self.session.execute(stmt)
+        return result.rowcount == 1
+    
+    async def release_report_claim(self, quiz_response_id: int) -> None:
+        """Drop the claim on a report that was not generated, so it can be generated again."""
+        stmt = update(QuizResponse).where(
+            QuizResponse.id == quiz_response_id,
+            QuizResponse.report.is_(None),
+        ).values(report_started_at=None)
+        await self.session.execute(stmt)
+    
+    @staticmethod
+    def _usage_columns() -> List[Any]:
+        """Get the aggregate columns of the usage totals, in the order of USAGE_FIELDS."""
+        return [
+            func.count(QuizResponse.report_cost),
+            func.coalesce(func.sum(QuizResponse.prompt_tokens), 0),
+            func.coalesce(func.sum(QuizResponse.completion_tokens), 0),
+            func.coalesce(func.sum(QuizResponse.cached_tokens), 0),
+            func.coalesce(func.sum(QuizResponse.report_cost), 0.0),
+        ]
+    
+    def _usage_statement(self, *columns: Any, since: Optional[datetime] = None, user_id: Optional[int] = None):
+        """Build a query over the reports with recorded usage, generated since a time and by a user if given."""
+        stmt = select(*columns, *self._usage_columns()).where(QuizResponse.report_cost.isnot(None))
+        if since is not None:
+            stmt = stmt.where(QuizResponse.report_started_at >= since)
+        if user_id is not None:
+            stmt = stmt.where(QuizResponse.user_id == user_id)
+        return stmt
+    
+    async def get_usage_totals(self, since: Optional[datetime] = None, user_id: Optional[int] = None) -> Dict[str, float]:
+        """Get the number, tokens and cost of the reports generated since a time, by a user if given."""
+        result = await self.session.execute(self._usage_statement(since=since, user_id=user_id))
+        return dict(zip(USAGE_FIELDS, result.one()))
+    
+    async def get_usage_by_day(self, since: datetime) -> List[Dict[str, Any]]:
+        """Get the usage totals per day (UTC) since a time, most recent day first."""
+        day = func.date(QuizResponse.report_started_at)
+        stmt = self._usage_statement(day, since=since).group_by(day).order_by(day.desc())
+        result = await self.session.execute(stmt)
+        return [{"day": row[0], **dict(zip(USAGE_FIELDS, row[1:]))} for row in result.all()]
+    
+    async def get_usage_by_user(self, since: datetime, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the usage totals of the users with the highest cost since a time."""
+        cost = func.sum(QuizResponse.report_cost)
+        stmt = self._usage_statement(QuizResponse.user_id, since=since).group_by(QuizResponse.user_id)
+        result = await self.session.execute(stmt.order_by(cost.desc()).limit(limit))
+        return [{"user_id": row[0], **dict(zip(USAGE_FIELDS, row[1:]))} for row in result.all()]
+    
+    async def get_variant_reports(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get the reports written by prompt variants since a time, with their usage, length and generation attempts."""
+        stmt = select(
+            QuizResponse.prompt_variant,
+            QuizResponse.language,
+            func.length(QuizResponse.report),
+            QuizResponse.report_attempts,
+            QuizResponse.report_latency_ms,
+            QuizResponse.prompt_tokens,
+            QuizResponse.completion_tokens,
+            QuizResponse.report_cost,
+        ).where(QuizResponse.prompt_variant.isnot(None), QuizResponse.report.isnot(None))
+        if since is not None:
+            stmt = stmt.where(QuizResponse.report_started_at >= since)
+        result = await self.session.execute(stmt)
+        fields = ("variant", "language", "length", "attempts", "latency_ms", "prompt_tokens", "completion_tokens", "cost")
+        return [dict(zip(fields, row)) for row in result.all()]
+    
+    async def create_new(
+        self,
+        user_id: int,
+        session_id: str,
+        language: str = "uk",
+        quiz_version: Optional[str] = None,
+    ) -> Optional[QuizResponse]:
         """Create a new quiz response record."""
         quiz_response = QuizResponse(
             user_id=user_id,
@@ -130,10 +300,41 @@ class QuizResponseRepository(BaseRepository[QuizResponse]):
             responses={},
             is_complete=False,
             language=language,
+            quiz_version=quiz_version,
         )
         
         try:
             return await self.add(quiz_response)
         except Exception as e:
             logger.error(f"Failed to create quiz response: {str(e)}")
-            return None 
\ No newline at end of file
+            return None 
+
+
+class ReportCacheRepository(BaseRepository[ReportCacheEntry]):
+    """Repository for ReportCacheEntry entities."""
+    
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, ReportCacheEntry)
+    
+    async def get_by_key(self, cache_key: str) -> Optional[ReportCacheEntry]:
+        """Get a cache entry by its key."""
+        stmt = select(ReportCacheEntry).where(ReportCacheEntry.cache_key == cache_key)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def record_hit(self, cache_key: str) -> None:
+        """Increment the hit counter of a cache entry."""
+        stmt = update(ReportCacheEntry).where(
+            ReportCacheEntry.cache_key == cache_key
+        ).values(hits=ReportCacheEntry.hits + 1)
+        await self.session.execute(stmt)
+    
+    async def upsert(self, cache_key: str, language: str, report: str) -> None:
+        """Store a report under a cache key, replacing any previous entry."""
+        entry = await self.get_by_key(cache_key)
+        if entry:
+            entry.report = report
+            entry.language = language
+        else:
+            entry = ReportCacheEntry(cache_key=cache_key, language=language, report=report)
+        await self.update(entry)
@@ -0,0 +1,161 @@
+"""
+Admin handlers for the Hospital Quiz Bot.
+This module provides handlers for commands available only to the admin user.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Set
+
+from aiogram import F, Router
+from aiogram.types import BufferedInputFile, Message
+from aiogram.utils.markdown import hcode
+from aiogram.filters import Command
+
+from hospital_quiz_bot.app.database.repository import UserRepository
+from hospital_quiz_bot.app.services.experiments import ExperimentService
+from hospital_quiz_bot.app.services.intake_service import LANGUAGES, IntakeError, IntakeService, is_intake_file
+from hospital_quiz_bot.app.services.model_router import model_router
+from hospital_quiz_bot.app.services.openai_service import get_prompt_cache_stats
+from hospital_quiz_bot.app.services.quiz_service import quiz_registry
+from hospital_quiz_bot.app.services.report_cache import report_cache
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler
+from hospital_quiz_bot.app.services.report_speculator import report_speculator
+from hospital_quiz_bot.app.services.usage_service import UsageService
+from hospital_quiz_bot.app.utils.formatters import (
+    format_experiments_message,
+    format_file_not_accepted_message,
+    format_intake_file_rejected_message,
+    format_intake_progress,
+    format_intake_summary,
+    format_stats_message,
+    format_usage_message,
+)
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+# Create a router for admin handlers
+router = Router()
+
+# Running intakes; the event loop only keeps weak references to tasks
+_intake_tasks: Set[asyncio.Task] = set()
+
+
+def is_admin(user_id: int) -> bool:
+    """Check whether a Telegram user is the configured admin."""
+    return settings.telegram.admin_user_id is not None and user_id == settings.telegram.admin_user_id
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Handle the /stats command."""
+    if not is_admin(message.from_user.id):
+        return
+    
+    stats = report_scheduler.get_stats()
+    stats.update(report_cache.get_stats())
+    stats.update(model_router.get_stats())
+    stats.update(get_prompt_cache_stats())
+    stats.update(report_speculator.get_stats())
+    stats.update(quiz_registry.get_stats())
+    stats.update(metrics.snapshot())
+    
+    await message.answer(format_stats_message(stats))
+    
+    logger.info(f"Admin {message.from_user.id} requested stats")
+
+
+@router.message(Command("usage"))
+async def cmd_usage(message: Message, session_pool):
+    """Handle the /usage command."""
+    if not is_admin(message.from_user.id):
+        return
+    
+    async with session_pool() as session:
+        summary = await UsageService(session).get_summary()
+    
+    await message.answer(format_usage_message(summary))
+    
+    logger.info(f"Admin {message.from_user.id} requested usage")
+
+
+@router.message(Command("experiments"))
+async def cmd_experiments(message: Message, session_pool):
+    """Handle the /experiments command."""
+    if not is_admin(message.from_user.id):
+        return
+    
+    days = 7
+    async with session_pool() as session:
+        comparison = await ExperimentService(session).compare(days)
+    
+    await message.answer(format_experiments_message(comparison, settings.report.prompt_variants, days))
+    
+    logger.info(f"Admin {message.from_user.id} requested prompt experiments")
+
+
+@router.message(F.document)
+async def handle_intake_file(message: Message, session_pool):
+    """Handle a CSV or XLSX file of exams uploaded for bulk intake.
+    
+    A caption naming a language (uk or de) sets the language of rows without a language column.
+    The reports are generated in the background, so the admin's other updates are handled meanwhile.
+    Other users are told that files are not accepted.
+    """
+    if not is_admin(message.from_user.id):
+        language = "uk"
+        async with session_pool() as session:
+            user = await UserRepository(session).get_by_telegram_id(message.from_user.id)
+            if user and user.language:
+                language = user.language
+        await message.answer(format_file_not_accepted_message(language))
+        return
+    
+    if not is_intake_file(message.document.file_name):
+        await message.answer(format_intake_file_rejected_message())
+        return
+    
+    caption = (message.caption or "").strip().lower()
+    language = caption if caption in LANGUAGES else "uk"
+    file = await message.bot.download(message.document)
+    status_message = await message.answer(format_intake_progress(0, 0))
+    
+    logger.info(f"Admin {message.from_user.id} uploaded intake file {message.document.file_name}")
+    task = asyncio.create_task(
+        run_intake(message, status_message, file.read(), language, session_pool),
+        name=f"intake-{message.message_id}",
+    )
+    _intake_tasks.add(task)
+    task.add_done_callback(_intake_tasks.discard)
+
+
+async def run_intake(message: Message, status_message: Message, content: bytes, language: str, session_pool) -> None:
+    """Run a bulk intake, showing its progress, and send the results file when it is done."""
+    last_edit = 0.0
+    
+    async def on_progress(done: int, total: int) -> None:
+        nonlocal last_edit
+        # Edits are throttled like streamed reports, since Telegram rate-limits them
+        if done < total and time.monotonic() - last_edit < settings.report.stream_edit_interval:
+            return
+        last_edit = time.monotonic()
+        await status_message.edit_text(format_intake_progress(done, total))
+    
+    try:
+        result = await IntakeService(session_pool).run(
+            message.document.file_name, content, message.from_user.id, language, on_progress
+        )
+    except IntakeError as e:
+        await status_message.edit_text(f"❌ {hcode(str(e))}")
+        return
+    except Exception as e:
+        # Nobody awaits the task, so the error would otherwise go unnoticed
+        logger.error(f"Intake of {message.document.file_name} failed: {str(e)}")
+        metrics.increment("intake_errors")
+        await status_message.edit_text(f"❌ Intake failed: {hcode(type(e).__name__)}")
+        return
+    
+    filename = f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    await message.answer_document(BufferedInputFile(result.to_csv(), filename=filename), caption=format_intake_summary(result))
@@ -9,6 +9,9 @@ from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 
 from hospital_quiz_bot.app.database.repository import UserRepository
+from hospital_quiz_bot.app.services.quiz_service import quiz_registry
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler
+from hospital_quiz_bot.app.services.report_speculator import report_speculator
 from hospital_quiz_bot.app.utils.formatters import format_welcome_message, format_help_message
 from hospital_quiz_bot.app.keyboards.reply import get_main_keyboard, remove_keyboard, get_language_keyboard
 from hospital_quiz_bot.app.states.quiz_states import UserStates
@@ -140,6 +143,12 @@ async def cmd_cancel(message: Message, state: FSMContext, session_pool):
         )
         return
     
+    # Drop a report that was being generated ahead of confirmation, or abort one being generated
+    data = await state.get_data()
+    report_speculator.discard(data.get("session_id"), "cancelled")
+    report_scheduler.cancel(data.get("session_id"), "cancelled")
+    quiz_registry.release(data.get("session_id"))
+    
     # Cancel the state
     await state.clear()
     
@@ -6,30 +6,37 @@ This module provides handlers for the quiz conversation flow.
 import uuid
 from typing import Dict, Any, Optional, Union, List
 
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.types import Message, CallbackQuery, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from hospital_quiz_bot.app.database.repository import UserRepository, QuizResponseRepository
 from hospital_quiz_bot.app.models.quiz_response import QuizResponse
-from hospital_quiz_bot.app.services.quiz_service import QuizService
+from hospital_quiz_bot.app.services.quiz_service import QuizCatalog, create_new_session, get_catalog, quiz_registry
 from hospital_quiz_bot.app.services.report_service import ReportService
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler, QueueFullError
+from hospital_quiz_bot.app.services.report_speculator import report_speculator
 from hospital_quiz_bot.app.utils.formatters import (
     format_quiz_start_message,
-    format_question,
     format_quiz_confirmation_message,
     format_report_generation_message,
+    format_report_queued_message,
+    format_report_queue_full_message,
     format_report_message,
+    format_template_preview_message,
 )
+from hospital_quiz_bot.app.keyboards.screens import get_question_screen
 from hospital_quiz_bot.app.keyboards.reply import (
-    get_quiz_options_keyboard,
     get_confirmation_keyboard,
     get_cancel_keyboard,
     get_report_actions_keyboard,
     get_main_keyboard,
 )
 from hospital_quiz_bot.app.states.quiz_states import QuizStates
+from hospital_quiz_bot.app.utils.message_streamer import MessageStreamer
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
 from hospital_quiz_bot.config.logging_config import logger
 
 # Create a router for quiz handlers
@@ -48,17 +55,24 @@ async def cmd_quiz(message: Message, state: FSMContext, session_pool):
         if user and user.language:
             language = user.language
     
-    # Create a new quiz session
-    quiz_service = QuizService(language)
-    quiz_service.set_language(language)
-    session_id = quiz_service.create_new_session()
+    # Drop a report that was being generated for the previous quiz
+    data = await state.get_data()
+    report_speculator.discard(data.get("session_id"), "restarted")
+    report_scheduler.cancel(data.get("session_id"), "restarted")
+    quiz_registry.release(data.get("session_id"))
+    
+    # Create a new quiz session on the current version of the questions, kept until the quiz ends
+    catalog = get_catalog(language)
+    session_id = create_new_session()
+    quiz_registry.pin(session_id, catalog.version)
     
     # Store the session ID in FSM state
     await state.update_data(
         session_id=session_id,
         current_question_index=0,
-        current_question_id=quiz_service.get_question_by_index(0)["id"],
+        current_question_id=catalog.get_question_by_index(0)["id"],
         language=language,  # Store the language preference
+        quiz_version=catalog.version,
     )
     
     # Create a new quiz response record
@@ -70,6 +84,7 @@ async def cmd_quiz(message: Message, state: FSMContext, session_pool):
             user_id=message.from_user.id,
             session_id=session_id,
             language=language,  # Set the language for the quiz response
+            quiz_version=catalog.version,
         )
         
         if not quiz_response:
@@ -89,31 +104,9 @@ async def cmd_quiz(message: Message, state: FSMContext, session_pool):
     # Move to the answering state
     await state.set_state(QuizStates.answering)
     
-    # Get the first question
-    first_question = quiz_service.get_question_by_index(0)
-    question_text = quiz_service.format_question_text(first_question)
-    
-    formatted_question = format_question(
-        question_text,
-        0,
-        quiz_service.get_total_questions(),
-        language,
-    )
-    
-    # Send the first question with appropriate keyboard
-    if first_question["type"] in ["single_choice", "optional_text"]:
-        # For questions with options
-        options = first_question["options"]
-        await message.answer(
-            formatted_question,
-            reply_markup=get_quiz_options_keyboard(options, language),
-        )
-    else:
-        # For text input questions
-        await message.answer(
-            formatted_question,
-            reply_markup=get_cancel_keyboard(language),
-        )
+    # Send the first question
+    screen = get_question_screen(catalog, 0)
+    await message.answer(screen.text, reply_markup=screen.reply_markup)
     
     logger.info(f"User {message.from_user.id} started a new quiz with session ID {session_id} in language {language}")
 
@@ -128,22 +121,25 @@ async def process_answer(message: Message, state: FSMContext, session_pool):
     current_question_id = data.get("current_question_id")
     language = data.get("language", "uk")  # Get the language from state
     
-    # Initialize quiz service with language
-    quiz_service = QuizService(language)
-    # Ensure the language is set
-    quiz_service.set_language(language)
+    # Get the questions of the session language and version
+    catalog = get_catalog(language, data.get("quiz_version"))
     
     # Get the current question
-    current_question = quiz_service.get_question_by_id(current_question_id)
+    current_question = catalog.get_question_by_id(current_question_id)
     
     # Check if the answer is valid
-    if not quiz_service.is_valid_answer(current_question_id, message.text):
+    if not catalog.is_valid_answer(current_question_id, message.text):
         # Special case for navigation commands
         if message.text == "⬅️ Назад" or message.text == "⬅️ Zurück":
-            # Go back to the previous question
-            if current_question_index > 0:
-                new_index = current_question_index - 1
-                new_question = quiz_service.get_question_by_index(new_index)
+            # Go back to the previous question asked, which depends on the answers so far
+            async with session_pool() as session:
+                quiz_repo = QuizResponseRepository(session)
+                quiz_response = await quiz_repo.get_by_session_id(session_id)
+                responses = quiz_response.get_all_responses() if quiz_response else {}
+            
+            new_index = catalog.get_previous_index(current_question_index, responses)
+            if new_index is not None:
+                new_question = catalog.get_question_by_index(new_index)
                 
                 await state.update_data(
                     current_question_index=new_index,
@@ -151,27 +147,8 @@ async def process_answer(message: Message, state: FSMContext, session_pool):
                 )
                 
                 # Send the previous question
-                question_text = quiz_service.format_question_text(new_question)
-                formatted_question = format_question(
-                    question_text,
-                    new_index,
-                    quiz_service.get_total_questions(),
-                    language,
-                )
-                
-                if new_question["type"] in ["single_choice", "optional_text"]:
-                    # For questions with options
-                    options = new_question["options"]
-                    await message.answer(
-                        formatted_question,
-                        reply_markup=get_quiz_options_keyboard(options, language),
-                    )
-                else:
-                    # For text input questions
-                    await message.answer(
-                        formatted_question,
-                        reply_markup=get_cancel_keyboard(language),
-                    )
+                screen = get_question_screen(catalog, new_index)
+                await message.answer(screen.text, reply_markup=screen.reply_markup)
                 
                 return
             else:
@@ -211,6 +188,9 @@ async def process_answer(message: Message, state: FSMContext, session_pool):
             return
         
         quiz_response.set_response(current_question_id, message.text)
+        # A changed answer can skip questions answered before; their answers must not reach the report
+        responses = catalog.get_asked_responses(quiz_response.get_all_responses())
+        quiz_response.responses = responses
         await quiz_repo.update(quiz_response)
         await quiz_repo.commit()
     
@@ -233,12 +213,12 @@ async def process_answer(message: Message, state: FSMContext, session_pool):
         )
         return
     
-    # Move to the next question or confirmation
-    next_index = current_question_index + 1
+    # Move to the next question asked or confirmation
+    next_index = catalog.get_next_index(current_question_index, responses)
     
-    if next_index < quiz_service.get_total_questions():
+    if next_index is not None:
         # There are more questions
-        next_question = quiz_service.get_question_by_index(next_index)
+        next_question = catalog.get_question_by_index(next_index)
         
         await state.update_data(
             current_question_index=next_index,
@@ -246,48 +226,11 @@ async def process_answer(message: Message, state: FSMContext, session_pool):
         )
         
         # Send the next question
-        question_text = quiz_service.format_question_text(next_question)
-        formatted_question = format_question(
-            question_text,
-            next_index,
-            quiz_service.get_total_questions(),
-            language,
-        )
-        
-        if next_question["type"] in ["single_choice", "optional_text"]:
-            # For questions with options
-            options = next_question["options"]
-            await message.answer(
-                formatted_question,
-                reply_markup=get_quiz_options_keyboard(options, language),
-            )
-        else:
-            # For text input questions
-            await message.answer(
-                formatted_question,
-                reply_markup=get_cancel_keyboard(language),
-            )
+        screen = get_question_screen(catalog, next_index)
+        await message.answer(screen.text, reply_markup=screen.reply_markup)
     else:
         # No more questions, move to confirmation
-        await state.set_state(QuizStates.confirmation)
-        
-        # Get all responses
-        async with session_pool() as session:
-            quiz_repo = QuizResponseRepository(session)
-            quiz_response = await quiz_repo.get_by_session_id(session_id)
-            responses = quiz_response.get_all_responses()
-        
-        # Format the confirmation message
-        confirmation_message = format_quiz_confirmation_message(
-            responses,
-            quiz_service.get_all_questions(),
-            language,
-        )
-        
-        await message.answer(
-            confirmation_message,
-            reply_markup=get_confirmation_keyboard(language),
-        )
+        await show_confirmation(message, state, session_pool, session_id, catalog, responses)
 
 
 @router.message(QuizStates.text_input, F.text)
@@ -334,6 +277,7 @@ async def process_text_input(message: Message, state: FSMContext, session_pool):
         
         # Update the response with the additional text
         quiz_response.set_response(current_question_id, message.text)
+        responses = quiz_response.get_all_responses()
         await quiz_repo.update(quiz_response)
         await quiz_repo.commit()
     
@@ -345,17 +289,16 @@ async def process_text_input(message: Message, state: FSMContext, session_pool):
     # Continue to the next question
     await state.set_state(QuizStates.answering)
     
-    # Initialize quiz service with language
-    quiz_service = QuizService(language)
-    quiz_service.set_language(language)
+    # Get the questions of the session language and version
+    catalog = get_catalog(language, data.get("quiz_version"))
     
-    # Get the current index and move to the next question
+    # Get the current index and move to the next question asked
     current_question_index = data.get("current_question_index", 0)
-    next_index = current_question_index + 1
+    next_index = catalog.get_next_index(current_question_index, responses)
     
-    if next_index < quiz_service.get_total_questions():
+    if next_index is not None:
         # There are more questions
-        next_question = quiz_service.get_question_by_index(next_index)
+        next_question = catalog.get_question_by_index(next_index)
         
         await state.update_data(
             current_question_index=next_index,
@@ -363,53 +306,53 @@ async def process_text_input(message: Message, state: FSMContext, session_pool):
         )
         
         # Send the next question
-        question_text = quiz_service.format_question_text(next_question)
-        formatted_question = format_question(
-            question_text,
-            next_index,
-            quiz_service.get_total_questions(),
-            language,
-        )
-        
-        if next_question["type"] in ["single_choice", "optional_text"]:
-            # For questions with options
-            options = next_question["options"]
-            await message.answer(
-                formatted_question,
-                reply_markup=get_quiz_options_keyboard(options, language),
-            )
-        else:
-            # For text input questions
-            await message.answer(
-                formatted_question,
-                reply_markup=get_cancel_keyboard(language),
-            )
+        screen = get_question_screen(catalog, next_index)
+        await message.answer(screen.text, reply_markup=screen.reply_markup)
     else:
         # No more questions, move to confirmation
-        await state.set_state(QuizStates.confirmation)
-        
-        # Get all responses
-        async with session_pool() as session:
-            quiz_repo = QuizResponseRepository(session)
-            quiz_response = await quiz_repo.get_by_session_id(session_id)
-            responses = quiz_response.get_all_responses()
-        
-        # Format the confirmation message
-        confirmation_message = format_quiz_confirmation_message(
-            responses,
-            quiz_service.get_all_questions(),
-            language,
-        )
-        
-        await message.answer(
-            confirmation_message,
-            reply_markup=get_confirmation_keyboard(language),
-        )
+        await show_confirmation(message, state, session_pool, session_id, catalog, responses)
+
+
+async def show_confirmation(
+    message: Message,
+    state: FSMContext,
+    session_pool,
+    session_id: str,
+    catalog: QuizCatalog,
+    responses: Dict[str, str],
+) -> None:
+    """Show the summary of the answers to the questions asked and start the report."""
+    await state.set_state(QuizStates.confirmation)
+    
+    # Format the confirmation message; skipped questions are left out of the summary
+    confirmation_message = format_quiz_confirmation_message(
+        catalog.get_asked_responses(responses),
+        catalog.get_all_questions(),
+        catalog.language,
+    )
+    
+    await message.answer(
+        confirmation_message,
+        reply_markup=get_confirmation_keyboard(catalog.language),
+    )
+    
+    # The answers are final unless the user goes back, so the report can start now
+    await start_speculative_report(session_pool, session_id, catalog.language)
+
+
+async def start_speculative_report(session_pool, session_id: str, language: str) -> None:
+    """Start generating the report while the summary is reviewed, if speculation is enabled."""
+    if not report_speculator.can_start():
+        return
+    
+    async with session_pool() as session:
+        report_service = ReportService(session, language=language)
+        await report_service.speculate_report_for_session(session_id)
 
 
 @router.message(QuizStates.confirmation, F.text.in_(["✅ Так, завершити", "✅ Ja, abschließen"]))
 async def confirm_quiz(message: Message, state: FSMContext, session_pool):
-    """Handle quiz confirmation and generate report."""
+    """Handle quiz confirmation and queue report generation."""
     # Get the state data
     data = await state.get_data()
     session_id = data.get("session_id")
@@ -437,33 +380,128 @@ async def confirm_quiz(message: Message, state: FSMContext, session_pool):
         quiz_response.set_completed()
         await quiz_repo.update(quiz_response)
         await quiz_repo.commit()
+        
+        # Questions asked against the full list, i.e. the messages the skip logic saved
+        catalog = get_catalog(language, data.get("quiz_version"))
+        questions_asked = len(catalog.get_asked_responses(quiz_response.get_all_responses()))
+        metrics.observe("quiz_questions_asked", questions_asked)
+        metrics.increment("quiz_questions_skipped", catalog.get_total_questions() - questions_asked)
+        
+        # Serve a template report right away if the LLM is down or overloaded
+        template_reason = ReportService.get_template_reason()
+        preview = None
+        if not template_reason and settings.report.template_preview:
+            preview = ReportService(session, language=language).render_template_report(quiz_response)
     
     # Move to the report generation state
     await state.set_state(QuizStates.generating_report)
     
-    # Send the generating message
-    await message.answer(
+    if preview:
+        await message.answer(format_template_preview_message(preview, language), parse_mode=None)
+    
+    # Send the generating message; streamed reports are shown by editing it
+    placeholder = await message.answer(
         format_report_generation_message(language),
         reply_markup=get_cancel_keyboard(language),
     )
     
-    # Generate the report
+    if template_reason:
+        # Template reports are never rejected, so the answers are final; the report reads the version of its
+        # questions from the quiz response
+        quiz_registry.release(session_id)
+        await deliver_report(
+            message.bot,
+            message.chat.id,
+            state,
+            session_pool,
+            session_id,
+            language,
+            placeholder_message_id=placeholder.message_id,
+            template_reason=template_reason,
+        )
+        return
+    
+    # A repeated confirmation, e.g. a double tap, must not queue the report twice
+    if report_scheduler.is_active(session_id):
+        metrics.increment("report_queue_duplicates")
+        logger.info(f"Report for session {session_id} is already queued, ignoring repeated confirmation")
+        await placeholder.delete()
+        return
+    
+    # Queue the report; it is pushed to the chat once it is ready
+    must_wait = not report_scheduler.has_capacity()
+    try:
+        position = report_scheduler.submit(
+            user_id=message.from_user.id,
+            key=session_id,
+            factory=lambda: deliver_report(
+                message.bot,
+                message.chat.id,
+                state,
+                session_pool,
+                session_id,
+                language,
+                placeholder_message_id=placeholder.message_id,
+            ),
+            on_timeout=lambda: send_report_error(message.bot, message.chat.id, state, language),
+        )
+    except QueueFullError:
+        logger.warning(f"Report queue full, rejected session {session_id}")
+        await state.set_state(QuizStates.confirmation)
+        await message.answer(
+            format_report_queue_full_message(language),
+            reply_markup=get_confirmation_keyboard(language),
+        )
+        return
+    
+    # Only now are the answers final: a rejected confirmation goes back to the summary with the same version
+    quiz_registry.release(session_id)
+    
+    if must_wait:
+        await message.answer(format_report_queued_message(position + 1, language))
+    
+    logger.info(f"Queued report for user {message.from_user.id}, session {session_id}")
+
+
+async def deliver_report(
+    bot: Bot,
+    chat_id: int,
+    state: FSMContext,
+    session_pool,
+    session_id: str,
+    language: str,
+    placeholder_message_id: Optional[int] = None,
+    template_reason: Optional[str] = None,
+) -> None:
+    """Generate a report and push it to the chat."""
+    streamer = None
+    if settings.report.streaming and placeholder_message_id:
+        streamer = MessageStreamer(
+            bot,
+            chat_id,
+            placeholder_message_id,
+            min_interval=settings.report.stream_edit_interval,
+        )
+    
     async with session_pool() as session:
         report_service = ReportService(session, language=language)
-        report = await report_service.generate_report_from_session(session_id)
+        report = await report_service.generate_report_from_session(
+            session_id,
+            on_delta=streamer.push if streamer else None,
+            template_reason=template_reason,
+        )
+        if report and settings.report.structured:
+            # Structured reports are rendered from their stored sections
+            report = await report_service.get_report(session_id) or report
+    
+    # The user may have cancelled or started over while the report was generated
+    if await state.get_state() != QuizStates.generating_report.state:
+        logger.info(f"Session {session_id} left the generating state, report not pushed")
+        return
     
     if not report:
         logger.error(f"Failed to generate report for session: {session_id}")
-        
-        error_message = "Помилка: Не вдалося згенерувати звіт. Будь ласка, спробуйте ще раз."
-        if language == "de":
-            error_message = "Fehler: Bericht konnte nicht erstellt werden. Bitte versuchen Sie es erneut."
-            
-        await message.answer(
-            error_message,
-            reply_markup=get_main_keyboard(language),
-        )
-        await state.clear()
+        await send_report_error(bot, chat_id, state, language)
         return
     
     # Move to the report viewing state
@@ -472,43 +510,73 @@ async def confirm_quiz(message: Message, state: FSMContext, session_pool):
     # Format and send the report
     formatted_report = format_report_message(report, language)
     
-    if isinstance(formatted_report, list):
+    if streamer:
+        # The text is already on screen; settle it into its final form
+        await streamer.finish(formatted_report if isinstance(formatted_report, str) else None)
+        if streamer.time_to_first_text_ms is not None:
+            metrics.observe("report_first_text_ms", streamer.time_to_first_text_ms)
+    elif isinstance(formatted_report, list):
         # If the report is split into multiple messages
         for part in formatted_report:
-            await message.answer(part)
+            await bot.send_message(chat_id, part)
     else:
         # If the report is a single message
-        await message.answer(formatted_report)
+        await bot.send_message(chat_id, formatted_report)
     
     # Send the actions keyboard
     report_actions_message = "Що ви хочете зробити зі звітом?"
     if language == "de":
         report_actions_message = "Was möchten Sie mit dem Bericht tun?"
         
-    await message.answer(
+    await bot.send_message(
+        chat_id,
         report_actions_message,
         reply_markup=get_report_actions_keyboard(language),
     )
     
-    logger.info(f"Generated report for user {message.from_user.id}, session {session_id}")
+    logger.info(f"Generated report for chat {chat_id}, session {session_id}")
+
+
+async def send_report_error(bot: Bot, chat_id: int, state: FSMContext, language: str) -> None:
+    """Tell the user their report could not be generated, unless they have moved on already."""
+    if await state.get_state() != QuizStates.generating_report.state:
+        return
+    
+    error_message = "Помилка: Не вдалося згенерувати звіт. Будь ласка, спробуйте ще раз."
+    if language == "de":
+        error_message = "Fehler: Bericht konnte nicht erstellt werden. Bitte versuchen Sie es erneut."
+        
+    await bot.send_message(
+        chat_id,
+        error_message,
+        reply_markup=get_main_keyboard(language),
+    )
+    await state.clear()
 
 
 @router.message(QuizStates.confirmation, F.text.in_(["⬅️ Повернутися до питань", "⬅️ Zurück zu den Fragen"]))
-async def return_to_questions(message: Message, state: FSMContext):
+async def return_to_questions(message: Message, state: FSMContext, session_pool):
     """Handle returning to questions from confirmation."""
     # Get the state data
     data = await state.get_data()
     language = data.get("language", "uk")
     
+    # The answers may change, so the speculative report is no longer valid
+    report_speculator.discard(data.get("session_id"), "back")
+    
     # Go back to the answering state
     await state.set_state(QuizStates.answering)
     
-    # Go back to the last question
-    quiz_service = QuizService(language)
-    quiz_service.set_language(language)
+    # Go back to the last question asked
+    catalog = get_catalog(language, data.get("quiz_version"))
     
-    last_index = quiz_service.get_total_questions() - 1
-    last_question = quiz_service.get_question_by_index(last_index)
+    async with session_pool() as session:
+        quiz_repo = QuizResponseRepository(session)
+        quiz_response = await quiz_repo.get_by_session_id(data.get("session_id"))
+        responses = quiz_response.get_all_responses() if quiz_response else {}
+    
+    last_index = catalog.get_previous_index(catalog.get_total_questions(), responses)
+    last_question = catalog.get_question_by_index(last_index)
     
     await state.update_data(
         current_question_index=last_index,
@@ -516,26 +584,7 @@ async def return_to_questions(message: Message, state: FSMContext):
     )
     
     # Send the last question again
-    question_text = quiz_service.format_question_text(last_question)
-    formatted_question = format_question(
-        question_text,
-        last_index,
-        quiz_service.get_total_questions(),
-        language,
-    )
-    
-    if last_question["type"] in ["single_choice", "optional_text"]:
-        # For questions with options
-        options = last_question["options"]
-        await message.answer(
-            formatted_question,
-            reply_markup=get_quiz_options_keyboard(options, language),
-        )
-    else:
-        # For text input questions
-        await message.answer(
-            formatted_question,
-            reply_markup=get_cancel_keyboard(language),
-        )
+    screen = get_question_screen(catalog, last_index)
+    await message.answer(screen.text, reply_markup=screen.reply_markup)
     
     logger.info(f"User {message.from_user.id} returned to questions from confirmation") 
\ No newline at end of file
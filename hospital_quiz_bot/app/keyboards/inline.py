@@ -1,19 +1,23 @@
 """
 Inline keyboard layouts for the Hospital Quiz Bot.
 This module provides functions for creating inline keyboard markups.
+
+The fixed keyboards and the pagination rows are built once and shared, so callers must not modify them.
 """
 
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
-def get_pagination_keyboard(
+@lru_cache(maxsize=256)
+def get_pagination_row(
     current_page: int,
     total_pages: int,
     prefix: str = "page"
-) -> InlineKeyboardMarkup:
-    """Get a pagination keyboard for navigating through pages."""
+) -> Tuple[InlineKeyboardButton, ...]:
+    """Get the row of buttons for navigating through pages."""
     buttons = []
     
     # Previous page button
@@ -36,7 +40,30 @@ def get_pagination_keyboard(
             callback_data=f"{prefix}:{current_page + 1}"
         ))
     
-    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+    return tuple(buttons)
+
+
+@lru_cache(maxsize=256)
+def get_pagination_keyboard(
+    current_page: int,
+    total_pages: int,
+    prefix: str = "page"
+) -> InlineKeyboardMarkup:
+    """Get a pagination keyboard for navigating through pages."""
+    return InlineKeyboardMarkup(inline_keyboard=[list(get_pagination_row(current_page, total_pages, prefix))])
+
+
+@lru_cache(maxsize=8)
+def _get_back_button(language: str) -> InlineKeyboardButton:
+    """Get the button that leaves the list of reports."""
+    back_text = "🔙 Назад"
+    if language == "de":
+        back_text = "🔙 Zurück"
+    
+    return InlineKeyboardButton(
+        text=back_text,
+        callback_data="back"
+    )
 
 
 def get_reports_keyboard(
@@ -70,43 +97,15 @@ def get_reports_keyboard(
     # Add pagination buttons if needed
     total_pages = (len(reports) + items_per_page - 1) // items_per_page
     if total_pages > 1:
-        pagination = []
-        
-        # Previous page button
-        if page > 1:
-            pagination.append(InlineKeyboardButton(
-                text="⬅️",
-                callback_data=f"reports_page:{page - 1}"
-            ))
-        
-        # Page indicator
-        pagination.append(InlineKeyboardButton(
-            text=f"{page}/{total_pages}",
-            callback_data="noop"
-        ))
-        
-        # Next page button
-        if page < total_pages:
-            pagination.append(InlineKeyboardButton(
-                text="➡️",
-                callback_data=f"reports_page:{page + 1}"
-            ))
-        
-        buttons.append(pagination)
+        buttons.append(list(get_pagination_row(page, total_pages, "reports_page")))
     
     # Add a back button with language-specific text
-    back_text = "🔙 Назад"
-    if language == "de":
-        back_text = "🔙 Zurück"
-        
-    buttons.append([InlineKeyboardButton(
-        text=back_text,
-        callback_data="back"
-    )])
+    buttons.append([_get_back_button(language)])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=8)
 def get_report_actions_keyboard(
     language: str = "uk"
 ) -> InlineKeyboardMarkup:
@@ -1,13 +1,17 @@
 """
 Reply keyboard layouts for the Hospital Quiz Bot.
 This module provides functions for creating reply keyboard markups.
+
+The fixed keyboards are built once per language and shared, so callers must not modify them.
 """
 
-from typing import List, Optional
+from functools import lru_cache
+from typing import Sequence
 
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
 
+@lru_cache(maxsize=8)
 def get_language_keyboard() -> ReplyKeyboardMarkup:
     """Get a keyboard for language selection."""
     keyboard = [
@@ -21,6 +25,7 @@ def get_language_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=8)
 def get_main_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     """Get the main keyboard with primary commands."""
     if language == "de":
@@ -43,7 +48,7 @@ def get_main_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     )
 
 
-def get_quiz_options_keyboard(options: List[str], language: str = "uk", row_width: int = 2) -> ReplyKeyboardMarkup:
+def get_quiz_options_keyboard(options: Sequence[str], language: str = "uk", row_width: int = 2) -> ReplyKeyboardMarkup:
     """Get a keyboard with quiz options."""
     # Split options into rows based on row_width
     rows = []
@@ -74,6 +79,7 @@ def get_quiz_options_keyboard(options: List[str], language: str = "uk", row_widt
     )
 
 
+@lru_cache(maxsize=8)
 def get_confirmation_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     """Get a keyboard for confirmation."""
     if language == "de":
@@ -96,6 +102,7 @@ def get_confirmation_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=8)
 def get_cancel_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     """Get a keyboard with just a cancel button."""
     cancel_text = "❌ Скасувати"
@@ -112,6 +119,7 @@ def get_cancel_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=8)
 def get_report_actions_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     """Get a keyboard for report actions."""
     if language == "de":
@@ -134,6 +142,7 @@ def get_report_actions_keyboard(language: str = "uk") -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache(maxsize=8)
 def remove_keyboard() -> ReplyKeyboardRemove:
     """Remove the keyboard."""
     return ReplyKeyboardRemove() 
\ No newline at end of file
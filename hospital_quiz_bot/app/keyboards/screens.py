@@ -0,0 +1,79 @@
+"""
+Question screens for the Hospital Quiz Bot.
+This module builds the message of every question, its text and keyboard, once per catalog,
+so that handlers only look screens up instead of formatting them on every answer.
+"""
+
+import weakref
+from typing import NamedTuple, Tuple
+
+from aiogram.types import ReplyKeyboardMarkup
+
+from hospital_quiz_bot.app.keyboards.inline import get_report_actions_keyboard as get_inline_report_actions_keyboard
+from hospital_quiz_bot.app.keyboards.reply import (
+    get_cancel_keyboard,
+    get_confirmation_keyboard,
+    get_language_keyboard,
+    get_main_keyboard,
+    get_quiz_options_keyboard,
+    get_report_actions_keyboard,
+    remove_keyboard,
+)
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, QuizCatalog, get_catalog
+from hospital_quiz_bot.app.utils.formatters import format_question
+from hospital_quiz_bot.config.logging_config import logger
+
+# Question types answered with one of the options on the keyboard
+OPTION_QUESTION_TYPES = ("single_choice", "optional_text")
+
+
+class QuestionScreen(NamedTuple):
+    """The message sent for a question."""
+    text: str
+    reply_markup: ReplyKeyboardMarkup
+
+
+def build_question_screen(catalog: QuizCatalog, index: int) -> QuestionScreen:
+    """Format the text of a question and build its keyboard."""
+    question = catalog.questions[index]
+    text = format_question(
+        catalog.format_question_text(question),
+        index,
+        catalog.get_total_questions(),
+        catalog.language,
+    )
+    if question["type"] in OPTION_QUESTION_TYPES:
+        return QuestionScreen(text, get_quiz_options_keyboard(question["options"], catalog.language))
+    return QuestionScreen(text, get_cancel_keyboard(catalog.language))
+
+
+# Screens of each catalog; a catalog that is no longer used drops its screens with it
+_screens: "weakref.WeakKeyDictionary[QuizCatalog, Tuple[QuestionScreen, ...]]" = weakref.WeakKeyDictionary()
+
+
+def get_question_screens(catalog: QuizCatalog) -> Tuple[QuestionScreen, ...]:
+    """Get the screens of all questions of a catalog, building them on first use."""
+    screens = _screens.get(catalog)
+    if screens is None:
+        screens = tuple(build_question_screen(catalog, index) for index in range(catalog.get_total_questions()))
+        _screens[catalog] = screens
+    return screens
+
+
+def get_question_screen(catalog: QuizCatalog, index: int) -> QuestionScreen:
+    """Get the screen of a question by its index."""
+    return get_question_screens(catalog)[index]
+
+
+def warm_screens() -> None:
+    """Build the question screens and the fixed keyboards of every language before the first update."""
+    get_language_keyboard()
+    remove_keyboard()
+    for language in QUIZ_FILES:
+        screens = get_question_screens(get_catalog(language))
+        get_main_keyboard(language)
+        get_confirmation_keyboard(language)
+        get_cancel_keyboard(language)
+        get_report_actions_keyboard(language)
+        get_inline_report_actions_keyboard(language)
+        logger.info(f"Built {len(screens)} question screens for language {language}")
@@ -5,9 +5,9 @@ This module provides the QuizResponse model for storing user quiz responses.
 
 import json
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
-from sqlalchemy import Column, String, Integer, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, JSON, Boolean, DateTime, Float
 from sqlalchemy.orm import relationship
 
 from .base import BaseModel
@@ -28,12 +28,25 @@ class QuizResponse(BaseModel):
     # Report generation status
     is_complete = Column(Boolean, default=False, nullable=False)
     report = Column(Text, nullable=True)
+    report_model = Column(String, nullable=True)  # Model that wrote the report, or 'template'
+    report_sections = Column(JSON, nullable=True)  # Text of each section of structured reports
+    report_started_at = Column(DateTime, nullable=True)  # When a process claimed the report generation (UTC)
+    report_attempts = Column(Integer, nullable=True)  # Times the report generation was claimed
+    prompt_variant = Column(String, nullable=True)  # Prompt variant of a prompt experiment that wrote the report
+    
+    # Usage of the API calls that wrote the report; empty for cached and template reports
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    cached_tokens = Column(Integer, nullable=True)
+    report_cost = Column(Float, nullable=True)  # Estimated from the prices of the routes, in USD
+    report_latency_ms = Column(Float, nullable=True)
     
     # Session information
     session_id = Column(String, nullable=False, index=True)
     
     # Language information
     language = Column(String, default="uk", nullable=False)  # 'uk' for Ukrainian, 'de' for German
+    quiz_version = Column(String, nullable=True)  # Version of the quiz questions the answers were given to
     
     def __repr__(self) -> str:
         """Return a string representation of the QuizResponse."""
@@ -64,6 +77,15 @@ class QuizResponse(BaseModel):
             return json.loads(self.responses)
         return dict(self.responses) if self.responses else {}
     
+    def get_report_content(self) -> Union[Dict[str, Any], str, None]:
+        """Get the report as its sections if it was stored with them, otherwise as text."""
+        if self.report_sections:
+            sections = self.report_sections
+            if isinstance(sections, str):
+                sections = json.loads(sections)
+            return {"sections": sections}
+        return self.report
+    
     def format_for_prompt(self) -> str:
         """Format the responses for use in the OpenAI prompt."""
         formatted_responses = []
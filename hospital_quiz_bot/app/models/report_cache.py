@@ -0,0 +1,28 @@
+"""
+Report cache model for the Hospital Quiz Bot.
+This module provides the ReportCacheEntry model for persisting generated reports by content hash.
+"""
+
+from sqlalchemy import Column, String, Integer, Text
+
+from .base import BaseModel
+
+
+class ReportCacheEntry(BaseModel):
+    """ReportCacheEntry model for reusing reports generated from identical answers."""
+    
+    __tablename__ = "report_cache"
+    
+    # Hash of the answers, language, model settings and prompt template
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    
+    # Cached report
+    language = Column(String, default="uk", nullable=False)
+    report = Column(Text, nullable=False)
+    
+    # Number of times the entry has been served
+    hits = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self) -> str:
+        """Return a string representation of the ReportCacheEntry."""
+        return f"<ReportCacheEntry(id={self.id}, cache_key={self.cache_key[:12]}, hits={self.hits})>"
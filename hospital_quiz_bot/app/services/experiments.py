@@ -0,0 +1,102 @@
+"""
+Prompt experiments for the Hospital Quiz Bot.
+This module assigns sessions to report prompt variants and compares the reports each variant wrote.
+"""
+
+import hashlib
+import statistics
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hospital_quiz_bot.app.database.repository import QuizResponseRepository
+from hospital_quiz_bot.app.services.openai_service import REPORT_PROMPT, OpenAIService, get_openai_service
+from hospital_quiz_bot.app.services.prompt_registry import VARIANT_PREFIX
+from hospital_quiz_bot.app.services.usage_service import get_day_start
+from hospital_quiz_bot.app.utils.metrics import percentile
+
+# Variants that use a prompt of their own section rather than a "Report Variant" prompt
+BUILTIN_VARIANTS = (REPORT_PROMPT, "alternative")
+
+
+def get_variant_prompt(variant: str) -> str:
+    """Get the prompt section a variant writes reports with."""
+    return variant if variant in BUILTIN_VARIANTS else VARIANT_PREFIX + variant
+
+
+def assign_variant(session_id: str, variants: Dict[str, float]) -> Optional[str]:
+    """Pick a variant for a session by weight, always the same one for the same session."""
+    if not variants:
+        return None
+    
+    # A hash rather than random, so every process and a later retry pick the same variant
+    digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+    point = int.from_bytes(digest[:8], "big") / 2 ** 64 * sum(variants.values())
+    names = sorted(variants)
+    for name in names:
+        point -= variants[name]
+        if point < 0:
+            return name
+    return names[-1]
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    """Get the mean of some values, or None if there are none."""
+    return statistics.mean(values) if values else None
+
+
+class ExperimentService:
+    """Service for comparing the reports written by the prompt variants."""
+    
+    def __init__(self, session: AsyncSession, openai_service: Optional[OpenAIService] = None):
+        """Initialize the experiment service."""
+        self.quiz_response_repo = QuizResponseRepository(session)
+        self._openai_service = openai_service
+    
+    @property
+    def openai_service(self) -> OpenAIService:
+        """Get the OpenAI service, whose prompts give the report length the format rules ask for."""
+        if self._openai_service is None:
+            self._openai_service = get_openai_service()
+        return self._openai_service
+    
+    async def compare(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Compare the variants on the reports of the last days, cheapest variant first.
+        
+        Latency and tokens only cover reports written by the LLM for that session, not cached ones.
+        A report meets the format if its length is within the range the report generation prompt asks for,
+        and was regenerated if its generation had to be started more than once.
+        """
+        since = get_day_start() - timedelta(days=days - 1)
+        reports_by_variant: Dict[str, List[Dict[str, Any]]] = {}
+        for report in await self.quiz_response_repo.get_variant_reports(since):
+            reports_by_variant.setdefault(report["variant"], []).append(report)
+        
+        length_ranges = {}
+        comparison = []
+        for variant, reports in reports_by_variant.items():
+            latencies = [report["latency_ms"] for report in reports if report["latency_ms"] is not None]
+            format_checks = []
+            for report in reports:
+                language = report["language"]
+                if language not in length_ranges:
+                    length_ranges[language] = self.openai_service.get_length_range(language)
+                if length_ranges[language]:
+                    low, high = length_ranges[language]
+                    format_checks.append(low <= (report["length"] or 0) <= high)
+            
+            comparison.append({
+                "variant": variant,
+                "reports": len(reports),
+                "latency_p50_ms": percentile(latencies, 50),
+                "latency_p95_ms": percentile(latencies, 95),
+                "prompt_tokens": _mean([r["prompt_tokens"] for r in reports if r["prompt_tokens"] is not None]),
+                "completion_tokens": _mean([r["completion_tokens"] for r in reports if r["completion_tokens"] is not None]),
+                "cost": _mean([r["cost"] for r in reports if r["cost"] is not None]),
+                "length": _mean([r["length"] for r in reports if r["length"] is not None]),
+                "format_rate": _mean([float(check) for check in format_checks]),
+                "regeneration_rate": _mean([float((r["attempts"] or 1) > 1) for r in reports]),
+            })
+        
+        return sorted(comparison, key=lambda row: (row["cost"] is None, row["cost"] or 0.0))
@@ -0,0 +1,313 @@
+"""
+Bulk intake service for the Hospital Quiz Bot.
+This module turns a spreadsheet of knee examinations, one row per exam, into quiz responses and their reports.
+"""
+
+import asyncio
+import csv
+import io
+import time
+from dataclasses import dataclass, field
+from typing import AsyncContextManager, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hospital_quiz_bot.app.database.repository import QuizResponseRepository
+from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, create_new_session, get_catalog
+from hospital_quiz_bot.app.services.report_scheduler import QueueFullError, report_scheduler
+from hospital_quiz_bot.app.services.report_service import ReportService
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# File types that can be uploaded
+INTAKE_EXTENSIONS = (".csv", ".xlsx")
+
+# Delimiters of CSV files, told apart by their count in the header row
+CSV_DELIMITERS = (",", ";", "\t")
+
+# Columns besides the question ids: a reference to the paper form, and the language of the exam
+EXAM_ID_COLUMN = "exam_id"
+LANGUAGE_COLUMN = "language"
+
+# Languages exams can be entered in
+LANGUAGES = tuple(QUIZ_FILES)
+
+# Quiz responses inserted per statement
+INSERT_BATCH_SIZE = 100
+
+# Owner of intake jobs in the report queue; no Telegram user has id 0, so intake takes its turns beside the users
+INTAKE_OWNER = 0
+
+# Seconds to wait before submitting again when the report queue is full
+QUEUE_RETRY_DELAY = 1.0
+
+# Columns of the results file
+RESULT_COLUMNS = ("row", EXAM_ID_COLUMN, LANGUAGE_COLUMN, "session_id", "status", "error", "report_model", "report")
+
+
+class IntakeError(Exception):
+    """Raised when an uploaded file cannot be read as a table of exams."""
+
+
+@dataclass
+class IntakeExam:
+    """One row of an intake file and what became of it."""
+    row: int
+    exam_id: str
+    language: str
+    quiz_version: Optional[str] = None
+    responses: Dict[str, str] = field(default_factory=dict)
+    session_id: Optional[str] = None
+    status: str = "pending"  # invalid, generated or failed once processed
+    error: Optional[str] = None
+    report_model: Optional[str] = None
+    report: Optional[str] = None
+
+
+@dataclass
+class IntakeResult:
+    """The exams of an intake file, with the columns that matched no question."""
+    exams: List[IntakeExam]
+    unknown_columns: List[str] = field(default_factory=list)
+    
+    def count(self, status: str) -> int:
+        """Count the exams with a status."""
+        return sum(1 for exam in self.exams if exam.status == status)
+    
+    def to_csv(self) -> bytes:
+        """Get the results as a CSV file, with a byte order mark so spreadsheet programs detect UTF-8."""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(RESULT_COLUMNS)
+        for exam in self.exams:
+            writer.writerow([
+                exam.row, exam.exam_id, exam.language, exam.session_id or "",
+                exam.status, exam.error or "", exam.report_model or "", exam.report or "",
+            ])
+        return output.getvalue().encode("utf-8-sig")
+
+
+def is_intake_file(filename: Optional[str]) -> bool:
+    """Check whether a file name has an extension intake files can have."""
+    return bool(filename) and filename.lower().endswith(INTAKE_EXTENSIONS)
+
+
+def _cell_text(value) -> str:
+    """Get the text of a spreadsheet cell, writing whole numbers without a decimal point."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_table(filename: str, content: bytes) -> List[Dict[str, str]]:
+    """Read the rows of a CSV or XLSX file, keyed by the column names of its first row.
+    
+    Empty rows are kept, so the index of a row still gives its row number in the file.
+    Raises IntakeError when the file cannot be read.
+    """
+    if filename.lower().endswith(".xlsx"):
+        if openpyxl is None:
+            raise IntakeError("Reading XLSX files needs openpyxl; install it or upload a CSV file")
+        try:
+            workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+            rows = [[_cell_text(value) for value in row] for row in workbook.active.iter_rows(values_only=True)]
+            workbook.close()
+        except Exception as e:
+            raise IntakeError(f"Could not read XLSX file: {str(e)}")
+    else:
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise IntakeError("CSV files must be encoded as UTF-8")
+        # Spreadsheet programs write ';' instead of ',' in some locales; question ids never contain either
+        header_line = text.split("\n", 1)[0]
+        delimiter = max(CSV_DELIMITERS, key=header_line.count)
+        rows = [[cell.strip() for cell in row] for row in csv.reader(io.StringIO(text), delimiter=delimiter)]
+    
+    if not rows or not any(rows[0]):
+        raise IntakeError("The file has no header row")
+    
+    header = [name.strip().lower() for name in rows[0]]
+    return [dict(zip(header, row)) for row in rows[1:]]
+
+
+class IntakeService:
+    """Service for validating, saving and reporting on exams entered in bulk."""
+    
+    def __init__(self, session_pool: Callable[[], AsyncContextManager[AsyncSession]], workers: Optional[int] = None):
+        """Initialize the intake service with a factory of database sessions, one per concurrent report."""
+        self.session_pool = session_pool
+        self.workers = workers or settings.report.intake_workers
+    
+    async def run(
+        self,
+        filename: str,
+        content: bytes,
+        user_id: int,
+        language: str = "uk",
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> IntakeResult:
+        """Read an intake file, save its valid exams for a user and generate their reports.
+        
+        Rows without a language column are taken to be in the given language.
+        If on_progress is given, it is called with the number of finished and of all reports after each report.
+        Raises IntakeError when the file cannot be read or has too many rows.
+        """
+        rows = read_table(filename, content)
+        exam_count = sum(1 for row in rows if any(row.values()))
+        if exam_count > settings.report.intake_max_rows:
+            raise IntakeError(f"The file has {exam_count} exams, at most {settings.report.intake_max_rows} are allowed")
+        
+        result = self.validate(rows, language)
+        valid = [exam for exam in result.exams if exam.status != "invalid"]
+        metrics.increment("intake_rows", exam_count)
+        metrics.increment("intake_rows_invalid", exam_count - len(valid))
+        logger.info(f"Intake of {filename}: {len(valid)} valid exams of {exam_count}")
+        
+        if valid:
+            await self.save(user_id, valid)
+            await self.generate(valid, on_progress)
+        return result
+    
+    def validate(self, rows: List[Dict[str, str]], language: str = "uk") -> IntakeResult:
+        """Check every row for an answer to each question of its language that the quiz would accept.
+        
+        Questions the quiz would skip given the other answers are not required, and their answers are ignored.
+        """
+        known_columns = {EXAM_ID_COLUMN, LANGUAGE_COLUMN}
+        for exam_language in LANGUAGES:
+            known_columns.update(get_catalog(exam_language).index_by_id)
+        
+        exams = []
+        for index, row in enumerate(rows, start=2):
+            if not any(row.values()):
+                continue
+            exam = IntakeExam(
+                row=index,
+                exam_id=row.get(EXAM_ID_COLUMN, ""),
+                language=(row.get(LANGUAGE_COLUMN) or language).lower(),
+            )
+            exams.append(exam)
+            if exam.language not in LANGUAGES:
+                exam.status, exam.error = "invalid", f"unsupported language '{exam.language}'"
+                continue
+            
+            catalog = get_catalog(exam.language)
+            exam.quiz_version = catalog.version
+            errors = []
+            for question_index, question in enumerate(catalog.get_all_questions()):
+                if not catalog.is_asked(question_index, exam.responses):
+                    continue
+                answer = row.get(question["id"], "")
+                if not answer:
+                    errors.append(f"{question['id']}: missing")
+                elif not catalog.is_valid_answer(question["id"], answer):
+                    errors.append(f"{question['id']}: invalid answer '{answer}'")
+                else:
+                    exam.responses[question["id"]] = answer
+            if errors:
+                exam.status, exam.error = "invalid", "; ".join(errors)
+        
+        unknown_columns = sorted({name for row in rows for name in row if name} - known_columns)
+        return IntakeResult(exams, unknown_columns)
+    
+    async def save(self, user_id: int, exams: List[IntakeExam]) -> None:
+        """Save the exams as completed quiz responses of a user, in bulk inserts."""
+        async with self.session_pool() as session:
+            quiz_response_repo = QuizResponseRepository(session)
+            for start in range(0, len(exams), INSERT_BATCH_SIZE):
+                batch = exams[start:start + INSERT_BATCH_SIZE]
+                for exam in batch:
+                    exam.session_id = create_new_session()
+                await quiz_response_repo.add_all([
+                    QuizResponse(
+                        user_id=user_id,
+                        session_id=exam.session_id,
+                        responses=exam.responses,
+                        is_complete=True,
+                        language=exam.language,
+                        quiz_version=exam.quiz_version,
+                    )
+                    for exam in batch
+                ])
+            await quiz_response_repo.commit()
+    
+    async def generate(
+        self,
+        exams: List[IntakeExam],
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> None:
+        """Generate the reports of saved exams in the report queue, with at most `workers` of them queued at once.
+        
+        The reports share the queue's concurrency limit with the quizzes, and round-robin fairness lets
+        every user's reports run in between.
+        """
+        pending = iter(exams)
+        done = 0
+        started = time.monotonic()
+        
+        async def worker() -> None:
+            nonlocal done
+            # The workers share the iterator, so each exam is taken by exactly one of them
+            for exam in pending:
+                await self._schedule_report(exam)
+                done += 1
+                if on_progress is not None:
+                    try:
+                        await on_progress(done, len(exams))
+                    except Exception as e:
+                        logger.warning(f"Failed to report intake progress: {str(e)}")
+        
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(exams)))))
+        metrics.observe("intake_ms", (time.monotonic() - started) * 1000)
+    
+    async def _schedule_report(self, exam: IntakeExam) -> None:
+        """Queue the report of one exam and wait until the job has finished, failed or been aborted."""
+        finished = asyncio.get_running_loop().create_future()
+        
+        async def job() -> None:
+            try:
+                await self._generate_report(exam)
+            except asyncio.CancelledError:
+                # Aborted by the job timeout or by stopping the queue
+                exam.status, exam.error = "failed", "report job aborted"
+                metrics.increment("intake_reports_failed")
+                raise
+            finally:
+                if not finished.done():
+                    finished.set_result(None)
+        
+        while True:
+            try:
+                report_scheduler.submit(INTAKE_OWNER, f"intake:{exam.session_id}", job)
+                break
+            except QueueFullError:
+                await asyncio.sleep(QUEUE_RETRY_DELAY)
+        await finished
+    
+    async def _generate_report(self, exam: IntakeExam) -> None:
+        """Generate the report of one exam in its own database session and record the outcome on it."""
+        # Bulk reports have no one waiting for them, so only the on-demand template engine replaces the LLM
+        template_reason = "on_demand" if settings.report.engine == "template" else None
+        try:
+            async with self.session_pool() as session:
+                report_service = ReportService(session, language=exam.language)
+                quiz_response = await report_service.quiz_response_repo.get_by_session_id(exam.session_id)
+                await report_service.generate_report(quiz_response, template_reason=template_reason)
+                if quiz_response.report:
+                    exam.status, exam.report, exam.report_model = "generated", quiz_response.report, quiz_response.report_model
+                else:
+                    exam.status, exam.error = "failed", "no report generated"
+        except Exception as e:
+            logger.error(f"Failed to generate intake report for row {exam.row}: {str(e)}")
+            exam.status, exam.error = "failed", str(e)
+        metrics.increment(f"intake_reports_{exam.status}")
@@ -0,0 +1,173 @@
+"""
+Model router for the Hospital Quiz Bot.
+This module provides latency-aware routing of report requests across models and OpenAI-compatible endpoints.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from hospital_quiz_bot.app.services.resilience import CircuitBreaker
+from hospital_quiz_bot.app.utils.metrics import metrics, percentile
+from hospital_quiz_bot.config.settings import ModelRoute, settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+@dataclass
+class RouteState:
+    """A route with its circuit breaker and the outcomes of its recent calls."""
+    config: ModelRoute
+    breaker: CircuitBreaker
+    # (finished_at, latency_ms, ok) of the calls in the window
+    samples: Deque[Tuple[float, float, bool]] = field(default_factory=deque)
+    
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+
+@dataclass
+class RouteDecision:
+    """The route chosen for a call and why."""
+    route: RouteState
+    reason: str
+
+
+class ModelRouter:
+    """Sends each call to the first route, in order of preference, that is healthy and within its latency SLO.
+    
+    Routes are judged on the calls of the last `window` seconds only, so a route skipped after
+    a latency spike or a burst of errors is tried again once those calls have aged out.
+    Error rates and SLOs only decide the order: if no route meets them, the least bad route whose
+    breaker lets the call through is used, preferring a low error rate over a low latency.
+    Only open breakers reject calls.
+    """
+    
+    def __init__(self, routes: List[ModelRoute], window: float, min_samples: int):
+        """Initialize the router with one circuit breaker per route."""
+        self.window = window
+        self.min_samples = min_samples
+        # The first route keeps the name of the former single breaker, so its metrics stay comparable
+        self.routes = [
+            RouteState(route, CircuitBreaker(
+                "openai" if index == 0 else f"openai_{route.name}",
+                failure_threshold=settings.openai.breaker_failure_threshold,
+                reset_timeout=settings.openai.breaker_reset_timeout,
+            ))
+            for index, route in enumerate(routes)
+        ]
+    
+    @property
+    def primary(self) -> RouteState:
+        """The preferred route."""
+        return self.routes[0]
+    
+    def _prune(self, route: RouteState) -> None:
+        """Drop the samples that have left the window."""
+        cutoff = time.monotonic() - self.window
+        while route.samples and route.samples[0][0] < cutoff:
+            route.samples.popleft()
+    
+    def latency(self, route: RouteState, q: float) -> Optional[float]:
+        """Get the q-th percentile of the successful call latencies of a route, if there are enough."""
+        self._prune(route)
+        latencies = [latency for _, latency, ok in route.samples if ok]
+        return percentile(latencies, q) if len(latencies) >= self.min_samples else None
+    
+    def error_rate(self, route: RouteState) -> Optional[float]:
+        """Get the share of failed calls of a route, if there are enough."""
+        self._prune(route)
+        if len(route.samples) < self.min_samples:
+            return None
+        return sum(1 for _, _, ok in route.samples if not ok) / len(route.samples)
+    
+    def _skip_reason(self, route: RouteState) -> Optional[str]:
+        """Get the reason a route should not take calls now, if there is one."""
+        error_rate = self.error_rate(route)
+        if error_rate is not None and error_rate > route.config.max_error_rate:
+            return "error_rate"
+        
+        p95 = self.latency(route, 95)
+        if route.config.latency_slo_ms and p95 is not None and p95 > route.config.latency_slo_ms:
+            return "latency"
+        
+        # Checked last, since letting a call through uses up the half-open probe
+        if not route.breaker.allow():
+            return "breaker_open"
+        return None
+    
+    def choose(self) -> Optional[RouteDecision]:
+        """Choose the route for the next call, or None if every route's breaker is open."""
+        skipped: List[Tuple[RouteState, str]] = []
+        decision = None
+        for route in self.routes:
+            reason = self._skip_reason(route)
+            if reason is None:
+                decision = RouteDecision(route, f"{skipped[0][0].name}_{skipped[0][1]}" if skipped else "preferred")
+                break
+            skipped.append((route, reason))
+        
+        if decision is None:
+            # No route meets its limits, so take the least bad one that still answers; its calls are new samples
+            # that let it qualify again
+            degraded = sorted(
+                (route for route, reason in skipped if reason != "breaker_open"),
+                key=lambda r: (self.error_rate(r) or 0.0, self.latency(r, 95) or 0.0),
+            )
+            for route in degraded:
+                if route.breaker.allow():
+                    decision = RouteDecision(route, "least_bad")
+                    break
+        
+        if decision is None:
+            return None
+        
+        metrics.increment(f"route_{decision.route.name}_calls")
+        if decision.route is not self.primary:
+            metrics.increment("route_fallbacks")
+            logger.info(f"Routing to {decision.route.name} ({decision.reason})")
+        return decision
+    
+    def is_unavailable(self) -> bool:
+        """Check whether every route's breaker is rejecting calls, i.e. choose() would return None."""
+        return all(route.breaker.is_rejecting() for route in self.routes)
+    
+    def record_success(self, route: RouteState, latency_ms: float) -> None:
+        """Record a call that finished."""
+        route.breaker.record_success()
+        route.samples.append((time.monotonic(), latency_ms, True))
+        self._prune(route)
+    
+    def record_failure(self, route: RouteState) -> None:
+        """Record a call that failed with a transient error."""
+        route.breaker.record_failure()
+        route.samples.append((time.monotonic(), 0.0, False))
+        self._prune(route)
+        metrics.increment(f"route_{route.name}_errors")
+    
+    def record_usage(self, route: RouteState, prompt_tokens: int, completion_tokens: int) -> float:
+        """Add the estimated cost of a call to the route's total and return it in USD."""
+        cost = (prompt_tokens * route.config.input_cost + completion_tokens * route.config.output_cost) / 1_000_000
+        if cost:
+            metrics.increment(f"route_{route.name}_cost_usd", cost)
+        return cost
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the latency, error rate and breaker state of every route."""
+        stats: Dict[str, Any] = {}
+        for route in self.routes:
+            error_rate = self.error_rate(route)
+            stats[f"route_{route.name}_p50_ms"] = self.latency(route, 50)
+            stats[f"route_{route.name}_p95_ms"] = self.latency(route, 95)
+            stats[f"route_{route.name}_error_rate"] = error_rate * 100 if error_rate is not None else None
+            stats.update(route.breaker.get_stats())
+        return stats
+
+
+# Create the process-wide model router
+model_router = ModelRouter(
+    settings.openai.get_routes(),
+    window=settings.openai.route_window,
+    min_samples=settings.openai.route_min_samples,
+)
@@ -3,121 +3,267 @@ OpenAI service for the Hospital Quiz Bot.
 This module provides functionality for generating reports using the OpenAI API.
 """
 
+import asyncio
+import hashlib
+import math
 import re
-from typing import Dict, Any, Optional
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, NamedTuple, Optional, Sequence, Set, Tuple
 
 import openai
 
+from hospital_quiz_bot.app.services.model_router import RouteDecision, RouteState, model_router
+from hospital_quiz_bot.app.services.prompt_registry import PromptRegistry, prompt_registry
+from hospital_quiz_bot.app.services.resilience import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    backoff_delay,
+    get_retry_after,
+    hedged,
+    is_retryable,
+)
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.app.utils.tokens import count_message_tokens, count_tokens
 from hospital_quiz_bot.config.settings import settings
 from hospital_quiz_bot.config.logging_config import logger
 
+# Matches the requested report length in a prompt, e.g. "1500-2000 символів"
+REPORT_LENGTH_PATTERN = re.compile(r"(\d+)\s*-\s*(\d+)\s*(?:символів|Zeichen|characters)", re.IGNORECASE)
+
+# Margin on top of the requested report length, since models overshoot character limits
+MAX_TOKENS_HEADROOM = 1.5
+
+# Prompt section of whole reports; sectioned reports use one "section_<name>" prompt per report section
+REPORT_PROMPT = "report"
+
+# Prompt section of reports requested as JSON with one field per report section
+STRUCTURED_PROMPT = "structured"
+
+# Marks where the patient data goes in a prompt template
+PATIENT_DATA_PLACEHOLDER = "[PATIENT_DATA_PLACEHOLDER]"
+
+# Shortest prompt prefix the OpenAI API caches, in tokens
+PREFIX_CACHE_MIN_TOKENS = 1024
+
+
+@dataclass
+class ReportUsage:
+    """Tokens, estimated cost in USD and latency of the API calls that wrote a report."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+    latency_ms: float = 0.0
+
+
+class GeneratedReport(NamedTuple):
+    """A report written by the LLM, the model that wrote it, its usage and, for structured reports, its sections."""
+    text: str
+    model: str
+    sections: Optional[Dict[str, str]] = None
+    usage: Optional[ReportUsage] = None
+
 
 class OpenAIService:
     """Service for generating reports using the OpenAI API."""
     
-    def __init__(self, api_key=None):
-        """Initialize the OpenAI service with the API key."""
+    def __init__(self, api_key=None, base_url=None, prompts: Optional[PromptRegistry] = None):
+        """Initialize the OpenAI service with the API key and an optional OpenAI-compatible endpoint."""
         self.api_key = api_key or settings.openai.api_key
-        self.model = settings.openai.model
+        self.base_url = base_url or settings.openai.base_url
+        self.model = model_router.primary.config.model
         self.temperature = settings.openai.temperature
         self.max_tokens = settings.openai.max_tokens
         self.top_p = settings.openai.top_p
+        self._max_tokens_by_template: Dict[str, int] = {}
+        self._split_templates: Dict[str, Tuple[str, str]] = {}
+        self._prefixes_checked: Set[Tuple[str, str]] = set()
         
-        # Initialize the OpenAI client
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Initialize the async OpenAI client so report generation never blocks the event loop.
+        # Retries are handled by _call so they respect the report deadline and the circuit breaker.
+        self.client = self._create_client(self.api_key, self.base_url)
+        # Clients of routes served by other endpoints, created on first use
+        self._route_clients: Dict[str, openai.AsyncOpenAI] = {}
         
-        # Load prompts
-        self.system_message = self._load_system_message()
-        self.main_prompt_template = self._load_main_prompt_template()
-        self.german_prompt_template = self._load_german_prompt_template()
-        self.alternative_prompt_template = self._load_alternative_prompt_template()
-    
-    def _load_prompt_section(self, section_marker: str) -> str:
-        """Load a specific section from the prompts file."""
-        try:
-            with open(settings.prompts_file, "r", encoding="utf-8") as file:
-                content = file.read()
-                
-            # Fix pattern to better match markdown sections and code blocks
-            pattern = re.compile(
-                rf"{re.escape(section_marker)}\s*```(.*?)```",
-                re.DOTALL
+        # Prompts are shared by all services and reloaded when the prompts file changes
+        self.prompts = prompts or prompt_registry
+    
+    @staticmethod
+    def _create_client(api_key: str, base_url: Optional[str]) -> openai.AsyncOpenAI:
+        """Create an async client with the configured timeouts."""
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=openai.Timeout(
+                settings.openai.request_timeout,
+                connect=settings.openai.connect_timeout,
+            ),
+            max_retries=0,
+        )
+    
+    def _get_client(self, route: RouteState) -> openai.AsyncOpenAI:
+        """Get the client for a route, which is the service's own client unless the route has its own endpoint."""
+        if not route.config.base_url and not route.config.api_key:
+            return self.client
+        if route.name not in self._route_clients:
+            self._route_clients[route.name] = self._create_client(
+                route.config.api_key or self.api_key,
+                route.config.base_url or self.base_url,
             )
-            match = pattern.search(content)
-            
-            if match:
-                return match.group(1).strip()
-            
-            # Use a more lenient pattern if the first one fails
-            pattern = re.compile(
-                rf"{re.escape(section_marker)}.*?```(.*?)```",
-                re.DOTALL
+        return self._route_clients[route.name]
+    
+    async def close(self) -> None:
+        """Close the connections of all clients."""
+        await self.client.close()
+        for client in self._route_clients.values():
+            await client.close()
+        self._route_clients.clear()
+    
+    def _get_prompt_template(self, language: str, prompt: str = REPORT_PROMPT) -> str:
+        """Select the report prompt template for a language."""
+        return self.prompts.get(prompt, language)
+    
+    def build_prompt(self, patient_data: str, language: str = "uk", prompt: str = REPORT_PROMPT) -> str:
+        """Build the report prompt for the patient data.
+        
+        Raises ValueError when no prompt template is available.
+        """
+        prompt_template = self._get_prompt_template(language, prompt)
+        if not prompt_template:
+            logger.error("No valid prompt template available")
+            raise ValueError("No valid prompt template available")
+        
+        # The patient data goes last, so everything before it is the same for every report
+        instructions, lead_in = self._split_template(prompt_template)
+        return "\n\n".join(part for part in (instructions, lead_in, patient_data) if part)
+    
+    def _split_template(self, prompt_template: str) -> Tuple[str, str]:
+        """Split a prompt template into its static instructions and the paragraph introducing the patient data.
+        
+        Instructions written after the placeholder are moved before the introduction, so the
+        system message and the instructions form a prefix the provider can serve from its prompt cache.
+        The API only caches prefixes of PREFIX_CACHE_MIN_TOKENS or more, which the shipped prompts are not.
+        """
+        if prompt_template not in self._split_templates:
+            before, _, after = prompt_template.partition(PATIENT_DATA_PLACEHOLDER)
+            head, _, lead_in = before.strip().rpartition("\n\n")
+            if not head:
+                # A single paragraph before the placeholder is part of the instructions
+                head, lead_in = lead_in, ""
+            instructions = "\n\n".join(part for part in (head.strip(), after.strip()) if part)
+            self._split_templates[prompt_template] = (instructions, lead_in.strip())
+        return self._split_templates[prompt_template]
+    
+    def get_prefix_tokens(self, language: str = "uk", prompt: str = REPORT_PROMPT) -> int:
+        """Count the tokens of the static prefix shared by all requests with a prompt in a language."""
+        instructions, _ = self._split_template(self._get_prompt_template(language, prompt))
+        messages = [
+            {"role": "system", "content": self.prompts.get("system", language)},
+            {"role": "user", "content": instructions},
+        ]
+        return count_message_tokens(messages, self.model)
+    
+    def _check_prefix(self, language: str, prompt: str) -> None:
+        """Warn once per prompt and language when the static prefix is too short to be cached."""
+        if (language, prompt) in self._prefixes_checked:
+            return
+        self._prefixes_checked.add((language, prompt))
+        
+        prefix_tokens = self.get_prefix_tokens(language, prompt)
+        if prefix_tokens < PREFIX_CACHE_MIN_TOKENS:
+            logger.warning(
+                f"The static prefix of the {language} {prompt} prompt is about {prefix_tokens} tokens, "
+                f"below the {PREFIX_CACHE_MIN_TOKENS} the API caches, so its requests are never served from the cache"
             )
-            match = pattern.search(content)
-            
-            if match:
-                return match.group(1).strip()
-                
-            logger.error(f"Could not find section {section_marker} in prompts file")
-            # Return default values for critical sections
-            if section_marker == "## System Message":
-                return "Ти - професійний медичний асистент. Твоє завдання - складати медичні звіти."
-            return ""
-        except Exception as e:
-            logger.error(f"Error loading prompt section: {str(e)}")
-            return ""
     
-    def _load_system_message(self) -> str:
-        """Load the system message from the prompts file."""
-        return self._load_prompt_section("## System Message")
+    def get_fingerprint(self, language: str = "uk", prompts: Sequence[str] = (REPORT_PROMPT,)) -> str:
+        """Get a hash of everything besides the patient data that shapes a report written with the given prompts."""
+        parts = [
+            self.prompts.get("system", language),
+            *(self._get_prompt_template(language, prompt) for prompt in prompts),
+            self.model,
+            str(self.temperature),
+            str(self.top_p),
+            *(str(self.get_max_tokens(language, prompt)) for prompt in prompts),
+        ]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+    
+    def build_request_body(
+        self,
+        patient_data: str,
+        language: str = "uk",
+        prompt: str = REPORT_PROMPT,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build the chat completions request body for the patient data."""
+        self._check_prefix(language, prompt)
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.prompts.get("system", language)},
+                {"role": "user", "content": self.build_prompt(patient_data, language, prompt)},
+            ],
+            "temperature": self.temperature,
+            "max_tokens": self.get_max_tokens(language, prompt),
+            "top_p": self.top_p,
+        }
+        if response_format is not None:
+            body["response_format"] = response_format
+        return body
+    
+    def get_length_range(self, language: str = "uk", prompt: str = REPORT_PROMPT) -> Optional[Tuple[int, int]]:
+        """Get the length in characters the prompt asks for, if it names one."""
+        match = REPORT_LENGTH_PATTERN.search(self._get_prompt_template(language, prompt))
+        return (int(match.group(1)), int(match.group(2))) if match else None
+    
+    def get_max_tokens(self, language: str = "uk", prompt: str = REPORT_PROMPT) -> int:
+        """Get max_tokens for a report, sized from the length the prompt asks for."""
+        if not settings.openai.adaptive_max_tokens:
+            return self.max_tokens
+        
+        prompt_template = self._get_prompt_template(language, prompt)
+        if prompt_template not in self._max_tokens_by_template:
+            match = REPORT_LENGTH_PATTERN.search(prompt_template)
+            if not match:
+                self._max_tokens_by_template[prompt_template] = self.max_tokens
+            else:
+                # The prompt is written in the report language, so its own ratio
+                # of tokens to characters predicts the ratio of the report
+                tokens_per_char = count_tokens(prompt_template, self.model) / len(prompt_template)
+                max_tokens = math.ceil(int(match.group(2)) * tokens_per_char * MAX_TOKENS_HEADROOM)
+                self._max_tokens_by_template[prompt_template] = min(self.max_tokens, max_tokens)
+                logger.info(f"Using max_tokens={self._max_tokens_by_template[prompt_template]} for {language} {prompt} prompts")
+        
+        return self._max_tokens_by_template[prompt_template]
+    
+    def count_prompt_tokens(self, patient_data: str, language: str = "uk", prompt: str = REPORT_PROMPT) -> int:
+        """Count the prompt tokens of a report request locally."""
+        return count_message_tokens(self.build_request_body(patient_data, language, prompt)["messages"], self.model)
     
-    def _load_main_prompt_template(self) -> str:
-        """Load the main prompt template from the prompts file."""
-        return self._load_prompt_section("## Main Report Generation Prompt")
+    async def complete_report(
+        self,
+        patient_data: str,
+        language: str = "uk",
+        on_route: Optional[Callable[[RouteDecision], None]] = None,
+        prompt: str = REPORT_PROMPT,
+        response_format: Optional[Dict[str, Any]] = None,
+        usage: Optional[ReportUsage] = None,
+    ) -> str:
+        """Generate a report, or with a section prompt one section of it, using the OpenAI API, raising on failure.
         
-    def _load_german_prompt_template(self) -> str:
-        """Load the German prompt template from the prompts file."""
-        german_prompt = self._load_prompt_section("## German Report Generation Prompt")
-        # Use main prompt as fallback if German prompt is not found
-        if not german_prompt and self.main_prompt_template:
-            logger.warning("German prompt not found, using main prompt as fallback")
-            return self.main_prompt_template
-        return german_prompt
-    
-    def _load_alternative_prompt_template(self) -> str:
-        """Load the alternative prompt template from the prompts file."""
-        alt_prompt = self._load_prompt_section("## Alternative Prompt")
-        # Use main prompt as fallback if alternative is not found
-        if not alt_prompt and self.main_prompt_template:
-            return self.main_prompt_template
-        return alt_prompt
-    
-    def generate_report(self, patient_data: str, language: str = "uk") -> Optional[str]:
+        If on_route is given, it is called with the routing decision that produced the report.
+        If response_format is given, the report is returned in that format, e.g. as JSON.
+        If usage is given, the tokens and cost of the call are added to it.
+        """
+        return await self._generate_completion(
+            self.build_request_body(patient_data, language, prompt, response_format), on_route, usage
+        )
+    
+    async def generate_report(self, patient_data: str, language: str = "uk") -> Optional[str]:
         """Generate a report using the OpenAI API."""
         try:
-            # Select the appropriate prompt template based on language
-            if language == "de":
-                prompt_template = self.german_prompt_template
-                logger.info("Using German prompt template for report generation")
-            else:  # Default to Ukrainian
-                prompt_template = self.main_prompt_template
-                logger.info("Using Ukrainian prompt template for report generation")
-            
-            # If no prompt template is available, provide an error
-            if not prompt_template:
-                logger.error("No valid prompt template available")
-                if language == "de":
-                    return "Fehler: Bericht konnte nicht generiert werden. Keine Vorlage verfügbar."
-                else:
-                    return "Помилка: Не вдалося згенерувати звіт. Налаштування шаблону відсутнє."
-            
-            # Replace the placeholder with the patient data
-            prompt = prompt_template.replace("[PATIENT_DATA_PLACEHOLDER]", patient_data)
-            
-            # Generate the report
-            response = self._generate_completion(prompt)
-            
-            return response
+            return await self.complete_report(patient_data, language)
         except Exception as e:
             logger.error(f"Error generating report: {str(e)}")
             if language == "de":
@@ -125,27 +271,268 @@ class OpenAIService:
             else:
                 return f"Помилка: Не вдалося згенерувати звіт. {str(e)}"
     
-    def _generate_completion(self, prompt: str) -> str:
-        """Generate a completion using the OpenAI API synchronously."""
+    async def stream_report(
+        self,
+        patient_data: str,
+        language: str = "uk",
+        on_route: Optional[Callable[[RouteDecision], None]] = None,
+        usage: Optional[ReportUsage] = None,
+        prompt: str = REPORT_PROMPT,
+    ) -> AsyncIterator[str]:
+        """Generate a report using the OpenAI API, yielding text deltas as they arrive.
+        
+        If on_route is given, it is called with the routing decision once the stream has started.
+        If usage is given, the tokens and cost of the call are added to it once the stream is read.
+        """
+        body = self.build_request_body(patient_data, language, prompt)
+        self._record_prompt_tokens(body)
+        started = time.monotonic()
+        deadline = started + settings.openai.deadline
+        stream, decision = await self._call(
+            lambda route: self._get_client(route).chat.completions.create(
+                **self._route_body(body, route),
+                stream=True,
+                stream_options={"include_usage": True},
+            ),
+            deadline,
+            streaming=True,
+        )
+        if on_route is not None:
+            on_route(decision)
+        
+        # The deadline also covers reading the stream
+        iterator = stream.__aiter__()
+        first_token_ms = None
+        finish_reason = None
+        api_usage = None
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=max(remaining, 0))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    model_router.record_failure(decision.route)
+                    metrics.increment("openai_deadline_exceeded")
+                    raise DeadlineExceededError(f"Report not finished within {settings.openai.deadline}s")
+                except Exception:
+                    # The breaker saw the stream start, so a route that keeps dropping streams only shows up here.
+                    # Errors mid-stream come as plain APIErrors or raw httpx read errors, which is_retryable does
+                    # not know, and all of them come from the upstream
+                    model_router.record_failure(decision.route)
+                    metrics.increment("openai_stream_errors")
+                    raise
+                
+                # The usage arrives in a last chunk without choices
+                api_usage = getattr(chunk, "usage", None) or api_usage
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token_ms is None:
+                        first_token_ms = (time.monotonic() - started) * 1000
+                    yield chunk.choices[0].delta.content
+            # A streamed report is judged on the time to its last token
+            model_router.record_success(decision.route, (time.monotonic() - started) * 1000)
+            cached_tokens = self._record_usage(api_usage, finish_reason, decision.route, usage)
+            if first_token_ms is not None:
+                metrics.observe("openai_ttft_ms_cached" if cached_tokens else "openai_ttft_ms_uncached", first_token_ms)
+        finally:
+            await stream.close()
+    
+    @staticmethod
+    def _route_body(body: Dict[str, Any], route: RouteState) -> Dict[str, Any]:
+        """Get a request body with the model of a route."""
+        return {**body, "model": route.config.model}
+    
+    async def _generate_completion(
+        self,
+        body: Dict[str, Any],
+        on_route: Optional[Callable[[RouteDecision], None]] = None,
+        usage: Optional[ReportUsage] = None,
+    ) -> str:
+        """Generate a completion using the OpenAI API asynchronously."""
         try:
-            # Use synchronous API call based on latest OpenAI API documentation
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=self.top_p
+            self._record_prompt_tokens(body)
+            deadline = time.monotonic() + settings.openai.deadline
+            completion, decision = await self._call(
+                lambda route: hedged(
+                    lambda: self._get_client(route).chat.completions.create(**self._route_body(body, route)),
+                    self._get_hedge_delay(),
+                    "openai",
+                    route.breaker,
+                ),
+                deadline,
             )
             
             # Extract the content from the response - following latest API patterns
             if completion and hasattr(completion, 'choices') and len(completion.choices) > 0:
+                self._record_usage(
+                    getattr(completion, "usage", None), completion.choices[0].finish_reason, decision.route, usage
+                )
+                if on_route is not None:
+                    on_route(decision)
                 return completion.choices[0].message.content
             
             logger.error("Invalid response format from OpenAI API")
-            return "Помилка: Не вдалося згенерувати звіт. Некоректна відповідь від API."
+            raise ValueError("Invalid response format from OpenAI API")
         except Exception as e:
             logger.error(f"Error generating completion: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+    
+    def _record_prompt_tokens(self, body: Dict[str, Any]) -> None:
+        """Record the locally counted prompt tokens of a request before it is sent."""
+        metrics.observe("openai_prompt_tokens_estimated", count_message_tokens(body["messages"], body["model"]))
+    
+    def _record_usage(
+        self,
+        usage: Any,
+        finish_reason: Optional[str],
+        route: RouteState,
+        report_usage: Optional[ReportUsage] = None,
+    ) -> int:
+        """Record the token usage reported by the API and return the number of prompt tokens served from its cache.
+        
+        If report_usage is given, the tokens and estimated cost are also added to it.
+        """
+        cached_tokens = 0
+        if usage:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+            metrics.observe("openai_prompt_tokens", usage.prompt_tokens)
+            metrics.observe("openai_completion_tokens", usage.completion_tokens)
+            metrics.observe("openai_cached_tokens", cached_tokens)
+            metrics.increment("openai_prompt_tokens_total", usage.prompt_tokens)
+            metrics.increment("openai_cached_tokens_total", cached_tokens)
+            if cached_tokens:
+                metrics.increment("openai_prompt_cache_hits")
+            cost = model_router.record_usage(route, usage.prompt_tokens, usage.completion_tokens)
+            if report_usage is not None:
+                report_usage.prompt_tokens += usage.prompt_tokens
+                report_usage.completion_tokens += usage.completion_tokens
+                report_usage.cached_tokens += cached_tokens
+                report_usage.cost += cost
+        if finish_reason == "length":
+            metrics.increment("openai_truncated")
+            logger.warning("Report was cut off by max_tokens")
+        return cached_tokens
+    
+    def _get_hedge_delay(self) -> Optional[float]:
+        """Get the delay after which a request is hedged, or None if hedging is off."""
+        if not settings.openai.hedge_enabled or metrics.count("openai_call_ms") < settings.openai.hedge_min_samples:
+            return None
+        return metrics.percentile("openai_call_ms", 95) / 1000
+    
+    async def _call(
+        self,
+        factory: Callable[[RouteState], Awaitable[Any]],
+        deadline: float,
+        streaming: bool = False,
+    ) -> Tuple[Any, RouteDecision]:
+        """Call the API on the route chosen by the router, retrying transient errors until the deadline.
+        
+        Every attempt is routed anew, so retries move away from a route that keeps failing.
+        For streaming calls the caller records the route latency once the stream is read.
+        """
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.increment("openai_deadline_exceeded")
+                raise DeadlineExceededError(f"Report not finished within {settings.openai.deadline}s")
+            
+            decision = model_router.choose()
+            if decision is None:
+                metrics.increment("openai_breaker_rejected")
+                raise CircuitOpenError("OpenAI API is unavailable, please try again later")
+            
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(factory(decision.route), timeout=remaining)
+            except asyncio.CancelledError:
+                # A cancelled call says nothing about the upstream; without this a half-open breaker would wait
+                # forever for the outcome of its probe
+                decision.route.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The API answered, so it is up even though the request failed
+                    decision.route.breaker.record_success()
+                    raise
+                
+                model_router.record_failure(decision.route)
+                metrics.increment("openai_call_errors")
+                
+                delay = backoff_delay(
+                    attempt,
+                    settings.openai.backoff_base,
+                    settings.openai.backoff_max,
+                    get_retry_after(e),
+                )
+                if attempt >= settings.openai.max_retries or time.monotonic() + delay >= deadline:
+                    if isinstance(e, asyncio.TimeoutError):
+                        metrics.increment("openai_deadline_exceeded")
+                        raise DeadlineExceededError(f"Report not finished within {settings.openai.deadline}s") from e
+                    raise
+                
+                attempt += 1
+                metrics.increment("openai_retries")
+                logger.warning(f"OpenAI call failed ({str(e) or type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            
+            latency_ms = (time.monotonic() - started) * 1000
+            if streaming:
+                decision.route.breaker.record_success()
+            else:
+                model_router.record_success(decision.route, latency_ms)
+            metrics.observe("openai_call_ms", latency_ms)
+            return result, decision
+
+
+def build_report_format(sections: Sequence[str]) -> Dict[str, Any]:
+    """Build the response format asking for a JSON object with one required text field per report section."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "report",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {name: {"type": "string"} for name in sections},
+                "required": list(sections),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    """Get the share of prompt tokens served from the provider's prompt cache."""
+    prompt_tokens = metrics.get_counter("openai_prompt_tokens_total")
+    cached_tokens = metrics.get_counter("openai_cached_tokens_total")
+    return {
+        "openai_cached_token_rate": cached_tokens / prompt_tokens * 100 if prompt_tokens else None,
+    }
+
+
+_shared_service: Optional[OpenAIService] = None
+
+
+def get_openai_service() -> OpenAIService:
+    """Get the process-wide OpenAI service, creating it on first use.
+    
+    Sharing one service keeps one HTTP client and its pool of keep-alive connections.
+    """
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = OpenAIService()
+    return _shared_service
+
+
+async def close_openai_service() -> None:
+    """Close the connections of the process-wide OpenAI service."""
+    global _shared_service
+    if _shared_service is not None:
+        await _shared_service.close()
+        _shared_service = None
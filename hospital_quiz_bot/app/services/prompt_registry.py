@@ -0,0 +1,159 @@
+"""
+Prompt registry for the Hospital Quiz Bot.
+This module provides the prompts from the prompts file, parsed once and reloaded when the file changes.
+"""
+
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+# Language of prompts without a language tag
+DEFAULT_LANGUAGE = "uk"
+
+# Matches a section heading such as "## Report Generation Prompt [de]"
+HEADING_PATTERN = re.compile(r"^##\s+(.+?)\s*(?:\[(\w+)\])?\s*$", re.MULTILINE)
+
+# Matches the first code block of a section
+CODE_BLOCK_PATTERN = re.compile(r"```(.*?)```", re.DOTALL)
+
+# Matches a parenthesised note in a heading, e.g. "(For Shorter Reports)"
+HEADING_NOTE_PATTERN = re.compile(r"\s*\(.*?\)")
+
+# Section names by heading title
+SECTION_TITLES = {
+    "system message": "system",
+    "report generation prompt": "report",
+    "alternative prompt": "alternative",
+    "arrival section prompt": "section_arrival",
+    "examination section prompt": "section_examination",
+    "biomechanics section prompt": "section_biomechanics",
+    "conclusion section prompt": "section_conclusion",
+    "structured report prompt": "structured",
+}
+
+# Matches the title of a report prompt variant, e.g. "report variant: short"
+VARIANT_TITLE_PATTERN = re.compile(r"^report variant:\s*(\w+)$")
+
+# Section name prefix of report prompt variants
+VARIANT_PREFIX = "variant_"
+
+# Headings used before prompts were tagged with their language
+LEGACY_HEADINGS = {
+    "main report generation prompt": ("report", DEFAULT_LANGUAGE),
+    "german report generation prompt": ("report", "de"),
+}
+
+# Used when the prompts file has no system message
+FALLBACK_SYSTEM_MESSAGE = "Ти - професійний медичний асистент. Твоє завдання - складати медичні звіти."
+
+
+def parse_prompts(content: str) -> Dict[Tuple[str, str], str]:
+    """Parse the prompts file into prompts keyed by (section, language)."""
+    prompts = {}
+    headings = list(HEADING_PATTERN.finditer(content))
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(content)
+        block = CODE_BLOCK_PATTERN.search(content, heading.end(), end)
+        if not block:
+            continue
+        
+        title = HEADING_NOTE_PATTERN.sub("", heading.group(1)).lower()
+        variant = VARIANT_TITLE_PATTERN.match(title)
+        if title in LEGACY_HEADINGS:
+            section, language = LEGACY_HEADINGS[title]
+        elif title in SECTION_TITLES:
+            section, language = SECTION_TITLES[title], heading.group(2) or DEFAULT_LANGUAGE
+        elif variant:
+            section, language = VARIANT_PREFIX + variant.group(1), heading.group(2) or DEFAULT_LANGUAGE
+        else:
+            continue
+        
+        prompts.setdefault((section, language), block.group(1).strip())
+    return prompts
+
+
+class PromptRegistry:
+    """Prompts by section and language, reloaded atomically when the prompts file changes."""
+    
+    def __init__(self, path: Path, check_interval: float = 5.0):
+        """Initialize the registry and load the prompts file."""
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._prompts: Dict[Tuple[str, str], str] = {}
+        self._fallbacks_logged: Set[Tuple[str, str]] = set()
+        self.version = 0
+        self.reload_if_changed()
+    
+    def reload_if_changed(self) -> bool:
+        """Reload the prompts if the file was modified since the last load.
+        
+        The file is checked at most once every check_interval seconds, so lookups rarely touch the disk.
+        """
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._mtime is None:
+                logger.error(f"Error loading prompts file: {str(e)}")
+                self._mtime = 0
+            return False
+        
+        if mtime == self._mtime:
+            return False
+        
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                prompts = parse_prompts(file.read())
+        except Exception as e:
+            # Keep serving the previous prompts
+            logger.error(f"Error loading prompts file: {str(e)}")
+            return False
+        
+        # Swap in the new prompts in one assignment so readers never see a partial set
+        self._prompts = prompts
+        self._fallbacks_logged = set()
+        self._mtime = mtime
+        self.version += 1
+        logger.info(f"Loaded {len(prompts)} prompts from {self.path} (version {self.version})")
+        return True
+    
+    def has(self, section: str, language: str) -> bool:
+        """Check whether there is a prompt for a language, without falling back to the default language."""
+        self.reload_if_changed()
+        return bool(self._prompts.get((section, language)))
+    
+    def get(self, section: str, language: str = DEFAULT_LANGUAGE) -> str:
+        """Get a prompt, falling back to the default language."""
+        self.reload_if_changed()
+        prompts = self._prompts
+        
+        prompt = prompts.get((section, language))
+        if prompt:
+            return prompt
+        
+        prompt = prompts.get((section, DEFAULT_LANGUAGE), "")
+        if (section, language) not in self._fallbacks_logged:
+            self._fallbacks_logged.add((section, language))
+            if prompt and language != DEFAULT_LANGUAGE:
+                logger.info(f"No {section} prompt for language {language}, using {DEFAULT_LANGUAGE}")
+            elif not prompt:
+                logger.error(f"Could not find {section} prompt in prompts file")
+        
+        if not prompt and section == "system":
+            return FALLBACK_SYSTEM_MESSAGE
+        return prompt
+
+
+# Create the process-wide prompt registry
+prompt_registry = PromptRegistry(settings.prompts_file, settings.prompts_reload_interval)
@@ -0,0 +1,319 @@
+"""
+Quiz definition compiler for the Hospital Quiz Bot.
+This module validates the quiz file of every language against the question schema, checks that the languages
+ask the same questions, and compiles them into one JSON artifact that the bot loads without parsing YAML.
+
+Questions can have a show_if condition on the answers to earlier questions, e.g.
+
+    show_if:
+      can_walk: "Так"
+
+which asks the question only if every question named was answered with the option, or one of a list of options,
+given. The conditions are compiled into a transition table shared by all languages.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+
+from hospital_quiz_bot.config.logging_config import logger
+
+# Version of the artifact layout; artifacts of another format are compiled again
+ARTIFACT_FORMAT = 2
+
+# Quiz versions are named by the start of the hash of their quiz files
+VERSION_LENGTH = 12
+VERSION_PATTERN = re.compile(r"^[0-9a-f]{%d}$" % VERSION_LENGTH)
+
+# Question types and the report sections questions can belong to
+QUESTION_TYPES = ("single_choice", "text_input", "optional_text")
+QUESTION_SECTIONS = ("arrival", "examination", "biomechanics", "conclusion")
+
+# Question types answered with one of their options
+CHOICE_TYPES = ("single_choice", "optional_text")
+
+# Fields every question has, and those only some question types have
+REQUIRED_FIELDS = ("id", "text", "label", "section", "type")
+OPTIONAL_FIELDS = ("options", "placeholder", "follow_up_text", "show_if")
+
+# Question ids are used as spreadsheet columns and in prompts, so they are kept to plain identifiers
+QUESTION_ID_PATTERN = re.compile(r"^[a-z][a-z0-9_]*$")
+
+
+class QuizDefinitionError(Exception):
+    """Raised when the quiz files do not define a valid quiz, with every problem found."""
+    
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} problems in the quiz definitions: " + "; ".join(errors))
+        self.errors = errors
+
+
+def read_definition(file_path: Path) -> Tuple[Any, str]:
+    """Parse a quiz file, returning its content with its SHA-256.
+    
+    Raises QuizDefinitionError when it is missing or not valid YAML.
+    """
+    try:
+        content = Path(file_path).read_bytes()
+        return yaml.safe_load(content.decode("utf-8")), hashlib.sha256(content).hexdigest()
+    except FileNotFoundError:
+        raise QuizDefinitionError([f"{file_path}: file not found"])
+    except (UnicodeDecodeError, yaml.YAMLError) as e:
+        raise QuizDefinitionError([f"{file_path}: invalid YAML: {str(e)}"])
+
+
+def validate_questions(language: str, data: Any) -> List[str]:
+    """Check the parsed quiz file of a language against the question schema, returning the problems found."""
+    if not isinstance(data, dict) or not isinstance(data.get("questions"), list) or not data["questions"]:
+        return [f"{language}: the file must have a non-empty 'questions' list"]
+    
+    errors = []
+    seen_ids = set()
+    earlier: Dict[str, Mapping[str, Any]] = {}
+    for number, question in enumerate(data["questions"], start=1):
+        if not isinstance(question, dict):
+            errors.append(f"{language}: question {number} is not a mapping")
+            continue
+        where = f"{language}: question {number} ({question.get('id', 'no id')})"
+        
+        for name in REQUIRED_FIELDS:
+            if not isinstance(question.get(name), str) or not question[name].strip():
+                errors.append(f"{where}: '{name}' must be a non-empty string")
+        unknown = sorted(set(question) - set(REQUIRED_FIELDS) - set(OPTIONAL_FIELDS))
+        if unknown:
+            errors.append(f"{where}: unknown fields {', '.join(unknown)}")
+        
+        question_id = question.get("id")
+        if isinstance(question_id, str):
+            if not QUESTION_ID_PATTERN.match(question_id):
+                errors.append(f"{where}: id must be lowercase letters, digits and underscores")
+            if question_id in seen_ids:
+                errors.append(f"{where}: duplicate id")
+            seen_ids.add(question_id)
+        if question.get("section") not in QUESTION_SECTIONS:
+            errors.append(f"{where}: section must be one of {', '.join(QUESTION_SECTIONS)}")
+        
+        question_type = question.get("type")
+        if question_type not in QUESTION_TYPES:
+            errors.append(f"{where}: type must be one of {', '.join(QUESTION_TYPES)}")
+        elif question_type in CHOICE_TYPES:
+            options = question.get("options")
+            if not isinstance(options, list) or len(options) < 2:
+                errors.append(f"{where}: a {question_type} question needs at least two options")
+            elif not all(isinstance(option, str) and option.strip() for option in options):
+                errors.append(f"{where}: options must be non-empty strings")
+            elif len(set(options)) != len(options):
+                errors.append(f"{where}: duplicate options")
+        elif "options" in question:
+            errors.append(f"{where}: a {question_type} question has no options")
+        
+        if question_type == "optional_text" and not isinstance(question.get("follow_up_text"), str):
+            errors.append(f"{where}: an optional_text question needs a follow_up_text")
+        if "placeholder" in question and question_type != "text_input":
+            errors.append(f"{where}: only text_input questions have a placeholder")
+        if "show_if" in question:
+            errors.extend(f"{where}: {error}" for error in _validate_condition(question["show_if"], earlier))
+        if isinstance(question_id, str):
+            earlier.setdefault(question_id, question)
+    return errors
+
+
+def _get_condition_options(value: Any) -> List[Any]:
+    """Get the options a condition accepts, given as one option or a list of them."""
+    return value if isinstance(value, list) else [value]
+
+
+def _validate_condition(condition: Any, earlier: Mapping[str, Mapping[str, Any]]) -> List[str]:
+    """Check a show_if condition against the questions asked before its question."""
+    if not isinstance(condition, dict) or not condition:
+        return ["show_if must map question ids to the options they must be answered with"]
+    
+    errors = []
+    for question_id, value in condition.items():
+        question = earlier.get(question_id)
+        if question is None:
+            errors.append(f"show_if names {question_id}, which is not an earlier question")
+        elif question.get("type") != "single_choice":
+            errors.append(f"show_if names {question_id}, which is not a single_choice question")
+        else:
+            options = _get_condition_options(value)
+            unknown = [str(option) for option in options if option not in (question.get("options") or ())]
+            if not options or unknown:
+                errors.append(f"show_if names options of {question_id} it does not have: {', '.join(unknown) or 'none'}")
+    return errors
+
+
+def compile_conditions(questions: List[Mapping[str, Any]]) -> List[Dict[str, List[int]]]:
+    """Get the condition of every question as the indexes of the options it accepts; empty if always asked."""
+    options_by_id = {question["id"]: question.get("options") or [] for question in questions}
+    return [
+        {
+            question_id: sorted(options_by_id[question_id].index(option) for option in _get_condition_options(value))
+            for question_id, value in (question.get("show_if") or {}).items()
+        }
+        for question in questions
+    ]
+
+
+def compile_graph(questions: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Compile the conditions of valid questions into a transition table.
+    
+    next[i] lists the questions that can follow question i, in order, up to the first that is always asked;
+    the next question is the first of them whose condition holds, and the quiz ends if none does.
+    previous[i] lists those that can precede question i the same way, with previous[len(questions)]
+    leading back from the end of the quiz to the last question asked.
+    """
+    conditions = compile_conditions(questions)
+    
+    def candidates(indexes: range) -> List[int]:
+        found = []
+        for index in indexes:
+            found.append(index)
+            if not conditions[index]:
+                break
+        return found
+    
+    count = len(questions)
+    return {
+        "conditions": conditions,
+        "next": [candidates(range(index + 1, count)) for index in range(count)],
+        "previous": [candidates(range(index - 1, -1, -1)) for index in range(count + 1)],
+    }
+
+
+def _shape(question: Mapping[str, Any]) -> Dict[str, Any]:
+    """Get what must be the same for a question in every language."""
+    return {
+        "type": question.get("type"),
+        "section": question.get("section"),
+        "options": len(question.get("options") or ()),
+        "placeholder": "placeholder" in question,
+    }
+
+
+def check_alignment(questions_by_language: Mapping[str, List[Mapping[str, Any]]], reference: str) -> List[str]:
+    """Check that every language asks the questions of the reference language, in the same order and shape."""
+    errors = []
+    expected = questions_by_language[reference]
+    expected_ids = [question["id"] for question in expected]
+    for language, questions in questions_by_language.items():
+        if language == reference:
+            continue
+        ids = [question["id"] for question in questions]
+        if ids != expected_ids:
+            missing = [question_id for question_id in expected_ids if question_id not in ids]
+            extra = [question_id for question_id in ids if question_id not in expected_ids]
+            if missing:
+                errors.append(f"{language}: missing questions {', '.join(missing)} of {reference}")
+            if extra:
+                errors.append(f"{language}: questions {', '.join(extra)} not in {reference}")
+            if not missing and not extra:
+                errors.append(f"{language}: questions are not in the order of {reference}")
+            continue
+        for own, other, own_condition, other_condition in zip(
+            questions, expected, compile_conditions(questions), compile_conditions(expected)
+        ):
+            own_shape, other_shape = _shape(own), _shape(other)
+            for name, value in own_shape.items():
+                if value != other_shape[name]:
+                    errors.append(f"{language}: question {own['id']} has {name} {value}, {reference} has {other_shape[name]}")
+            if own_condition != other_condition:
+                errors.append(
+                    f"{language}: question {own['id']} has show_if on options {own_condition}, "
+                    f"{reference} has {other_condition}"
+                )
+    return errors
+
+
+def hash_file(file_path: Path) -> str:
+    """Get the SHA-256 of a file, which tells whether an artifact was compiled from it."""
+    return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+
+
+def get_version(sources: Mapping[str, str]) -> str:
+    """Get the version of the quiz compiled from files with these hashes."""
+    digest = hashlib.sha256(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()
+    return digest[:VERSION_LENGTH]
+
+
+def compile_quiz(files: Mapping[str, Path], reference: str) -> Dict[str, Any]:
+    """Validate the quiz files of all languages and compile them into an artifact.
+    
+    Raises QuizDefinitionError with every problem found in any of the files.
+    """
+    errors = []
+    sources = {}
+    questions_by_language = {}
+    for language, file_path in files.items():
+        try:
+            data, sources[language] = read_definition(file_path)
+        except QuizDefinitionError as e:
+            errors.extend(e.errors)
+            continue
+        language_errors = validate_questions(language, data)
+        errors.extend(language_errors)
+        if not language_errors:
+            questions_by_language[language] = data["questions"]
+    
+    if reference not in files:
+        errors.append(f"no quiz file for the default language {reference}")
+    elif not errors:
+        errors.extend(check_alignment(questions_by_language, reference))
+    if errors:
+        raise QuizDefinitionError(errors)
+    
+    return {
+        "format": ARTIFACT_FORMAT,
+        "version": get_version(sources),
+        "sources": sources,
+        "languages": questions_by_language,
+        "graph": compile_graph(questions_by_language[reference]),
+    }
+
+
+def write_artifact(artifact: Mapping[str, Any], path: Path) -> None:
+    """Write an artifact, replacing the previous one at once so a starting bot never reads half of it."""
+    path = Path(path)
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(json.dumps(artifact, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def load_artifact(path: Path) -> Optional[Dict[str, Any]]:
+    """Read an artifact, or None if there is none or it has another format."""
+    try:
+        artifact = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read quiz artifact {path}: {str(e)}")
+        return None
+    
+    if artifact.get("format") != ARTIFACT_FORMAT:
+        logger.warning(f"Quiz artifact {path} was compiled for another format")
+        return None
+    return artifact
+
+
+def read_artifact(path: Path, files: Mapping[str, Path]) -> Optional[Dict[str, Any]]:
+    """Read an artifact, or None if there is none or it was not compiled from the current quiz files.
+    
+    Quiz files that are not deployed are not checked, so the artifact can be shipped on its own.
+    """
+    artifact = load_artifact(path)
+    if artifact is None:
+        return None
+    
+    if set(artifact.get("languages", {})) != set(files):
+        logger.warning(f"Quiz artifact {path} was compiled for other languages")
+        return None
+    for language, file_path in files.items():
+        if os.path.exists(file_path) and hash_file(file_path) != artifact["sources"].get(language):
+            logger.warning(f"Quiz artifact {path} is older than {file_path}")
+            return None
+    return artifact
@@ -1,103 +1,115 @@
 """
 Quiz service for the Hospital Quiz Bot.
-This module provides functionality for loading and managing quiz questions.
+This module provides the quiz questions of each language as immutable catalogs, loaded from the artifact
+compiled by quiz_compiler and reloaded as a new version when the quiz files change.
 
-Fixed bug: Added check in set_language() method to prevent unnecessary repeated 
-operations and log spam when the same language is set multiple times.
+Each language and version has its own QuizCatalog, so concurrent users never share mutable state;
+handlers pick the catalog of a session with get_catalog(language, version). Questions with a show_if condition
+are asked only if the answers to earlier questions meet it, and catalogs follow the compiled transition table
+to find the next and previous questions asked.
 """
 
+import asyncio
 import os
+import time
 import uuid
-from typing import Dict, List, Optional, Any, Union
-
-import yaml
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Sequence, Tuple
 
+from hospital_quiz_bot.app.services.quiz_compiler import (
+    VERSION_PATTERN,
+    QuizDefinitionError,
+    compile_graph,
+    compile_quiz,
+    load_artifact,
+    read_artifact,
+    write_artifact,
+)
+from hospital_quiz_bot.app.utils.metrics import metrics
 from hospital_quiz_bot.config.settings import settings
 from hospital_quiz_bot.config.logging_config import logger
 
+# Language of sessions whose language has no quiz file
+DEFAULT_LANGUAGE = "uk"
 
-class QuizService:
-    """Service for loading and managing quiz questions."""
-    
-    # Singleton instance
-    _instance = None
-    _initialized = False
-    _language_quiz_files = {
-        "uk": settings.quiz_file,  # Default Ukrainian file
-        "de": str(settings.quiz_file).replace("quizes.yaml", "quizes_de.yaml")  # German file
-    }
-    _loaded_questions = {}
-    
-    def __new__(cls, language=None):
-        """Create a new QuizService instance or return the existing one."""
-        if cls._instance is None:
-            cls._instance = super(QuizService, cls).__new__(cls)
-        return cls._instance
-    
-    def __init__(self, language=None):
-        """Initialize the quiz service with the quiz file path."""
-        # Only initialize once
-        if not QuizService._initialized:
-            self._load_all_languages()
-            QuizService._initialized = True
-        
-        # Set the active language
-        self.language = language or "uk"  # Default to Ukrainian
-        self.questions = self._loaded_questions.get(self.language, [])
-        self.questions_by_id = {q["id"]: q for q in self.questions}
-    
-    def _load_all_languages(self) -> None:
-        """Load questions for all supported languages."""
-        for lang, file_path in self._language_quiz_files.items():
-            try:
-                # Log the full file path for debugging
-                logger.info(f"Attempting to load quiz file for {lang} from {file_path}")
-                
-                if not os.path.exists(file_path):
-                    logger.error(f"Quiz file not found: {file_path}")
-                    self._loaded_questions[lang] = []
-                    continue
-                
-                with open(file_path, "r", encoding="utf-8") as file:
-                    data = yaml.safe_load(file)
-                    
-                if not data or "questions" not in data:
-                    logger.error(f"Invalid quiz file format: {file_path}")
-                    self._loaded_questions[lang] = []
-                    continue
-                    
-                self._loaded_questions[lang] = data["questions"]
-                logger.info(f"Loaded {len(data['questions'])} questions for language {lang} from {file_path}")
-            except Exception as e:
-                logger.error(f"Error loading quiz file for language {lang}: {str(e)}")
-                self._loaded_questions[lang] = []
+# Quiz file of each language
+QUIZ_FILES = {language: str(file_path) for language, file_path in settings.quiz_files.items()}
+
+
+def _freeze_question(question: Dict[str, Any]) -> Mapping[str, Any]:
+    """Get a read-only copy of a question, with its options as a tuple."""
+    frozen = dict(question)
+    if "options" in frozen:
+        frozen["options"] = tuple(frozen["options"] or ())
+    return MappingProxyType(frozen)
+
+
+@dataclass(frozen=True, eq=False)
+class QuizCatalog:
+    """The questions of one language, with lookups precomputed when the catalog is built.
     
-    def set_language(self, language: str) -> None:
-        """Set the active language for the quiz service."""
-        # Check if language is already set to avoid unnecessary operations
-        if hasattr(self, 'language') and self.language == language:
-            return
-            
-        if language in self._language_quiz_files:
-            self.language = language
-            self.questions = self._loaded_questions.get(language, [])
-            self.questions_by_id = {q["id"]: q for q in self.questions}
-            logger.info(f"Set active language to: {language}")
-        else:
-            logger.error(f"Language not supported: {language}, defaulting to Ukrainian")
-            self.language = "uk"
-            self.questions = self._loaded_questions.get("uk", [])
-            self.questions_by_id = {q["id"]: q for q in self.questions}
+    Catalogs compare and hash by identity, so caches of what is built from a catalog can be keyed by it.
+    """
+    language: str
+    questions: Tuple[Mapping[str, Any], ...]
+    index_by_id: Mapping[str, int]
+    options_by_id: Mapping[str, FrozenSet[str]]
+    option_index_by_id: Mapping[str, Mapping[str, int]]
+    version: str = ""
+    # Per question, the questions whose answers it depends on and the options that show it
+    conditions: Tuple[Tuple[Tuple[str, FrozenSet[str]], ...], ...] = ()
+    next_candidates: Tuple[Tuple[int, ...], ...] = ()
+    previous_candidates: Tuple[Tuple[int, ...], ...] = ()
     
-    def get_all_questions(self) -> List[Dict[str, Any]]:
+    @classmethod
+    def from_questions(
+        cls,
+        language: str,
+        questions: Sequence[Dict[str, Any]],
+        version: str = "",
+        graph: Optional[Mapping[str, Any]] = None,
+    ) -> "QuizCatalog":
+        """Build a catalog from the questions of a quiz file and their compiled graph."""
+        frozen = tuple(_freeze_question(question) for question in questions)
+        if graph is None:
+            graph = compile_graph(list(frozen))
+        options_by_index = [question.get("options", ()) for question in frozen]
+        index_by_id = {question["id"]: index for index, question in enumerate(frozen)}
+        return cls(
+            language=language,
+            version=version,
+            conditions=tuple(
+                tuple(
+                    (question_id, frozenset(options_by_index[index_by_id[question_id]][option] for option in options))
+                    for question_id, options in condition.items()
+                )
+                for condition in graph["conditions"]
+            ),
+            next_candidates=tuple(tuple(candidates) for candidates in graph["next"]),
+            previous_candidates=tuple(tuple(candidates) for candidates in graph["previous"]),
+            questions=frozen,
+            index_by_id=MappingProxyType({question["id"]: index for index, question in enumerate(frozen)}),
+            options_by_id=MappingProxyType({
+                question["id"]: frozenset(question.get("options", ())) for question in frozen
+            }),
+            option_index_by_id=MappingProxyType({
+                question["id"]: MappingProxyType({option: index for index, option in enumerate(question.get("options", ()))})
+                for question in frozen
+            }),
+        )
+    
+    def get_all_questions(self) -> Tuple[Mapping[str, Any], ...]:
         """Get all questions."""
         return self.questions
     
-    def get_question_by_id(self, question_id: str) -> Optional[Dict[str, Any]]:
+    def get_question_by_id(self, question_id: str) -> Optional[Mapping[str, Any]]:
         """Get a question by its ID."""
-        return self.questions_by_id.get(question_id)
+        index = self.index_by_id.get(question_id)
+        return self.questions[index] if index is not None else None
     
-    def get_question_by_index(self, index: int) -> Optional[Dict[str, Any]]:
+    def get_question_by_index(self, index: int) -> Optional[Mapping[str, Any]]:
         """Get a question by its index."""
         if 0 <= index < len(self.questions):
             return self.questions[index]
@@ -105,17 +117,17 @@ class QuizService:
     
     def get_question_index(self, question_id: str) -> Optional[int]:
         """Get the index of a question by its ID."""
-        for i, question in enumerate(self.questions):
-            if question["id"] == question_id:
-                return i
-        return None
+        return self.index_by_id.get(question_id)
     
-    def get_question_options(self, question_id: str) -> List[str]:
+    def get_question_options(self, question_id: str) -> Tuple[str, ...]:
         """Get the options for a question."""
         question = self.get_question_by_id(question_id)
-        if question and "options" in question:
-            return question["options"]
-        return []
+        return question.get("options", ()) if question else ()
+    
+    def get_option_index(self, question_id: str, answer: str) -> Optional[int]:
+        """Get the index of an answer among the options of a question, or None if it is not an option."""
+        option_index = self.option_index_by_id.get(question_id)
+        return option_index.get(answer) if option_index is not None else None
     
     def get_total_questions(self) -> int:
         """Get the total number of questions."""
@@ -126,28 +138,300 @@ class QuizService:
         question = self.get_question_by_id(question_id)
         if not question:
             return False
-            
+        
         if question["type"] == "single_choice":
-            return answer in question["options"]
+            return answer in self.options_by_id[question_id]
         elif question["type"] == "text_input":
             # Text input validation could be more complex
             return bool(answer.strip())
         elif question["type"] == "optional_text":
-            if answer in question["options"]:
-                return True
             # If the answer is not an option, it might be follow-up text
-            return bool(answer.strip())
+            return answer in self.options_by_id[question_id] or bool(answer.strip())
         
         return False
     
-    def create_new_session(self) -> str:
-        """Create a new quiz session."""
-        return str(uuid.uuid4())
-    
-    def format_question_text(self, question: Dict[str, Any]) -> str:
+    def format_question_text(self, question: Mapping[str, Any]) -> str:
         """Format the question text for display."""
         if question["type"] == "text_input" and "placeholder" in question:
             if self.language == "de":
                 return f"{question['text']}\n(Format: {question['placeholder']})"
             return f"{question['text']}\n(Формат: {question['placeholder']})"
-        return question["text"] 
\ No newline at end of file
+        return question["text"]
+    
+    def is_asked(self, index: int, responses: Mapping[str, str]) -> bool:
+        """Check if a question is asked given the answers to the questions before it."""
+        return all(responses.get(question_id) in options for question_id, options in self.conditions[index])
+    
+    def get_next_index(self, index: int, responses: Mapping[str, str]) -> Optional[int]:
+        """Get the index of the question asked after a question, or None if it is the last one asked."""
+        for candidate in self.next_candidates[index]:
+            if self.is_asked(candidate, responses):
+                return candidate
+        return None
+    
+    def get_previous_index(self, index: int, responses: Mapping[str, str]) -> Optional[int]:
+        """Get the index of the question asked before a question, or None if it is the first one.
+        
+        The index after the last question gives the last question asked.
+        """
+        for candidate in self.previous_candidates[index]:
+            if self.is_asked(candidate, responses):
+                return candidate
+        return None
+    
+    def get_asked_responses(self, responses: Mapping[str, str]) -> Dict[str, str]:
+        """Get the answers to the questions asked, in question order.
+        
+        Answers to questions that an earlier changed answer now skips are dropped.
+        """
+        asked: Dict[str, str] = {}
+        for index, question in enumerate(self.questions):
+            question_id = question["id"]
+            if question_id in responses and self.is_asked(index, asked):
+                asked[question_id] = responses[question_id]
+        return asked
+
+
+def build_catalogs(artifact: Mapping[str, Any]) -> Mapping[str, QuizCatalog]:
+    """Build the catalog of every language of a compiled quiz artifact."""
+    return MappingProxyType({
+        language: QuizCatalog.from_questions(language, questions, artifact["version"], artifact.get("graph"))
+        for language, questions in artifact["languages"].items()
+    })
+
+
+class QuizRegistry:
+    """Catalogs of the quiz versions in use, reloaded atomically when the quiz files change.
+    
+    Every load of changed quiz files is a new version, and sessions stay on the version they started with.
+    Versions no session uses are evicted from memory, and read back from the versions directory when
+    an older quiz response needs them again.
+    """
+    
+    def __init__(
+        self,
+        files: Mapping[str, Path],
+        artifact_path: Path,
+        versions_dir: Path,
+        check_interval: float = 5.0,
+        session_ttl: float = 86400.0,
+    ):
+        """Initialize the registry; the quiz is loaded on first use."""
+        self.files = dict(files)
+        self.artifact_path = Path(artifact_path)
+        self.versions_dir = Path(versions_dir)
+        self.check_interval = check_interval
+        self.session_ttl = session_ttl
+        self.version: Optional[str] = None
+        self._catalogs: Dict[str, Mapping[str, QuizCatalog]] = {}
+        self._pins: Dict[str, Tuple[str, float]] = {}  # Session id to its version and when it started
+        self._mtimes: Optional[Tuple[Optional[int], ...]] = None
+        self._watcher: Optional[asyncio.Task] = None
+    
+    def _stat(self) -> Tuple[Optional[int], ...]:
+        """Get the modification times of the quiz files and the artifact."""
+        mtimes = []
+        for path in (*self.files.values(), self.artifact_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def _load(self) -> Dict[str, Any]:
+        """Load the artifact of the current quiz files, compiling them if the artifact is older."""
+        artifact = read_artifact(self.artifact_path, self.files)
+        if artifact is not None:
+            return artifact
+        
+        if self.version is None:
+            logger.warning(f"No up-to-date quiz artifact at {self.artifact_path}, compiling the quiz files")
+        artifact = compile_quiz(self.files, DEFAULT_LANGUAGE)
+        try:
+            write_artifact(artifact, self.artifact_path)
+        except OSError as e:
+            logger.warning(f"Could not write quiz artifact {self.artifact_path}: {str(e)}")
+        return artifact
+    
+    def _archive(self, artifact: Mapping[str, Any]) -> None:
+        """Keep a copy of a version, so reports of its sessions can be written after it is evicted."""
+        path = self.versions_dir / f"{artifact['version']}.json"
+        if path.exists():
+            return
+        try:
+            self.versions_dir.mkdir(parents=True, exist_ok=True)
+            write_artifact(artifact, path)
+        except OSError as e:
+            logger.warning(f"Could not archive quiz version {artifact['version']}: {str(e)}")
+    
+    def _prepare(self) -> Optional[Tuple[Tuple[Optional[int], ...], Optional[Mapping[str, QuizCatalog]]]]:
+        """Load, archive and build a new version if the quiz files changed, without switching to it.
+        
+        Returns None if the files are unchanged, else their modification times and the catalogs of the
+        new version, or None in place of the catalogs if the files are invalid or hold the current version.
+        Leaves the catalogs in use alone, so it can run in a worker thread.
+        Raises QuizDefinitionError if the quiz files are not valid on the first load; on later loads
+        the errors are logged and the current version stays in use.
+        """
+        mtimes = self._stat()
+        if mtimes == self._mtimes:
+            return None
+        
+        try:
+            artifact = self._load()
+        except QuizDefinitionError as e:
+            if self.version is None:
+                raise
+            # Keep serving the current version until the files change again
+            for error in e.errors:
+                logger.error(f"Quiz files not reloaded: {error}")
+            metrics.increment("quiz_reload_errors")
+            return mtimes, None
+        
+        if artifact["version"] == self.version:
+            return mtimes, None
+        self._archive(artifact)
+        return mtimes, build_catalogs(artifact)
+    
+    def _switch(self, mtimes: Tuple[Optional[int], ...], catalogs: Optional[Mapping[str, QuizCatalog]]) -> bool:
+        """Switch to the catalogs of a prepared version, returning whether the version changed."""
+        self._mtimes = mtimes
+        if catalogs is None:
+            return False
+        version = next(iter(catalogs.values())).version
+        if version == self.version:
+            return False
+        
+        # Add the catalogs before switching to them so readers never see a version without catalogs
+        self._catalogs[version] = catalogs
+        previous, self.version = self.version, version
+        self._evict()
+        
+        questions = ", ".join(f"{catalog.get_total_questions()} {language}" for language, catalog in catalogs.items())
+        if previous is None:
+            logger.info(f"Loaded quiz version {version} with {questions} questions")
+        else:
+            metrics.increment("quiz_reloads")
+            logger.info(f"Reloaded quiz version {version} with {questions} questions, replacing {previous}")
+        return True
+    
+    def reload_if_changed(self) -> bool:
+        """Load the quiz files as a new version if they were modified since the last load.
+        
+        Compiles on the calling thread; the running bot checks for changes with watch() instead.
+        Raises QuizDefinitionError if the quiz files are not valid on the first load.
+        """
+        prepared = self._prepare()
+        return prepared is not None and self._switch(*prepared)
+    
+    def start(self) -> None:
+        """Start checking the quiz files for changes in the background if it is not running yet."""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self.watch(), name="quiz-reload")
+    
+    async def stop(self) -> None:
+        """Stop checking the quiz files for changes."""
+        if self._watcher is None:
+            return
+        self._watcher.cancel()
+        await asyncio.gather(self._watcher, return_exceptions=True)
+        self._watcher = None
+    
+    async def watch(self) -> None:
+        """Check the quiz files every check_interval seconds, compiling changed files in a worker thread.
+        
+        Only the switch to the new catalogs runs on the event loop, so handlers never wait for a compile.
+        """
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                prepared = await asyncio.to_thread(self._prepare)
+            except Exception as e:
+                logger.error(f"Failed to check the quiz files for changes: {str(e)}")
+                continue
+            if prepared is not None:
+                self._switch(*prepared)
+    
+    def _get_catalogs(self, version: Optional[str]) -> Mapping[str, QuizCatalog]:
+        """Get the catalogs of a version, reading it back from the versions directory if it was evicted."""
+        catalogs = self._catalogs.get(version or self.version)
+        if catalogs is not None:
+            return catalogs
+        
+        artifact = load_artifact(self.versions_dir / f"{version}.json") if VERSION_PATTERN.match(version) else None
+        if artifact is None:
+            logger.warning(f"Quiz version {version} is not available, using version {self.version}")
+            metrics.increment("quiz_version_missing")
+            return self._catalogs[self.version]
+        
+        # Kept until the next eviction, so the steps of one report read it only once
+        catalogs = self._catalogs[version] = build_catalogs(artifact)
+        metrics.increment("quiz_version_restores")
+        return catalogs
+    
+    def get_catalog(self, language: Optional[str] = None, version: Optional[str] = None) -> QuizCatalog:
+        """Get the catalog of a language in a version, the current version if none is given.
+        
+        Unsupported languages get the catalog of the default language. The quiz is loaded on the first call;
+        later changes are picked up by watch().
+        """
+        if self.version is None:
+            self.reload_if_changed()
+        catalogs = self._get_catalogs(version)
+        
+        catalog = catalogs.get(language or DEFAULT_LANGUAGE)
+        if catalog is None:
+            logger.error(f"Language not supported: {language}, defaulting to {DEFAULT_LANGUAGE}")
+            catalog = catalogs[DEFAULT_LANGUAGE]
+        return catalog
+    
+    def pin(self, session_id: str, version: str) -> None:
+        """Keep the version of a session in memory until the session is released."""
+        self._pins[session_id] = (version, time.monotonic())
+    
+    def release(self, session_id: Optional[str]) -> None:
+        """Release the version of a finished or abandoned session, evicting it if no other session uses it."""
+        if self._pins.pop(session_id, None) is not None:
+            self._evict()
+    
+    def _evict(self) -> None:
+        """Evict the versions that are neither current nor used by a session started within the session TTL."""
+        now = time.monotonic()
+        for session_id, (_, pinned_at) in list(self._pins.items()):
+            if now - pinned_at > self.session_ttl:
+                del self._pins[session_id]
+        
+        in_use = {self.version} | {version for version, _ in self._pins.values()}
+        for version in list(self._catalogs):
+            if version not in in_use:
+                del self._catalogs[version]
+                metrics.increment("quiz_versions_evicted")
+                logger.info(f"Evicted quiz version {version}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the current version, the versions in memory and the sessions keeping them there."""
+        return {
+            "quiz_version": self.version,
+            "quiz_versions_in_memory": len(self._catalogs),
+            "quiz_sessions_pinned": len(self._pins),
+        }
+
+
+# Create the process-wide quiz registry
+quiz_registry = QuizRegistry(
+    settings.quiz_files,
+    settings.quiz_artifact,
+    settings.quiz_versions_dir,
+    settings.quiz_reload_interval,
+    settings.quiz_session_ttl,
+)
+
+
+def get_catalog(language: Optional[str] = None, version: Optional[str] = None) -> QuizCatalog:
+    """Get the catalog of a language in a quiz version, the current version if none is given."""
+    return quiz_registry.get_catalog(language, version)
+
+
+def create_new_session() -> str:
+    """Create a new quiz session ID."""
+    return str(uuid.uuid4())
@@ -0,0 +1,96 @@
+"""
+Report cache for the Hospital Quiz Bot.
+This module provides a two-tier (memory and database) cache of generated reports keyed by content hash.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hospital_quiz_bot.app.database.repository import ReportCacheRepository
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+class ReportCache:
+    """LRU memory cache backed by the report_cache table."""
+    
+    def __init__(self, max_entries: int):
+        """Initialize the cache with the size of the memory tier."""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(responses: Dict[str, str], language: str, fingerprint: str) -> str:
+        """Build a canonical cache key for a set of answers."""
+        payload = json.dumps(
+            {"responses": responses, "language": language, "fingerprint": fingerprint},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _remember(self, key: str, report: str) -> None:
+        """Put a report in the memory tier, evicting the least recently used entry."""
+        self._entries[key] = report
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def contains(self, key: str) -> bool:
+        """Check whether the memory tier holds a report, without counting a lookup."""
+        return key in self._entries
+    
+    async def get(self, session: AsyncSession, key: str) -> Optional[str]:
+        """Look a report up in memory, then in the database."""
+        report = self._entries.get(key)
+        if report is not None:
+            self._entries.move_to_end(key)
+            metrics.increment("report_cache_hits_memory")
+            return report
+        
+        repo = ReportCacheRepository(session)
+        entry = await repo.get_by_key(key)
+        if entry:
+            await repo.record_hit(key)
+            await repo.commit()
+            self._remember(key, entry.report)
+            metrics.increment("report_cache_hits_db")
+            return entry.report
+        
+        metrics.increment("report_cache_misses")
+        return None
+    
+    async def put(self, session: AsyncSession, key: str, language: str, report: str) -> None:
+        """Store a report in both tiers."""
+        self._remember(key, report)
+        try:
+            repo = ReportCacheRepository(session)
+            await repo.upsert(key, language, report)
+            await repo.commit()
+        except Exception as e:
+            # The memory tier still works if the database write fails
+            logger.error(f"Failed to persist cached report: {str(e)}")
+            await session.rollback()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit and miss statistics, including the latency saved by hits."""
+        hits = metrics.get_counter("report_cache_hits_memory") + metrics.get_counter("report_cache_hits_db")
+        misses = metrics.get_counter("report_cache_misses")
+        lookups = hits + misses
+        llm_p50 = metrics.percentile("report_llm_ms", 50)
+        return {
+            "cache_entries_memory": len(self._entries),
+            "cache_hit_rate": hits / lookups * 100 if lookups else None,
+            "cache_llm_calls_saved": hits,
+            "cache_seconds_saved_est": hits * llm_p50 / 1000 if llm_p50 is not None else None,
+        }
+
+
+# Create the process-wide report cache
+report_cache = ReportCache(max_entries=settings.report.cache_size)
@@ -0,0 +1,226 @@
+"""
+Report scheduler for the Hospital Quiz Bot.
+This module provides a bounded, fair queue for report generation jobs.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+class QueueFullError(Exception):
+    """Raised when the report queue has no room for another job."""
+
+
+@dataclass
+class ReportJob:
+    """A queued report generation job."""
+    key: str
+    user_id: int
+    factory: Callable[[], Awaitable[Any]]
+    # Called when the job is aborted for running longer than the job timeout
+    on_timeout: Optional[Callable[[], Awaitable[Any]]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Set when the job is cancelled, so the worker can tell it from its own cancellation
+    cancel_reason: Optional[str] = None
+
+
+class ReportScheduler:
+    """Runs report jobs with a concurrency limit and round-robin fairness across users.
+    
+    Jobs are keyed by quiz session and can be cancelled while queued or running. A running job
+    is run as its own task, so cancelling it aborts its API calls and frees its slot at once.
+    """
+    
+    def __init__(self, max_concurrent: int, max_queue_size: int, job_timeout: Optional[float] = None):
+        """Initialize the scheduler with its limits."""
+        self.max_concurrent = max_concurrent
+        self.max_queue_size = max_queue_size
+        self.job_timeout = job_timeout
+        
+        # Per-user queues; the order of keys is the round-robin order
+        self._queues: "OrderedDict[int, Deque[ReportJob]]" = OrderedDict()
+        self._pending = 0
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        # Running jobs and their tasks by job key
+        self._running: Dict[str, Tuple[ReportJob, asyncio.Task]] = {}
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free slot."""
+        return self._pending
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently running."""
+        return self._in_flight
+    
+    def start(self) -> None:
+        """Start the worker tasks if they are not running yet."""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"report-worker-{i}")
+            for i in range(self.max_concurrent)
+        ]
+        logger.info(f"Report scheduler started with {self.max_concurrent} workers")
+    
+    async def stop(self) -> None:
+        """Stop the worker tasks and drop queued jobs."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues.clear()
+        self._pending = 0
+        logger.info("Report scheduler stopped")
+    
+    def has_capacity(self) -> bool:
+        """Check whether a new job would start without waiting."""
+        return self._in_flight + self._pending < self.max_concurrent
+    
+    def submit(
+        self,
+        user_id: int,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        on_timeout: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> int:
+        """Queue a job and return the number of queued jobs ahead of it.
+        
+        Raises QueueFullError when the queue is at capacity.
+        """
+        if self._pending >= self.max_queue_size:
+            metrics.increment("report_queue_rejected")
+            raise QueueFullError(f"Report queue is full ({self._pending} jobs)")
+        
+        self.start()
+        
+        ahead = self._pending
+        self._queues.setdefault(user_id, deque()).append(ReportJob(key, user_id, factory, on_timeout))
+        self._pending += 1
+        metrics.increment("report_queue_submitted")
+        self._wakeup.set()
+        
+        logger.info(f"Queued report job {key} for user {user_id} (queue depth {self._pending})")
+        return ahead
+    
+    def is_active(self, key: str) -> bool:
+        """Check whether the job of a session is queued or running."""
+        return key in self._running or any(job.key == key for queue in self._queues.values() for job in queue)
+    
+    def cancel(self, key: Optional[str], reason: str) -> bool:
+        """Cancel the queued or running job of a session, returning whether there was one."""
+        if not key:
+            return False
+        
+        if key in self._running:
+            job, task = self._running[key]
+            if job.cancel_reason is None:
+                job.cancel_reason = reason
+                task.cancel()
+            return True
+        
+        for user_id, queue in self._queues.items():
+            for job in queue:
+                if job.key == key:
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[user_id]
+                    self._pending -= 1
+                    self._count_cancelled(job, reason)
+                    return True
+        return False
+    
+    def _count_cancelled(self, job: ReportJob, reason: str) -> None:
+        """Record a cancelled job."""
+        metrics.increment("report_jobs_cancelled")
+        metrics.increment(f"report_jobs_cancelled_{reason}")
+        logger.info(f"Cancelled report job {job.key} ({reason})")
+    
+    def _next_job(self) -> Optional[ReportJob]:
+        """Take the next job, rotating between users."""
+        if not self._queues:
+            return None
+        
+        user_id, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user_id)
+        else:
+            del self._queues[user_id]
+        self._pending -= 1
+        return job
+    
+    async def _worker(self) -> None:
+        """Take jobs from the queue and run them one at a time."""
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+            metrics.observe("report_queue_wait_ms", wait_ms)
+            
+            self._in_flight += 1
+            task = asyncio.ensure_future(job.factory())
+            self._running[job.key] = (job, task)
+            try:
+                await asyncio.wait_for(task, timeout=self.job_timeout)
+                metrics.increment("report_jobs_completed")
+            except asyncio.CancelledError:
+                if job.cancel_reason is None:
+                    # The worker itself is being stopped
+                    raise
+                self._count_cancelled(job, job.cancel_reason)
+            except asyncio.TimeoutError:
+                # wait_for has cancelled the job and waited for it to finish
+                self._count_cancelled(job, "timeout")
+                await self._notify_timeout(job)
+            except Exception as e:
+                metrics.increment("report_jobs_failed")
+                logger.error(f"Report job {job.key} failed: {str(e)}")
+            finally:
+                self._running.pop(job.key, None)
+                self._in_flight -= 1
+    
+    async def _notify_timeout(self, job: ReportJob) -> None:
+        """Run the timeout callback of a job that was aborted."""
+        if job.on_timeout is None:
+            return
+        try:
+            await job.on_timeout()
+        except Exception as e:
+            logger.error(f"Timeout callback of report job {job.key} failed: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the current queue statistics."""
+        return {
+            "queue_depth": self._pending,
+            "queue_users": len(self._queues),
+            "in_flight": self._in_flight,
+            "cancelled": metrics.get_counter("report_jobs_cancelled"),
+            "max_concurrent": self.max_concurrent,
+            "max_queue_size": self.max_queue_size,
+            "queue_wait_ms_p50": metrics.percentile("report_queue_wait_ms", 50),
+            "queue_wait_ms_p95": metrics.percentile("report_queue_wait_ms", 95),
+        }
+
+
+# Create the process-wide scheduler
+report_scheduler = ReportScheduler(
+    max_concurrent=settings.report.max_concurrent,
+    max_queue_size=settings.report.max_queue_size,
+    job_timeout=settings.report.job_timeout or None,
+)
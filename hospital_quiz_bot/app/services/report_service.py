@@ -3,48 +3,147 @@ Report service for the Hospital Quiz Bot.
 This module provides functionality for generating medical reports from quiz responses.
 """
 
-from typing import Dict, Any, Optional, List
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional, List, Sequence, Tuple, Union
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from hospital_quiz_bot.app.models.quiz_response import QuizResponse
 from hospital_quiz_bot.app.database.repository import QuizResponseRepository
-from hospital_quiz_bot.app.services.openai_service import OpenAIService
-from hospital_quiz_bot.app.services.quiz_service import QuizService
+from hospital_quiz_bot.app.services.experiments import assign_variant, get_variant_prompt
+from hospital_quiz_bot.app.services.model_router import RouteDecision, model_router
+from hospital_quiz_bot.app.services.openai_service import (
+    REPORT_PROMPT,
+    STRUCTURED_PROMPT,
+    GeneratedReport,
+    OpenAIService,
+    ReportUsage,
+    build_report_format,
+    get_openai_service,
+)
+from hospital_quiz_bot.app.services.quiz_compiler import QUESTION_SECTIONS
+from hospital_quiz_bot.app.services.quiz_service import get_catalog
+from hospital_quiz_bot.app.services.report_cache import report_cache
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler
+from hospital_quiz_bot.app.services.report_speculator import report_speculator
+from hospital_quiz_bot.app.services.single_flight import report_flights
+from hospital_quiz_bot.app.services.template_report import template_engine
+from hospital_quiz_bot.app.services.usage_service import BudgetExceededError, UsageService
+from hospital_quiz_bot.app.utils.formatters import format_template_report_note
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
 from hospital_quiz_bot.config.logging_config import logger
 
+# Recorded as the report model of reports rendered from templates
+TEMPLATE_MODEL = "template"
+
+# Sections of sectioned reports in report order; questions name their section in quizes.yaml
+REPORT_SECTIONS = QUESTION_SECTIONS
+
+# Section that draws its conclusions from all answers rather than those of its own questions
+SUMMARY_SECTION = "conclusion"
+
 
 class ReportService:
     """Service for generating reports from quiz responses."""
     
-    def __init__(self, session: AsyncSession, language: str = "uk"):
+    def __init__(self, session: AsyncSession, language: str = "uk", openai_service: Optional[OpenAIService] = None):
         """Initialize the report service."""
         self.session = session
         self.quiz_response_repo = QuizResponseRepository(session)
-        self.openai_service = OpenAIService()
-        self.quiz_service = QuizService(language)
-        self.quiz_service.set_language(language)
+        self._openai_service = openai_service
         self.language = language
     
-    async def generate_report_from_session(self, session_id: str) -> Optional[str]:
+    @property
+    def openai_service(self) -> OpenAIService:
+        """Get the OpenAI service, created only when a report is actually generated."""
+        if self._openai_service is None:
+            self._openai_service = get_openai_service()
+        return self._openai_service
+    
+    async def generate_report_from_session(
+        self,
+        session_id: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        template_reason: Optional[str] = None,
+    ) -> Optional[str]:
         """Generate a report from a quiz session."""
         quiz_response = await self.quiz_response_repo.get_by_session_id(session_id)
         if not quiz_response:
             logger.error(f"Quiz session not found: {session_id}")
             return None
         
-        # Set language from quiz response
-        language = quiz_response.language or "uk"
-        self.quiz_service.set_language(language)
-            
-        return await self.generate_report(quiz_response)
+        return await self.generate_report(quiz_response, on_delta=on_delta, template_reason=template_reason)
     
-    async def generate_report(self, quiz_response: QuizResponse) -> Optional[str]:
-        """Generate a report from a quiz response."""
+    async def generate_report(
+        self,
+        quiz_response: QuizResponse,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        template_reason: Optional[str] = None,
+    ) -> Optional[str]:
+        """Generate a report from a quiz response.
+        
+        If on_delta is given, the report is streamed and each text delta is passed to it.
+        If template_reason is given, the report is rendered from a template instead of the LLM.
+        Concurrent calls for a session share one generation, which only streams to the first caller.
+        """
         if not quiz_response.is_complete:
             logger.warning(f"Quiz is not complete: {quiz_response.id}")
             return None
-            
+        
+        return await report_flights.run(
+            quiz_response.session_id,
+            lambda: self._generate_report_once(quiz_response, on_delta, template_reason),
+        )
+    
+    async def _generate_report_once(
+        self,
+        quiz_response: QuizResponse,
+        on_delta: Optional[Callable[[str], Awaitable[None]]],
+        template_reason: Optional[str],
+    ) -> Optional[str]:
+        """Generate the report while holding its claim in the database, or return the report another process wrote.
+        
+        While another process holds the claim, this waits for its report, and takes over if the claim is released or expires.
+        """
+        if not await self._claim_report(quiz_response):
+            metrics.increment("report_claims_waited")
+            logger.info(f"Report for quiz {quiz_response.id} is being generated elsewhere, waiting for it")
+            while not await self._claim_report(quiz_response):
+                await self.session.refresh(quiz_response)
+                if quiz_response.report:
+                    return quiz_response.report
+                await asyncio.sleep(settings.report.claim_poll_interval)
+        
+        try:
+            return await self._generate_and_save(quiz_response, on_delta, template_reason)
+        finally:
+            if not quiz_response.report:
+                await self._release_claim(quiz_response)
+    
+    async def _claim_report(self, quiz_response: QuizResponse) -> bool:
+        """Claim the generation of a report, failing if it exists or another claim is still valid."""
+        claimed = await self.quiz_response_repo.claim_report(quiz_response.id, settings.report.claim_ttl)
+        await self.quiz_response_repo.commit()
+        return claimed
+    
+    async def _release_claim(self, quiz_response: QuizResponse) -> None:
+        """Release the claim on a report that was not generated, so a retry does not wait for it to expire."""
+        try:
+            await self.quiz_response_repo.release_report_claim(quiz_response.id)
+            await self.quiz_response_repo.commit()
+        except Exception as e:
+            logger.error(f"Failed to release report claim of quiz {quiz_response.id}: {str(e)}")
+    
+    async def _generate_and_save(
+        self,
+        quiz_response: QuizResponse,
+        on_delta: Optional[Callable[[str], Awaitable[None]]],
+        template_reason: Optional[str],
+    ) -> Optional[str]:
+        """Generate a report and save it on the quiz response, returning None if no report could be generated."""
         try:
             # Format the responses for the prompt
             formatted_responses = self._format_responses_for_prompt(quiz_response)
@@ -52,31 +151,429 @@ class ReportService:
             # Get the language from the quiz response
             language = quiz_response.language or "uk"
             
-            # Generate the report - use synchronous method
-            # Important: Don't use the async/await pattern here since we've made the OpenAI call synchronous
-            report = self.openai_service.generate_report(formatted_responses, language=language)
+            # The prompt variant of a running prompt experiment, if the session takes part in one
+            variant = self._get_variant(quiz_response)
+            prompt = get_variant_prompt(variant) if variant else REPORT_PROMPT
             
-            if report:
-                # Save the report
-                quiz_response.report = report
-                await self.quiz_response_repo.update(quiz_response)
-                await self.quiz_response_repo.commit()
-                
-                logger.info(f"Generated report for quiz: {quiz_response.id} in language: {language}")
-                
-            return report
+            if template_reason:
+                report_speculator.discard(quiz_response.session_id, "template")
+                report = self._generate_template_report(quiz_response, template_reason)
+                if report and on_delta is not None:
+                    await on_delta(report)
+                return await self._save_report(quiz_response, report, TEMPLATE_MODEL)
+            
+            # Reuse a report generated from identical answers if there is one
+            cache_key = self._get_cache_key(quiz_response, prompt)
+            report = None
+            report_sections = None
+            usage = None
+            # Only reports of the preferred model are cached, and its model is part of the cache key
+            report_model = self.openai_service.model
+            if cache_key:
+                report = await report_cache.get(self.session, cache_key)
+                if report and settings.report.structured:
+                    # Structured reports are cached as their sections
+                    report_sections = json.loads(report)
+                    report = self._join_sections(report_sections)
+                if report:
+                    report_speculator.discard(quiz_response.session_id, "cache_hit")
+                    if on_delta is not None:
+                        await on_delta(report)
+            
+            if not report:
+                # Use the report generated while the summary was reviewed, if there is one
+                generated = await self._take_speculative(quiz_response.session_id, formatted_responses)
+                if generated and on_delta is not None:
+                    await on_delta(generated.text)
+                if not generated:
+                    # Budgets are checked before any call is made
+                    await UsageService(self.session).check_budget(quiz_response.user_id)
+                    sections = self._get_sections(quiz_response)
+                    generated = await self._generate_text(formatted_responses, language, on_delta, sections, prompt)
+                report, report_model, report_sections, usage = generated
+                # A report from a fallback model would otherwise be served after the preferred model recovers
+                if report and cache_key and report_model == self.openai_service.model:
+                    cached = json.dumps(report_sections, ensure_ascii=False) if report_sections else report
+                    await report_cache.put(self.session, cache_key, language, cached)
+            
+            return await self._save_report(quiz_response, report, report_model, report_sections, usage, variant)
         except Exception as e:
             logger.error(f"Error in generate_report: {str(e)}")
-            return f"Помилка генерації звіту: {str(e)}"
+            if settings.report.template_fallback:
+                # A template report is more useful to the clinician than an error
+                reason = "budget" if isinstance(e, BudgetExceededError) else "llm_error"
+                report = self._generate_template_report(quiz_response, reason)
+                if report:
+                    try:
+                        return await self._save_report(quiz_response, report, TEMPLATE_MODEL)
+                    except Exception as save_error:
+                        logger.error(f"Failed to save template report: {str(save_error)}")
+                        return report
+            # Callers tell the user in their language; the error itself stays in the log
+            return None
     
-    def _format_responses_for_prompt(self, quiz_response: QuizResponse) -> str:
-        """Format the responses for the OpenAI prompt."""
-        formatted_lines = []
+    async def _save_report(
+        self,
+        quiz_response: QuizResponse,
+        report: Optional[str],
+        report_model: str,
+        report_sections: Optional[Dict[str, str]] = None,
+        usage: Optional[ReportUsage] = None,
+        variant: Optional[str] = None,
+    ) -> Optional[str]:
+        """Save a generated report on the quiz response, along with the model that wrote it, its sections, its usage
+        and the prompt variant it was written with."""
+        if report:
+            quiz_response.report = report
+            quiz_response.report_model = report_model
+            quiz_response.report_sections = report_sections
+            quiz_response.prompt_tokens = usage.prompt_tokens if usage else None
+            quiz_response.completion_tokens = usage.completion_tokens if usage else None
+            quiz_response.cached_tokens = usage.cached_tokens if usage else None
+            quiz_response.report_cost = usage.cost if usage else None
+            quiz_response.report_latency_ms = usage.latency_ms if usage else None
+            quiz_response.prompt_variant = variant
+            await self.quiz_response_repo.update(quiz_response)
+            await self.quiz_response_repo.commit()
+            
+            if variant:
+                metrics.increment(f"report_variant_{variant}")
+                if usage:
+                    metrics.observe(f"report_variant_{variant}_ms", usage.latency_ms)
+            
+            logger.info(
+                f"Generated report for quiz: {quiz_response.id} in language: {quiz_response.language or 'uk'} "
+                f"with model: {report_model}"
+            )
+        
+        return report
+    
+    @staticmethod
+    def get_template_reason() -> Optional[str]:
+        """Get the reason to serve a template report instead of calling the LLM, if there is one."""
+        if settings.report.engine == "template":
+            return "on_demand"
+        if not settings.report.template_fallback:
+            return None
+        
+        if model_router.is_unavailable():
+            return "breaker_open"
+        
+        queue_depth = report_scheduler.queue_depth
+        if queue_depth >= settings.report.fallback_queue_depth:
+            return "queue_depth"
+        
+        # Expected time a new report would wait for a free slot
+        llm_p50 = metrics.percentile("report_llm_ms", 50)
+        if llm_p50 and queue_depth / report_scheduler.max_concurrent * llm_p50 / 1000 > settings.report.fallback_max_wait:
+            return "latency"
+        
+        return None
+    
+    def render_template_report(self, quiz_response: QuizResponse) -> Optional[str]:
+        """Render a report from the answers with the template engine."""
+        started = time.monotonic()
+        report = template_engine.render(quiz_response.get_all_responses(), quiz_response.language or "uk")
+        metrics.observe("template_render_ms", (time.monotonic() - started) * 1000)
+        return report
+    
+    def _generate_template_report(self, quiz_response: QuizResponse, reason: str) -> Optional[str]:
+        """Render a template report, prefixed with a note on why it was not written by the LLM."""
+        report = self.render_template_report(quiz_response)
+        if not report:
+            return None
+        
+        metrics.increment(f"template_reports_{reason}")
+        logger.info(f"Serving template report for quiz {quiz_response.id} ({reason})")
+        note = format_template_report_note(reason, quiz_response.language or "uk")
+        return f"{note}\n\n{report}" if note else report
+    
+    async def speculate_report_for_session(self, session_id: str) -> bool:
+        """Start generating the report of a quiz that is waiting for confirmation."""
+        if not report_speculator.can_start():
+            return False
+        
+        quiz_response = await self.quiz_response_repo.get_by_session_id(session_id)
+        if not quiz_response:
+            return False
+        
+        # A speculative report costs as much as any other
+        if await UsageService(self.session).get_budget_reason(quiz_response.user_id):
+            return False
+        
+        language = quiz_response.language or "uk"
+        formatted_responses = self._format_responses_for_prompt(quiz_response)
+        sections = self._get_sections(quiz_response)
+        # Variants are assigned by session, so the confirmed report uses the same prompt
+        variant = self._get_variant(quiz_response)
+        prompt = get_variant_prompt(variant) if variant else REPORT_PROMPT
+        
+        # Identical answers will be served from the cache on confirm
+        cache_key = self._get_cache_key(quiz_response, prompt)
+        if cache_key and report_cache.contains(cache_key):
+            return False
+        
+        return report_speculator.start(
+            session_id,
+            formatted_responses,
+            self.openai_service.count_prompt_tokens(formatted_responses, language, prompt),
+            lambda: self._generate_text(formatted_responses, language, sections=sections, prompt=prompt),
+        )
+    
+    async def _take_speculative(self, session_id: str, formatted_responses: str) -> Optional[GeneratedReport]:
+        """Wait for the speculative report of a session, if one was started from the same answers."""
+        task = report_speculator.take(session_id, formatted_responses)
+        if task is None:
+            return None
+        
+        try:
+            return await task
+        except Exception as e:
+            logger.warning(f"Speculative report for session {session_id} failed, generating again: {str(e)}")
+            return None
+    
+    async def _generate_text(
+        self,
+        formatted_responses: str,
+        language: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        sections: Optional[Dict[str, str]] = None,
+        prompt: str = REPORT_PROMPT,
+    ) -> GeneratedReport:
+        """Generate the report text with the LLM without blocking the event loop.
+        
+        Whole reports are written with the given prompt. If sections is given, each section is generated
+        from its own patient data instead, or for structured reports, repaired with it when the section fails validation.
+        """
+        started = time.monotonic()
+        decisions: List[RouteDecision] = []
+        usage = ReportUsage()
+        report_sections = None
+        if sections and settings.report.structured:
+            report_sections = await self._generate_structured(formatted_responses, sections, language, decisions, usage)
+            report = self._join_sections(report_sections)
+            # Partial JSON is not worth showing, so the report is passed on once it is valid
+            if on_delta is not None:
+                await on_delta(report)
+        elif sections:
+            report = await self._generate_sections(sections, language, decisions, usage, on_delta)
+        elif on_delta is not None:
+            chunks = []
+            async for delta in self.openai_service.stream_report(
+                formatted_responses, language=language, on_route=decisions.append, usage=usage, prompt=prompt
+            ):
+                chunks.append(delta)
+                await on_delta(delta)
+            report = "".join(chunks)
+        else:
+            report = await self.openai_service.complete_report(
+                formatted_responses, language=language, on_route=decisions.append, prompt=prompt, usage=usage
+            )
+        usage.latency_ms = (time.monotonic() - started) * 1000
+        metrics.observe("report_llm_ms", usage.latency_ms)
+        # Sections may have been routed to different models
+        models = sorted({decision.route.config.model for decision in decisions}) or [self.openai_service.model]
+        return GeneratedReport(report, ",".join(models), report_sections, usage)
+    
+    async def _generate_sections(
+        self,
+        sections: Dict[str, str],
+        language: str,
+        decisions: List[RouteDecision],
+        usage: ReportUsage,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
+        """Generate all report sections concurrently and join them in report order.
+        
+        Each section is passed to on_delta as soon as it and all sections before it are done.
+        """
+        tasks = [
+            asyncio.ensure_future(self._generate_section(name, data, language, decisions, usage))
+            for name, data in sections.items()
+        ]
+        texts = []
+        try:
+            for task in tasks:
+                text = await task
+                if on_delta is not None:
+                    await on_delta(f"\n\n{text}" if texts else text)
+                texts.append(text)
+        finally:
+            # One failed section fails the report, so the others are not needed
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return "\n\n".join(texts)
+    
+    async def _generate_section(
+        self,
+        name: str,
+        patient_data: str,
+        language: str,
+        decisions: List[RouteDecision],
+        usage: ReportUsage,
+    ) -> str:
+        """Generate one report section with its own prompt."""
+        started = time.monotonic()
+        text = await self.openai_service.complete_report(
+            patient_data, language=language, on_route=decisions.append, prompt=f"section_{name}", usage=usage
+        )
+        metrics.observe(f"report_section_{name}_ms", (time.monotonic() - started) * 1000)
+        return text.strip()
+    
+    async def _generate_structured(
+        self,
+        formatted_responses: str,
+        sections: Dict[str, str],
+        language: str,
+        decisions: List[RouteDecision],
+        usage: ReportUsage,
+    ) -> Dict[str, str]:
+        """Generate the report as JSON with one field per section, then re-request only the sections that fail validation.
+        
+        The re-requested sections use their own prompts and patient data, so a retry costs a fraction of a report.
+        """
+        names = list(sections)
+        raw = await self.openai_service.complete_report(
+            formatted_responses,
+            language=language,
+            on_route=decisions.append,
+            prompt=STRUCTURED_PROMPT,
+            response_format=build_report_format(names),
+            usage=usage,
+        )
+        report_sections = self._parse_sections(raw, names)
+        
+        failing = [name for name in names if not self._is_valid_section(name, report_sections.get(name), language)]
+        if failing:
+            metrics.increment("report_structured_repairs")
+            for name in failing:
+                metrics.increment(f"report_section_{name}_invalid")
+            logger.info(f"Re-requesting report sections that failed validation: {', '.join(failing)}")
+            texts = await asyncio.gather(
+                *(self._generate_section(name, sections[name], language, decisions, usage) for name in failing)
+            )
+            report_sections.update(zip(failing, texts))
+        
+        # In report order, whatever order the fields came in
+        return {name: report_sections[name] for name in names}
+    
+    @staticmethod
+    def _parse_sections(raw: Optional[str], names: Sequence[str]) -> Dict[str, str]:
+        """Parse the sections of a structured report, leaving out those that are missing or not text."""
+        try:
+            data = json.loads(raw or "")
+        except ValueError:
+            # A report cut off by max_tokens is not valid JSON, so every section is requested again
+            logger.warning("Structured report is not valid JSON")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {name: data[name].strip() for name in names if isinstance(data.get(name), str)}
+    
+    def _is_valid_section(self, name: str, text: Optional[str], language: str) -> bool:
+        """Check that a section has text within the tolerance of the length its section prompt asks for."""
+        if not text:
+            return False
+        
+        length_range = self.openai_service.get_length_range(language, f"section_{name}")
+        if not length_range:
+            return True
+        tolerance = settings.report.section_length_tolerance
+        return length_range[0] * (1 - tolerance) <= len(text) <= length_range[1] * (1 + tolerance)
+    
+    @staticmethod
+    def _join_sections(report_sections: Dict[str, str]) -> str:
+        """Join the sections of a structured report into its text."""
+        return "\n\n".join(text for text in report_sections.values() if text)
+    
+    def _get_cache_key(self, quiz_response: QuizResponse, prompt: str = REPORT_PROMPT) -> Optional[str]:
+        """Get the report cache key for a quiz response, or None if it must not be cached."""
+        if not settings.report.cache_enabled:
+            return None
+        
         responses = quiz_response.get_all_responses()
         language = quiz_response.language or "uk"
+        if not settings.report.cache_free_text and self._has_free_text(responses, language, quiz_response.quiz_version):
+            metrics.increment("report_cache_skipped_free_text")
+            return None
+        
+        # The question text is part of the prompt, so reports of another quiz version are not reused
+        catalog = get_catalog(language, quiz_response.quiz_version)
+        fingerprint = self.openai_service.get_fingerprint(language, self._get_prompts(prompt))
+        fingerprint = f"{fingerprint}:{settings.report.prompt_encoding}:{catalog.version}"
+        return report_cache.make_key(responses, language, fingerprint)
+    
+    @staticmethod
+    def _get_prompts(prompt: str = REPORT_PROMPT) -> Tuple[str, ...]:
+        """Get the prompts reports are currently written with, whole reports with the given prompt."""
+        if settings.report.structured:
+            # Sections failing validation are written again with their section prompts
+            return (STRUCTURED_PROMPT, *(f"section_{name}" for name in REPORT_SECTIONS))
+        if settings.report.sectioned:
+            return tuple(f"section_{name}" for name in REPORT_SECTIONS)
+        return (prompt,)
+    
+    def _get_variant(self, quiz_response: QuizResponse) -> Optional[str]:
+        """Get the prompt variant that writes the report of a session, if a prompt experiment is running.
+        
+        Sectioned and structured reports have prompts of their own and take no part in experiments,
+        nor do sessions in a language the assigned variant has no prompt for.
+        """
+        if settings.report.sectioned or settings.report.structured:
+            return None
+        
+        variant = assign_variant(quiz_response.session_id, settings.report.prompt_variants)
+        if variant and not self.openai_service.prompts.has(get_variant_prompt(variant), quiz_response.language or "uk"):
+            metrics.increment("report_variant_missing_prompt")
+            return None
+        return variant
+    
+    @staticmethod
+    def _has_free_text(responses: Dict[str, str], language: str, version: Optional[str] = None) -> bool:
+        """Check whether any answer is free text rather than a predefined option."""
+        catalog = get_catalog(language, version)
+        for question_id, answer in responses.items():
+            question = catalog.get_question_by_id(question_id)
+            if question and question["type"] == "optional_text" and catalog.get_option_index(question_id, answer) is None:
+                return True
+        return False
+    
+    def _get_sections(self, quiz_response: QuizResponse) -> Optional[Dict[str, str]]:
+        """Get the patient data of each report section if reports are written or repaired section by section."""
+        if settings.report.sectioned or settings.report.structured:
+            return self._format_sections(quiz_response)
+        return None
+    
+    def _format_sections(self, quiz_response: QuizResponse) -> Dict[str, str]:
+        """Format the responses of each report section, in report order, leaving out sections without answers."""
+        sections = {}
+        for name in REPORT_SECTIONS:
+            patient_data = self._format_responses_for_prompt(
+                quiz_response, section=None if name == SUMMARY_SECTION else name
+            )
+            if patient_data:
+                sections[name] = patient_data
+        return sections
+    
+    def _format_responses_for_prompt(
+        self,
+        quiz_response: QuizResponse,
+        encoding: Optional[str] = None,
+        section: Optional[str] = None,
+    ) -> str:
+        """Format the responses for the OpenAI prompt.
         
-        # Set the quiz service language
-        self.quiz_service.set_language(language)
+        The full encoding repeats every question sentence, compact uses the short
+        question labels, and grouped also lists the labels of questions sharing an answer together.
+        If section is given, only the questions of that report section are included.
+        """
+        encoding = encoding or settings.report.prompt_encoding
+        formatted_lines = []
+        grouped_labels: Dict[str, List[str]] = {}
+        responses = quiz_response.get_all_responses()
+        language = quiz_response.language or "uk"
+        catalog = get_catalog(language, quiz_response.quiz_version)
         
         # Get placeholder text based on language
         not_specified = "Не вказано"
@@ -85,22 +582,38 @@ class ReportService:
         
         # Map question IDs to their actual text
         for question_id, answer in responses.items():
-            question = self.quiz_service.get_question_by_id(question_id)
+            question = catalog.get_question_by_id(question_id)
+            if question and section and question.get("section") != section:
+                continue
             if question:
                 question_text = question["text"]
+                if encoding != "full":
+                    question_text = question.get("label") or question_text
                 
                 # Special case formatting for certain question types
                 if question["type"] == "text_input" and question.get("placeholder"):
                     # For questions with expected format
                     if not answer:
                         answer = not_specified
+                
+                if encoding == "grouped" and question["type"] == "single_choice":
+                    grouped_labels.setdefault(answer, []).append(question_text)
+                    continue
                         
                 formatted_lines.append(f"{question_text}: {answer}")
         
-        return "\n".join(formatted_lines)
+        # Answers shared by several questions are written once, followed by their labels
+        grouped_lines = []
+        for answer, labels in grouped_labels.items():
+            if len(labels) == 1:
+                grouped_lines.append(f"{labels[0]}: {answer}")
+            else:
+                grouped_lines.append(f"{answer}: {', '.join(labels)}")
+        
+        return "\n".join(grouped_lines + formatted_lines)
     
-    async def get_report(self, session_id: str) -> Optional[str]:
-        """Get a report for a quiz session."""
+    async def get_report(self, session_id: str) -> Optional[Union[Dict[str, Any], str]]:
+        """Get a report for a quiz session, as its sections if it was stored with them."""
         quiz_response = await self.quiz_response_repo.get_by_session_id(session_id)
         if not quiz_response:
             logger.error(f"Quiz session not found: {session_id}")
@@ -108,10 +621,11 @@ class ReportService:
             
         # If the report exists, return it
         if quiz_response.report:
-            return quiz_response.report
-            
+            return quiz_response.get_report_content()
+        
         # Otherwise, generate it
-        return await self.generate_report(quiz_response)
+        report = await self.generate_report(quiz_response)
+        return quiz_response.get_report_content() if quiz_response.report_sections else report
     
     async def get_reports_for_user(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all reports for a user."""
@@ -0,0 +1,143 @@
+"""
+Report speculator for the Hospital Quiz Bot.
+This module provides speculative report generation while a clinician reviews the quiz summary.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from hospital_quiz_bot.app.services.openai_service import GeneratedReport
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.app.utils.tokens import count_tokens
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+@dataclass
+class SpeculativeReport:
+    """A report generated before the quiz was confirmed."""
+    session_id: str
+    patient_data: str
+    prompt_tokens: int
+    task: asyncio.Task
+    completion_tokens: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    expiry: Optional[asyncio.TimerHandle] = None
+
+
+class ReportSpeculator:
+    """Starts report generation at the confirmation screen and hands the result over on confirm.
+    
+    Speculation only starts while the report scheduler is idle enough to run a job at once,
+    and running speculations count towards that limit, so they never delay confirmed reports.
+    """
+    
+    def __init__(self, ttl: float):
+        """Initialize the speculator with the lifetime of unclaimed reports."""
+        self.ttl = ttl
+        self._reports: Dict[str, SpeculativeReport] = {}
+    
+    def _running(self) -> int:
+        return sum(1 for report in self._reports.values() if not report.task.done())
+    
+    def can_start(self) -> bool:
+        """Check whether a speculative report may start now."""
+        if not settings.report.speculative:
+            return False
+        busy = report_scheduler.in_flight + report_scheduler.queue_depth + self._running()
+        return busy < report_scheduler.max_concurrent
+    
+    def start(
+        self,
+        session_id: str,
+        patient_data: str,
+        prompt_tokens: int,
+        generate: Callable[[], Awaitable[GeneratedReport]],
+    ) -> bool:
+        """Start generating a report for a session in the background."""
+        self.discard(session_id, "restarted")
+        if not self.can_start():
+            metrics.increment("speculative_skipped_busy")
+            return False
+        
+        task = asyncio.create_task(generate(), name=f"speculative-report-{session_id}")
+        report = SpeculativeReport(session_id, patient_data, prompt_tokens, task)
+        self._reports[session_id] = report
+        task.add_done_callback(lambda _: self._on_done(report))
+        
+        metrics.increment("speculative_started")
+        metrics.increment("speculative_tokens", prompt_tokens)
+        logger.info(f"Started speculative report for session {session_id}")
+        return True
+    
+    def _on_done(self, report: SpeculativeReport) -> None:
+        """Count the generated tokens and drop the report if it is not claimed in time."""
+        if report.task.cancelled() or report.task.exception() is not None:
+            return
+        
+        result = report.task.result()
+        report.completion_tokens = count_tokens(result.text, result.model) if isinstance(result, GeneratedReport) else 0
+        metrics.increment("speculative_tokens", report.completion_tokens)
+        
+        if self._reports.get(report.session_id) is report:
+            report.expiry = asyncio.get_running_loop().call_later(
+                self.ttl, self.discard, report.session_id, "expired"
+            )
+    
+    def take(self, session_id: str, patient_data: str) -> Optional[asyncio.Task]:
+        """Claim the speculative report of a session if it was generated from the same data."""
+        report = self._reports.pop(session_id, None)
+        if report is None:
+            return None
+        
+        if report.expiry:
+            report.expiry.cancel()
+        if report.patient_data != patient_data:
+            # The answers changed after speculation started
+            self._waste(report, "stale")
+            return None
+        
+        metrics.increment("speculative_used")
+        if report.task.done():
+            metrics.increment("speculative_ready_on_confirm")
+        metrics.observe("speculative_head_start_ms", (time.monotonic() - report.started_at) * 1000)
+        return report.task
+    
+    def discard(self, session_id: Optional[str], reason: str) -> None:
+        """Cancel and discard the speculative report of a session."""
+        report = self._reports.pop(session_id, None) if session_id else None
+        if report is None:
+            return
+        
+        if report.expiry:
+            report.expiry.cancel()
+        self._waste(report, reason)
+    
+    def _waste(self, report: SpeculativeReport, reason: str) -> None:
+        """Cancel a discarded report and count the tokens spent on it."""
+        # A call cancelled mid-flight still costs its prompt; completion tokens are only known once done
+        wasted = report.prompt_tokens + report.completion_tokens
+        report.task.cancel()
+        
+        metrics.increment(f"speculative_discarded_{reason}")
+        metrics.increment("speculative_wasted_tokens", wasted)
+        logger.info(f"Discarded speculative report for session {report.session_id} ({reason})")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the hit rate and the share of speculative tokens that were wasted."""
+        started = metrics.get_counter("speculative_started")
+        tokens = metrics.get_counter("speculative_tokens")
+        return {
+            "speculative_pending": len(self._reports),
+            "speculative_hit_rate": metrics.get_counter("speculative_used") / started * 100 if started else None,
+            "speculative_wasted_token_rate": (
+                metrics.get_counter("speculative_wasted_tokens") / tokens * 100 if tokens else None
+            ),
+        }
+
+
+# Create the process-wide report speculator
+report_speculator = ReportSpeculator(ttl=settings.report.speculative_ttl)
@@ -0,0 +1,195 @@
+"""
+Resilience utilities for the Hospital Quiz Bot.
+This module provides a circuit breaker, retry backoff and hedged requests for upstream API calls.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.logging_config import logger
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a call cannot finish before its deadline."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream service after repeated failures and probes it after a cool-down."""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """Initialize the breaker in the closed state."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+    
+    def allow(self) -> bool:
+        """Check whether a call may go through, moving to half-open after the cool-down."""
+        if self.state == self.CLOSED:
+            return True
+        
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+        
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            # Let a single probe through to test the upstream
+            self._probe_in_flight = True
+            return True
+        
+        return False
+    
+    def is_open(self) -> bool:
+        """Check whether calls are being rejected and the cool-down has not passed yet."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+    
+    def is_rejecting(self) -> bool:
+        """Check whether allow() would reject a call now, without using up the half-open probe."""
+        if self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self._probe_in_flight
+    
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+    
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker when the threshold is reached."""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._set_state(self.OPEN)
+    
+    def release_probe(self) -> None:
+        """Let another call probe the upstream after a probe ended without an outcome, e.g. when it was cancelled."""
+        self._probe_in_flight = False
+    
+    def _set_state(self, state: str) -> None:
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        metrics.increment(f"{self.name}_breaker_{state}")
+        self.state = state
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the breaker state."""
+        stats = {
+            f"{self.name}_breaker_state": self.state,
+            f"{self.name}_breaker_failures": self.failures,
+        }
+        if self.state == self.OPEN:
+            stats[f"{self.name}_breaker_retry_in_s"] = max(
+                0.0, self.reset_timeout - (time.monotonic() - self.opened_at)
+            )
+        return stats
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether an API error is transient and worth retrying."""
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Get the delay in seconds requested by the server through Retry-After headers."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        # Retry-After may also be an HTTP date
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def backoff_delay(attempt: int, base: float, maximum: float, retry_after: Optional[float] = None) -> float:
+    """Get the delay before a retry using exponential backoff with full jitter."""
+    delay = random.uniform(0, min(maximum, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+async def hedged(
+    factory: Callable[[], Awaitable[Any]],
+    hedge_after: Optional[float],
+    name: str,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Any:
+    """Run a call, firing a second identical call if the first one is slower than hedge_after seconds.
+    
+    The first successful result wins and the other call is cancelled. With a breaker, the second call is
+    only fired while the breaker is closed and allow() lets it through, so a struggling upstream does not
+    get twice the load and a half-open breaker keeps its single probe.
+    """
+    first = asyncio.ensure_future(factory())
+    tasks = [first]
+    try:
+        if hedge_after is None:
+            return await first
+        
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+        
+        if breaker is not None and (breaker.state != breaker.CLOSED or not breaker.allow()):
+            metrics.increment(f"{name}_hedges_skipped")
+            return await first
+        
+        metrics.increment(f"{name}_hedges_fired")
+        second = asyncio.ensure_future(factory())
+        tasks.append(second)
+        
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        metrics.increment(f"{name}_hedges_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Cancel whichever call lost, also when the caller itself is cancelled
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,69 @@
+"""
+Single-flight helper for the Hospital Quiz Bot.
+This module makes concurrent callers with the same key share one run of an operation.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.logging_config import logger
+
+
+class FlightAbortedError(Exception):
+    """Raised to the callers sharing a run when the caller running it was cancelled."""
+
+
+class SingleFlight:
+    """Runs at most one operation per key at a time; callers arriving meanwhile await its result.
+    
+    The first caller runs the operation itself rather than in a separate task, so cancelling it
+    still aborts the operation. Callers that were waiting on a cancelled run then take it over.
+    """
+    
+    def __init__(self, name: str):
+        """Initialize the single-flight group with a name for its metrics."""
+        self.name = name
+        self._flights: Dict[str, asyncio.Future] = {}
+    
+    def is_running(self, key: str) -> bool:
+        """Check whether an operation is running for a key."""
+        return key in self._flights
+    
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the operation for a key, or await the result of the one already running."""
+        while key in self._flights:
+            metrics.increment(f"{self.name}_single_flight_shared")
+            logger.info(f"Waiting for the running {self.name} of {key}")
+            try:
+                # Shielded, so a cancelled caller does not cancel the run it shares
+                return await asyncio.shield(self._flights[key])
+            except FlightAbortedError:
+                continue
+        
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            self._fail(future, FlightAbortedError(f"The {self.name} of {key} was cancelled"))
+            raise
+        except Exception as e:
+            self._fail(future, e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+    
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception) -> None:
+        """Pass an error to the waiting callers without logging it when there are none."""
+        future.set_exception(error)
+        # Marks the exception as retrieved
+        future.exception()
+
+
+# Create the process-wide single-flight group for reports
+report_flights = SingleFlight("report")
@@ -0,0 +1,102 @@
+"""
+Template report engine for the Hospital Quiz Bot.
+This module provides deterministic reports rendered from Jinja2 templates, without calling the LLM.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+# Template file name for each language, e.g. report_uk.j2
+TEMPLATE_PATTERN = re.compile(r"^report_(\w+)\.j2$")
+
+# Positive answer of yes/no questions per language
+YES_ANSWERS = {"uk": "Так", "de": "Ja"}
+NO_ANSWERS = {"uk": "Ні", "de": "Nein"}
+
+
+class TemplateReportEngine:
+    """Renders reports from per-language Jinja2 templates compiled once at startup."""
+    
+    def __init__(self, templates_dir: Path):
+        """Initialize the engine and compile all report templates."""
+        self.templates_dir = Path(templates_dir)
+        self.environment = Environment(
+            loader=FileSystemLoader(str(self.templates_dir)),
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            undefined=StrictUndefined,
+        )
+        self._templates: Dict[str, Template] = {}
+        self.load()
+    
+    def load(self) -> None:
+        """Compile the report template of every language."""
+        templates = {}
+        if self.templates_dir.is_dir():
+            for path in sorted(self.templates_dir.iterdir()):
+                match = TEMPLATE_PATTERN.match(path.name)
+                if not match:
+                    continue
+                try:
+                    templates[match.group(1)] = self.environment.get_template(path.name)
+                except Exception as e:
+                    logger.error(f"Error compiling report template {path.name}: {str(e)}")
+        else:
+            logger.error(f"Report templates directory not found: {self.templates_dir}")
+        
+        self._templates = templates
+        logger.info(f"Compiled report templates for languages: {', '.join(sorted(templates)) or 'none'}")
+    
+    def supports(self, language: str) -> bool:
+        """Check whether there is a report template for a language."""
+        return language in self._templates
+    
+    def render(self, responses: Dict[str, str], language: str = "uk") -> Optional[str]:
+        """Render the report for a set of answers, or None if there is no template."""
+        template = self._templates.get(language)
+        if template is None:
+            logger.error(f"No report template for language: {language}")
+            return None
+        
+        yes, no = YES_ANSWERS.get(language, "Так"), NO_ANSWERS.get(language, "Ні")
+        
+        def answer(question_id: str, default: str = "") -> str:
+            return responses.get(question_id) or default
+        
+        def is_yes(question_id: str) -> bool:
+            return responses.get(question_id) == yes
+        
+        def is_no(question_id: str) -> bool:
+            return responses.get(question_id) == no
+        
+        def positive(phrases: Dict[str, str]) -> List[str]:
+            return [phrase for question_id, phrase in phrases.items() if is_yes(question_id)]
+        
+        text = template.render(
+            answer=answer,
+            is_yes=is_yes,
+            is_no=is_no,
+            positive=positive,
+        )
+        return self._tidy(text)
+    
+    @staticmethod
+    def _tidy(text: str) -> str:
+        """Join the lines of each paragraph, so templates can put every sentence on its own line."""
+        paragraphs = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            joined = " ".join(line.strip() for line in paragraph.splitlines() if line.strip())
+            if joined:
+                paragraphs.append(re.sub(r" {2,}", " ", joined))
+        return "\n\n".join(paragraphs)
+
+
+# Create the process-wide template engine; templates are compiled on import
+template_engine = TemplateReportEngine(settings.templates_dir)
@@ -0,0 +1,75 @@
+"""
+Usage service for the Hospital Quiz Bot.
+This module provides the token and cost accounting of reports and enforces the spending budgets.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hospital_quiz_bot.app.database.repository import QuizResponseRepository
+from hospital_quiz_bot.app.utils.metrics import metrics
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+class BudgetExceededError(Exception):
+    """Raised when a report would be generated past a spending budget."""
+    
+    def __init__(self, reason: str):
+        super().__init__(f"Report budget exceeded ({reason})")
+        self.reason = reason
+
+
+def get_day_start() -> datetime:
+    """Get the start of the current day in UTC, the time zone reports are recorded in."""
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class UsageService:
+    """Service for the usage totals and budgets of reports."""
+    
+    def __init__(self, session: AsyncSession):
+        """Initialize the usage service."""
+        self.quiz_response_repo = QuizResponseRepository(session)
+    
+    async def get_budget_reason(self, user_id: int) -> Optional[str]:
+        """Get the budget that today's spending has used up for a user, if there is one."""
+        day_start = get_day_start()
+        if settings.report.daily_budget:
+            totals = await self.quiz_response_repo.get_usage_totals(since=day_start)
+            if totals["cost"] >= settings.report.daily_budget:
+                return "daily_budget"
+        
+        if settings.report.user_daily_budget:
+            totals = await self.quiz_response_repo.get_usage_totals(since=day_start, user_id=user_id)
+            if totals["cost"] >= settings.report.user_daily_budget:
+                return "user_daily_budget"
+        
+        return None
+    
+    async def check_budget(self, user_id: int) -> None:
+        """Check the budgets before a report is generated for a user.
+        
+        Raises BudgetExceededError when a budget is used up.
+        """
+        reason = await self.get_budget_reason(user_id)
+        if reason:
+            metrics.increment(f"report_budget_exceeded_{reason}")
+            logger.warning(f"Report for user {user_id} rejected, {reason} used up")
+            raise BudgetExceededError(reason)
+    
+    async def get_summary(self, days: int = 7, top_users: int = 10) -> Dict[str, Any]:
+        """Get today's usage totals, the totals of the last days and the users with the highest cost."""
+        day_start = get_day_start()
+        since = day_start - timedelta(days=days - 1)
+        return {
+            "days": days,
+            "today": await self.quiz_response_repo.get_usage_totals(since=day_start),
+            "period": await self.quiz_response_repo.get_usage_totals(since=since),
+            "by_day": await self.quiz_response_repo.get_usage_by_day(since),
+            "by_user": await self.quiz_response_repo.get_usage_by_user(since, limit=top_users),
+            "daily_budget": settings.report.daily_budget,
+            "user_daily_budget": settings.report.user_daily_budget,
+        }
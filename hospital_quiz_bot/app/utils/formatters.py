@@ -3,7 +3,7 @@ Formatting utility functions for the Hospital Quiz Bot.
 This module provides functions for formatting messages.
 """
 
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Mapping, Optional, Any, Sequence, Union
 import re
 import datetime
 
@@ -84,7 +84,7 @@ def format_question(text: str, index: int, total: int, language: str = "uk") ->
 
 def format_quiz_confirmation_message(
     responses: Dict[str, str],
-    questions: List[Dict[str, Any]],
+    questions: Sequence[Mapping[str, Any]],
     language: str = "uk",
 ) -> str:
     """Format the quiz confirmation message."""
@@ -121,17 +121,87 @@ def format_report_generation_message(language: str = "uk") -> str:
         return "⏳ Генерація звіту... Будь ласка, зачекайте."
 
 
+def format_report_queued_message(position: int, language: str = "uk") -> str:
+    """Format the message shown when a report is waiting in the queue."""
+    if language == "de":
+        return f"🕒 Ihr Bericht steht in der Warteschlange (Platz {position}). Er wird gesendet, sobald er fertig ist."
+    else:  # Default to Ukrainian
+        return f"🕒 Ваш звіт у черзі (місце {position}). Його буде надіслано, щойно він буде готовий."
+
+
+def format_report_queue_full_message(language: str = "uk") -> str:
+    """Format the message shown when the report queue is full."""
+    if language == "de":
+        return "⚠️ Zu viele Berichte werden gerade erstellt. Bitte versuchen Sie es in einer Minute erneut."
+    else:  # Default to Ukrainian
+        return "⚠️ Зараз генерується забагато звітів. Будь ласка, спробуйте ще раз за хвилину."
+
+
+def format_template_report_note(reason: str, language: str = "uk") -> str:
+    """Format the note shown above a report rendered from a template instead of the LLM."""
+    if reason == "on_demand":
+        if language == "de":
+            return "📝 Bericht aus einer Vorlage erstellt."
+        return "📝 Звіт сформовано за шаблоном."
+    
+    if reason == "budget":
+        if language == "de":
+            return "⚠️ Das Budget für KI-Berichte ist für heute aufgebraucht, daher wurde der Bericht aus einer Vorlage erstellt."
+        return "⚠️ Ліміт витрат на звіти ШІ на сьогодні вичерпано, тому звіт сформовано автоматично за шаблоном."
+    
+    if language == "de":
+        return "⚠️ Der KI-Dienst ist gerade überlastet oder nicht erreichbar, daher wurde der Bericht aus einer Vorlage erstellt."
+    else:  # Default to Ukrainian
+        return "⚠️ Сервіс ШІ зараз перевантажений або недоступний, тому звіт сформовано автоматично за шаблоном."
+
+
+def format_template_preview_message(report: str, language: str = "uk") -> str:
+    """Format the template report shown while the LLM report is being generated."""
+    if language == "de":
+        note = "⏳ Vorläufiger Bericht aus einer Vorlage. Der ausführliche KI-Bericht folgt."
+    else:  # Default to Ukrainian
+        note = "⏳ Попередній звіт за шаблоном. Детальний звіт ШІ надійде згодом."
+    return f"{note}\n\n{report}"
+
+
+# Titles of the sections of structured reports
+REPORT_SECTION_TITLES = {
+    "uk": {
+        "arrival": "Загальний стан",
+        "examination": "Фізичний огляд",
+        "biomechanics": "Біомеханіка",
+        "conclusion": "Висновок",
+    },
+    "de": {
+        "arrival": "Allgemeinzustand",
+        "examination": "Körperliche Untersuchung",
+        "biomechanics": "Biomechanik",
+        "conclusion": "Schlussfolgerung",
+    },
+}
+
+
 def format_report_message(report: Union[Dict[str, Any], str], language: str = "uk") -> Union[str, List[str]]:
-    """Format the report message."""
+    """Format the report message.
+    
+    A report with sections is rendered section by section, with the conclusion section last.
+    """
+    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     # If report is already a string, wrap it in a simple dictionary structure
     if isinstance(report, str):
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         report = {
             "timestamp": current_time,
             "conclusion": report,
             "responses": {}
         }
-        
+    
+    # Structured reports carry their conclusion as a section
+    sections = dict(report.get("sections") or {})
+    if sections:
+        report = {"timestamp": current_time, **report}
+        if "conclusion" in sections:
+            report["conclusion"] = sections.pop("conclusion")
+    
     # Format based on language
     if language == "de":
         header = f"📊 **KNIEUNTERSUCHUNGSBERICHT**\n\n"
@@ -149,6 +219,10 @@ def format_report_message(report: Union[Dict[str, Any], str], language: str = "u
     for question, answer in responses.items():
         response_lines.append(f"• **{question}**\n→ {answer}")
     
+    section_titles = REPORT_SECTION_TITLES.get(language, REPORT_SECTION_TITLES["uk"])
+    for name, text in sections.items():
+        response_lines.append(f"**{section_titles.get(name, name)}:**\n{text}\n")
+    
     formatted_responses = "\n".join(response_lines)
     
     # Combine all parts
@@ -202,6 +276,107 @@ def format_reports_list_message(count: int, language: str = "uk") -> str:
         )
 
 
+def format_stats_message(stats: Dict[str, Any]) -> str:
+    """Format the admin statistics message."""
+    lines = [hbold("📈 Statistics"), ""]
+    for name, value in stats.items():
+        if value is None:
+            value = "-"
+        elif isinstance(value, float):
+            value = f"{value:.1f}"
+        lines.append(f"{name}: {hcode(str(value))}")
+    return "\n".join(lines)
+
+
+def format_usage_message(summary: Dict[str, Any]) -> str:
+    """Format the admin message with the token and cost totals of reports."""
+    def totals_line(totals: Dict[str, Any]) -> str:
+        return (
+            f"{totals['reports']} reports, {totals['prompt_tokens']} prompt tokens "
+            f"({totals['cached_tokens']} cached), {totals['completion_tokens']} completion tokens, "
+            f"${totals['cost']:.4f}"
+        )
+    
+    lines = [hbold("💰 Usage"), ""]
+    lines.append(f"Today (UTC): {hcode(totals_line(summary['today']))}")
+    lines.append(f"Last {summary['days']} days: {hcode(totals_line(summary['period']))}")
+    
+    if summary["by_day"]:
+        lines += ["", hbold("Per day")]
+        lines += [f"{day['day']}: {hcode(totals_line(day))}" for day in summary["by_day"]]
+    
+    if summary["by_user"]:
+        lines += ["", hbold("Top users")]
+        lines += [f"{user['user_id']}: {hcode(totals_line(user))}" for user in summary["by_user"]]
+    
+    lines += ["", hbold("Budgets")]
+    for name in ("daily_budget", "user_daily_budget"):
+        budget = summary[name]
+        lines.append(f"{name}: {hcode(f'${budget:.2f}' if budget else 'unlimited')}")
+    return "\n".join(lines)
+
+
+def format_experiments_message(comparison: List[Dict[str, Any]], variants: Dict[str, float], days: int) -> str:
+    """Format the admin message comparing the reports of the prompt variants."""
+    def value(number: Optional[float], pattern: str) -> str:
+        return pattern.format(number) if number is not None else "-"
+    
+    lines = [hbold("🧪 Prompt experiments"), ""]
+    weights = ", ".join(f"{name} {weight:g}" for name, weight in variants.items()) or "none"
+    lines.append(f"Running: {hcode(weights)}")
+    
+    if not comparison:
+        lines.append(f"No variant reports in the last {days} days")
+        return "\n".join(lines)
+    
+    lines.append(f"Last {days} days, cheapest first:")
+    for row in comparison:
+        lines += ["", hbold(row["variant"])]
+        lines.append(
+            f"reports: {hcode(row['reports'])}, "
+            f"latency p50/p95: {hcode(value(row['latency_p50_ms'], '{:.0f}') + '/' + value(row['latency_p95_ms'], '{:.0f}') + ' ms')}"
+        )
+        lines.append(
+            f"tokens in/out: {hcode(value(row['prompt_tokens'], '{:.0f}') + '/' + value(row['completion_tokens'], '{:.0f}'))}, "
+            f"cost: {hcode(value(row['cost'], '${:.5f}'))}"
+        )
+        lines.append(
+            f"length: {hcode(value(row['length'], '{:.0f}'))}, "
+            f"meets format: {hcode(value(row['format_rate'] and row['format_rate'] * 100, '{:.0f}%'))}, "
+            f"regenerated: {hcode(value(row['regeneration_rate'] and row['regeneration_rate'] * 100, '{:.0f}%'))}"
+        )
+    return "\n".join(lines)
+
+
+def format_file_not_accepted_message(language: str = "uk") -> str:
+    """Format the message telling a user that the bot does not accept files."""
+    if language == "de":
+        return "⚠️ Dateien werden nicht angenommen. Bitte beantworten Sie die Fragen mit den Tasten oder als Text."
+    else:  # Default to Ukrainian
+        return "⚠️ Файли не приймаються. Будь ласка, відповідайте на питання кнопками або текстом."
+
+
+def format_intake_file_rejected_message() -> str:
+    """Format the admin message for an uploaded file that is not a bulk intake file."""
+    return f"⚠️ Only {hcode('.csv')} and {hcode('.xlsx')} files are accepted for bulk intake."
+
+
+def format_intake_progress(done: int, total: int) -> str:
+    """Format the admin message showing the progress of a bulk intake."""
+    return f"{hbold('📥 Bulk intake')}\nGenerating reports: {hcode(f'{done}/{total}')}"
+
+
+def format_intake_summary(result: Any) -> str:
+    """Format the admin message summarising a bulk intake, sent with the results file."""
+    lines = [hbold("📥 Bulk intake finished"), ""]
+    lines.append(f"Exams: {hcode(len(result.exams))}")
+    for status in ("generated", "failed", "invalid"):
+        lines.append(f"{status.capitalize()}: {hcode(result.count(status))}")
+    if result.unknown_columns:
+        lines += ["", f"Ignored columns: {hcode(', '.join(result.unknown_columns))}"]
+    return "\n".join(lines)
+
+
 def split_long_text(text: str, max_length: int) -> List[str]:
     """Split long text into parts while preserving paragraph breaks."""
     # If text is shorter than max_length, return it as is
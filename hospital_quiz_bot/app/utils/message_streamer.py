@@ -0,0 +1,123 @@
+"""
+Message streaming utilities for the Hospital Quiz Bot.
+This module provides progressive delivery of generated text through throttled message edits.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from hospital_quiz_bot.config.logging_config import logger
+
+# Telegram's maximum message length
+MAX_MESSAGE_LENGTH = 4096
+
+
+class MessageStreamer:
+    """Shows streamed text by editing a placeholder message, rolling over to new messages when full."""
+    
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        message_id: int,
+        min_interval: float = 1.0,
+        max_length: int = MAX_MESSAGE_LENGTH,
+    ):
+        """Initialize the streamer with the placeholder message to edit."""
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.min_interval = min_interval
+        self.max_length = max_length
+        
+        self.text = ""
+        self.started_at = time.monotonic()
+        self.first_text_at: Optional[float] = None
+        self.edits = 0
+        
+        # Text of the current message that has not been shown yet
+        self._current = ""
+        self._shown = ""
+        self._last_edit = 0.0
+    
+    async def push(self, delta: str) -> None:
+        """Append a text delta and update the message if the throttle allows it."""
+        self.text += delta
+        self._current += delta
+        
+        while len(self._current) > self.max_length:
+            await self._roll_over()
+        
+        if time.monotonic() - self._last_edit >= self.min_interval:
+            await self._flush()
+    
+    async def finish(self, final_text: Optional[str] = None) -> None:
+        """Show all remaining text, optionally replacing a single-message report with its final form."""
+        if final_text is not None and self.message_id and len(final_text) <= self.max_length and self._is_single_message():
+            self._current = final_text
+        await self._flush(force=True)
+    
+    def _is_single_message(self) -> bool:
+        return len(self.text) == len(self._current)
+    
+    async def _roll_over(self) -> None:
+        """Close the current message at a word boundary and continue in a new one."""
+        cut = self._current.rfind("\n", 0, self.max_length)
+        if cut < self.max_length // 2:
+            cut = self._current.rfind(" ", 0, self.max_length)
+        if cut < self.max_length // 2:
+            cut = self.max_length
+        
+        head, tail = self._current[:cut], self._current[cut:].lstrip()
+        self._current = head
+        await self._flush(force=True)
+        
+        sent = await self.bot.send_message(self.chat_id, tail or "…", parse_mode=None)
+        self.message_id = sent.message_id
+        self._current = tail
+        self._shown = tail
+        self._last_edit = time.monotonic()
+    
+    async def _flush(self, force: bool = False) -> None:
+        """Edit the current message to show the buffered text."""
+        if not self._current.strip() or self._current == self._shown:
+            return
+        
+        if force:
+            # Stay under Telegram's per-chat edit rate even for the final edit
+            wait = self.min_interval - (time.monotonic() - self._last_edit)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        
+        try:
+            await self.bot.edit_message_text(
+                self._current,
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                parse_mode=None,
+            )
+        except TelegramRetryAfter as e:
+            logger.warning(f"Edit rate limited in chat {self.chat_id}, retrying in {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            await self._flush(force=force)
+            return
+        except TelegramBadRequest as e:
+            # Raised when the text did not change or the message is gone
+            logger.debug(f"Could not edit streamed message: {str(e)}")
+        
+        self._shown = self._current
+        self._last_edit = time.monotonic()
+        self.edits += 1
+        if self.first_text_at is None:
+            self.first_text_at = self._last_edit
+    
+    @property
+    def time_to_first_text_ms(self) -> Optional[float]:
+        """Milliseconds between creating the streamer and the first visible text."""
+        if self.first_text_at is None:
+            return None
+        return (self.first_text_at - self.started_at) * 1000
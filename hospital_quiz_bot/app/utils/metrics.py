@@ -0,0 +1,61 @@
+"""
+Metrics utilities for the Hospital Quiz Bot.
+This module provides a lightweight in-process registry of counters and timings.
+"""
+
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+# Number of most recent observations kept per timing
+TIMING_WINDOW = 500
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """Get the q-th percentile (0-100) of some values."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Metrics:
+    """In-process registry of counters and rolling timing windows."""
+    
+    def __init__(self, window: int = TIMING_WINDOW):
+        self.window = window
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+    
+    def increment(self, name: str, value: float = 1) -> None:
+        """Increment a counter."""
+        self._counters[name] += value
+    
+    def observe(self, name: str, value: float) -> None:
+        """Record a timing or size observation."""
+        self._timings[name].append(value)
+    
+    def get_counter(self, name: str) -> float:
+        """Get the current value of a counter."""
+        return self._counters.get(name, 0)
+    
+    def count(self, name: str) -> int:
+        """Get the number of observations in a timing window."""
+        return len(self._timings.get(name, ()))
+    
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Get the q-th percentile (0-100) of a timing window."""
+        return percentile(self._timings.get(name, ()), q)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a snapshot of all counters and timing summaries."""
+        result: Dict[str, Any] = dict(sorted(self._counters.items()))
+        for name in sorted(self._timings):
+            if self._timings[name]:
+                result[f"{name}_p50"] = self.percentile(name, 50)
+                result[f"{name}_p95"] = self.percentile(name, 95)
+        return result
+
+
+# Create a process-wide metrics registry
+metrics = Metrics()
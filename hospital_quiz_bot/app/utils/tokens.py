@@ -0,0 +1,60 @@
+"""
+Token counting utilities for the Hospital Quiz Bot.
+This module provides local prompt token counts, using tiktoken when it is installed.
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from hospital_quiz_bot.config.logging_config import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens the chat format adds around every message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Encoding used for models tiktoken does not know yet
+DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Get the tiktoken encoding for a model, or None if tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # tiktoken downloads its vocabularies on first use, which fails offline
+        logger.warning(f"Could not load tiktoken encoding, estimating tokens instead: {str(e)}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count without a tokenizer.
+    
+    Latin text averages about four characters per token; Cyrillic and other
+    non-ASCII text is split much more finely, at about two characters per token.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count the tokens of a text for a model."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """Count the prompt tokens of a list of chat messages."""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(message["content"], model) for message in messages) + TOKENS_PER_REPLY
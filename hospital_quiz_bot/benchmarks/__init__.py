@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Hospital Quiz Bot.
+Each module can be run with ``python -m hospital_quiz_bot.benchmarks.<name>``.
+"""
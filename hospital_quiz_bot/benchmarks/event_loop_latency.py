@@ -0,0 +1,116 @@
+"""
+Event loop latency benchmark for the Hospital Quiz Bot.
+This module measures the latency of an unrelated /help command while N reports are being generated.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.event_loop_latency --concurrency 0 1 5 20 --delay 2
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import List
+
+from hospital_quiz_bot.app.handlers.commands import cmd_help
+from hospital_quiz_bot.app.services.openai_service import OpenAIService
+
+
+class _FakeCompletions:
+    """Chat completions stand-in that simulates upstream latency."""
+    
+    def __init__(self, delay: float, blocking: bool):
+        self.delay = delay
+        self.blocking = blocking
+    
+    async def create(self, **kwargs):
+        if self.blocking:
+            # Simulates the old synchronous client holding the event loop
+            time.sleep(self.delay)
+        else:
+            await asyncio.sleep(self.delay)
+        message = SimpleNamespace(content="Обстеження колінного суглоба")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class _FakeResult:
+    def scalar_one_or_none(self):
+        return None
+
+
+class _FakeSession:
+    async def execute(self, stmt):
+        return _FakeResult()
+
+
+@asynccontextmanager
+async def _fake_session_pool():
+    yield _FakeSession()
+
+
+async def _fake_answer(*args, **kwargs):
+    return None
+
+
+def _make_message() -> SimpleNamespace:
+    return SimpleNamespace(from_user=SimpleNamespace(id=1), answer=_fake_answer)
+
+
+async def _measure_help(samples: int, interval: float) -> List[float]:
+    """Invoke the /help handler on a fixed schedule and collect its latency in milliseconds.
+    
+    Latency is measured from the moment the update is due, so time spent waiting
+    for a blocked event loop is included.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    latencies = []
+    for i in range(samples):
+        due = started + i * interval
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        await cmd_help(_make_message(), _fake_session_pool)
+        latencies.append((loop.time() - due) * 1000)
+    return latencies
+
+
+async def run(concurrency: int, delay: float, blocking: bool, samples: int) -> List[float]:
+    """Run one benchmark round and return the /help latencies."""
+    service = OpenAIService(api_key="benchmark")
+    service.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=_FakeCompletions(delay, blocking))
+    )
+    
+    probe = asyncio.create_task(_measure_help(samples, interval=delay / samples))
+    generations = [
+        asyncio.create_task(service.generate_report("Чи може пацієнт ходити?: Так"))
+        for _ in range(concurrency)
+    ]
+    latencies = await probe
+    await asyncio.gather(*generations)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[0, 1, 5, 20])
+    parser.add_argument("--delay", type=float, default=1.0, help="Simulated OpenAI latency in seconds")
+    parser.add_argument("--samples", type=int, default=20, help="Number of /help probes per round")
+    parser.add_argument("--blocking", action="store_true", help="Simulate the old synchronous client")
+    args = parser.parse_args()
+    logging.getLogger("hospital_quiz_bot").setLevel(logging.WARNING)
+    
+    mode = "blocking" if args.blocking else "async"
+    print(f"/help latency while generating reports ({mode} client, {args.delay}s per report)")
+    print(f"{'N':>4} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for concurrency in args.concurrency:
+        latencies = asyncio.run(run(concurrency, args.delay, args.blocking, args.samples))
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{concurrency:>4} {statistics.median(latencies):>10.2f} {p95:>10.2f} {latencies[-1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Prompt token benchmark for the Hospital Quiz Bot.
+This module compares the input tokens, and optionally the latency, of each patient data encoding.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.prompt_tokens
+    python -m hospital_quiz_bot.benchmarks.prompt_tokens --base-url http://127.0.0.1:8800/v1 --requests 10
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.services.openai_service import PREFIX_CACHE_MIN_TOKENS, OpenAIService
+from hospital_quiz_bot.app.services.quiz_service import get_catalog
+from hospital_quiz_bot.app.services.report_service import ReportService
+from hospital_quiz_bot.app.utils import tokens
+from hospital_quiz_bot.config.settings import settings
+
+ENCODINGS = ["full", "compact", "grouped"]
+
+# Fixed answers for the free-form questions; choice questions alternate between their options
+TEXT_ANSWERS = {
+    "extension_amplitude": "0/0",
+    "flexion_amplitude": "120/130",
+    "rotation_amplitude": "30/20",
+}
+
+
+def make_quiz_response(language: str) -> QuizResponse:
+    """Build a completed quiz response with a fixed, realistic answer set."""
+    responses = {}
+    for index, question in enumerate(get_catalog(language).get_all_questions()):
+        if question["id"] in TEXT_ANSWERS:
+            responses[question["id"]] = TEXT_ANSWERS[question["id"]]
+        elif question.get("options"):
+            responses[question["id"]] = question["options"][index % len(question["options"])]
+    
+    return QuizResponse(responses=responses, language=language, is_complete=True, session_id="benchmark")
+
+
+async def measure_latency(service: OpenAIService, patient_data: str, language: str, requests: int) -> Dict[str, float]:
+    """Send the same report request several times and collect latency and reported usage."""
+    body = service.build_request_body(patient_data, language)
+    latencies = []
+    prompt_tokens = 0
+    for _ in range(requests):
+        started = time.monotonic()
+        completion = await service.client.chat.completions.create(**body)
+        latencies.append((time.monotonic() - started) * 1000)
+        prompt_tokens = completion.usage.prompt_tokens if completion.usage else 0
+    return {"p50_ms": statistics.median(latencies), "prompt_tokens": prompt_tokens}
+
+
+async def run(language: str, base_url: Optional[str], api_key: Optional[str], requests: int) -> List[Dict[str, float]]:
+    """Run the benchmark for one language."""
+    service = OpenAIService(api_key=api_key or "benchmark", base_url=base_url)
+    report_service = ReportService(None, language=language, openai_service=service)
+    quiz_response = make_quiz_response(language)
+    
+    rows = []
+    for encoding in ENCODINGS:
+        patient_data = report_service._format_responses_for_prompt(quiz_response, encoding=encoding)
+        row = {
+            "encoding": encoding,
+            "data_tokens": tokens.count_tokens(patient_data, service.model),
+            "prompt_tokens": service.count_prompt_tokens(patient_data, language),
+        }
+        if base_url:
+            latency = await measure_latency(service, patient_data, language, requests)
+            row.update({f"api_{key}": value for key, value in latency.items()})
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--language", choices=["uk", "de"], nargs="+", default=["uk", "de"])
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint to also measure latency against")
+    parser.add_argument("--api-key", help="API key (defaults to OPENAI_API_KEY)")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per encoding when measuring latency")
+    args = parser.parse_args()
+    logging.getLogger("hospital_quiz_bot").setLevel(logging.WARNING)
+    
+    counter = "tiktoken" if tokens.tiktoken is not None else "heuristic estimate"
+    print(f"Prompt tokens per report ({counter}, model {settings.openai.model})")
+    for language in args.language:
+        service = OpenAIService(api_key="benchmark")
+        print(f"\n[{language}] max_tokens: {settings.openai.max_tokens} fixed, {service.get_max_tokens(language)} adaptive")
+        prefix_tokens = service.get_prefix_tokens(language)
+        cacheable = "cacheable" if prefix_tokens >= PREFIX_CACHE_MIN_TOKENS else "too short to be cached"
+        print(f"[{language}] static prefix: {prefix_tokens} tokens, {cacheable} "
+              f"(the API caches prefixes from {PREFIX_CACHE_MIN_TOKENS})")
+        
+        header = f"{'encoding':<10} {'data':>8} {'prompt':>8} {'saved':>8}"
+        if args.base_url:
+            header += f" {'api tokens':>11} {'p50 ms':>10}"
+        print(header)
+        
+        rows = asyncio.run(run(language, args.base_url, args.api_key, args.requests))
+        baseline = rows[0]["prompt_tokens"]
+        for row in rows:
+            saved = 1 - row["prompt_tokens"] / baseline
+            line = f"{row['encoding']:<10} {row['data_tokens']:>8} {row['prompt_tokens']:>8} {saved:>8.0%}"
+            if args.base_url:
+                line += f" {row['api_prompt_tokens']:>11.0f} {row['api_p50_ms']:>10.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Question screen benchmark for the Hospital Quiz Bot.
+This module times what the answer handler does for one answer besides the database and Telegram calls:
+validating the answer and building the next question's message, with the screens built on every answer as
+before, and looked up in the screen cache.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.question_screens --answers 20000
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from hospital_quiz_bot.app.keyboards.reply import get_cancel_keyboard, get_quiz_options_keyboard
+from hospital_quiz_bot.app.keyboards.screens import (
+    OPTION_QUESTION_TYPES,
+    QuestionScreen,
+    get_question_screen,
+    get_question_screens,
+)
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, QuizCatalog, get_catalog
+from hospital_quiz_bot.app.utils.formatters import format_question
+
+
+def build_uncached(catalog: QuizCatalog, index: int) -> QuestionScreen:
+    """Build the message of a question the way the handlers did before the screen cache."""
+    question = catalog.questions[index]
+    text = format_question(
+        catalog.format_question_text(question),
+        index,
+        catalog.get_total_questions(),
+        catalog.language,
+    )
+    if question["type"] in OPTION_QUESTION_TYPES:
+        return QuestionScreen(text, get_quiz_options_keyboard(question["options"], catalog.language))
+    return QuestionScreen(text, get_cancel_keyboard.__wrapped__(catalog.language))
+
+
+def time_answers(catalog: QuizCatalog, answers: int, render: Callable[[QuizCatalog, int], QuestionScreen]) -> float:
+    """Time the handler work of answers through a catalog, returning microseconds per answer."""
+    steps = [
+        (question["id"], (question.get("options") or ("0/120",))[0], (index + 1) % len(catalog.questions))
+        for index, question in enumerate(catalog.questions)
+    ]
+    started = time.perf_counter()
+    for number in range(answers):
+        question_id, answer, next_index = steps[number % len(steps)]
+        catalog.get_question_index(question_id)
+        catalog.is_valid_answer(question_id, answer)
+        render(catalog, next_index)
+    return (time.perf_counter() - started) / answers * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=20000, help="Answers timed per language")
+    args = parser.parse_args()
+    
+    for language in QUIZ_FILES:
+        catalog = get_catalog(language)
+        if not catalog.questions:
+            continue
+        
+        started = time.perf_counter()
+        get_question_screens(catalog)
+        build_ms = (time.perf_counter() - started) * 1000
+        
+        before = time_answers(catalog, args.answers, build_uncached)
+        after = time_answers(catalog, args.answers, get_question_screen)
+        print(
+            f"{language}: {len(catalog.questions)} screens built in {build_ms:.1f} ms; "
+            f"per answer {before:.1f} µs before, {after:.1f} µs cached ({before / after:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
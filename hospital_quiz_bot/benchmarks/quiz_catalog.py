@@ -0,0 +1,45 @@
+"""
+Quiz catalog benchmark for the Hospital Quiz Bot.
+This module times the question lookups of a quiz step. That concurrent sessions only see the questions of
+their own language is checked by tests/test_quiz_catalog.py.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.quiz_catalog --lookups 100000
+"""
+
+import argparse
+import time
+
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, get_catalog
+
+
+def time_lookups(lookups: int) -> None:
+    """Time the lookups of one quiz step: by id, index of an id, and answer validation."""
+    for language in QUIZ_FILES:
+        catalog = get_catalog(language)
+        if not catalog.questions:
+            continue
+        ids = [question["id"] for question in catalog.questions]
+        last_id = ids[-1]
+        answer = (catalog.questions[-1].get("options") or ("0/120",))[0]
+        
+        started = time.perf_counter()
+        for _ in range(lookups):
+            catalog.get_question_index(last_id)
+            catalog.get_question_by_id(last_id)
+            catalog.is_valid_answer(last_id, answer)
+        elapsed = time.perf_counter() - started
+        
+        print(f"{language}: {len(ids)} questions, {elapsed / lookups * 1e9:.0f} ns per step lookup")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=100000, help="Lookups timed per language")
+    args = parser.parse_args()
+    
+    time_lookups(args.lookups)
+
+
+if __name__ == "__main__":
+    main()
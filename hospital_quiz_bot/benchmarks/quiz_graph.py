@@ -0,0 +1,92 @@
+"""
+Question graph benchmark for the Hospital Quiz Bot.
+This module walks random exams through the question graph of every language and counts the messages each exam
+takes, asking every question as before against following the show_if conditions, then times a graph step.
+
+Answers are drawn uniformly from the options of each question, so the messages saved depend only on how many
+questions are conditional; real exams, where most patients can walk and have no skin damage, save less.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.quiz_graph --exams 10000 --seed 1
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, QuizCatalog, get_catalog
+
+
+def answer(catalog: QuizCatalog, index: int, rng: random.Random) -> str:
+    """Pick an answer a user could give to a question."""
+    question = catalog.questions[index]
+    if question["type"] == "text_input":
+        return question.get("placeholder") or "0"
+    return rng.choice(question["options"])
+
+
+def count_messages(catalog: QuizCatalog, responses: Dict[str, str], follow_up: str) -> int:
+    """Count the messages asking the questions of an exam, with follow-up prompts of optional_text questions."""
+    return len(responses) + sum(
+        1 for question in catalog.questions
+        if question["type"] == "optional_text" and responses.get(question["id"]) == follow_up
+    )
+
+
+def walk_exam(catalog: QuizCatalog, rng: random.Random) -> Dict[str, str]:
+    """Answer the questions of an exam the way the answer handler moves through them."""
+    responses: Dict[str, str] = {}
+    index = 0 if catalog.questions else None
+    while index is not None:
+        responses[catalog.questions[index]["id"]] = answer(catalog, index, rng)
+        index = catalog.get_next_index(index, responses)
+    return responses
+
+
+def time_steps(catalog: QuizCatalog, exams: List[Dict[str, str]]) -> float:
+    """Time finding the next question for every answer of the exams, returning microseconds per step."""
+    steps = [
+        (catalog.get_question_index(question_id), responses)
+        for responses in exams
+        for question_id in responses
+    ]
+    started = time.perf_counter()
+    for index, responses in steps:
+        catalog.get_next_index(index, responses)
+    return (time.perf_counter() - started) / len(steps) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exams", type=int, default=10000, help="Random exams walked per language")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the random answers")
+    args = parser.parse_args()
+    
+    for language in QUIZ_FILES:
+        catalog = get_catalog(language)
+        if not catalog.questions:
+            continue
+        
+        rng = random.Random(args.seed)
+        follow_up = "Ja" if language == "de" else "Так"
+        exams = [walk_exam(catalog, rng) for _ in range(args.exams)]
+        linear = [
+            catalog.get_total_questions() + count_messages(catalog, responses, follow_up) - len(responses)
+            for responses in exams
+        ]
+        graph = [count_messages(catalog, responses, follow_up) for responses in exams]
+        conditional = sum(1 for condition in catalog.conditions if condition)
+        
+        before, after = statistics.mean(linear), statistics.mean(graph)
+        print(
+            f"{language}: {conditional} of {catalog.get_total_questions()} questions conditional; "
+            f"{before:.1f} messages per exam linear, {after:.1f} with the graph "
+            f"({(before - after) / before:.0%} fewer, at most {max(graph)}); "
+            f"{time_steps(catalog, exams):.2f} µs per step"
+        )
+
+
+if __name__ == "__main__":
+    main()
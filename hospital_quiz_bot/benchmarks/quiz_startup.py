@@ -0,0 +1,51 @@
+"""
+Quiz startup benchmark for the Hospital Quiz Bot.
+This module times loading the quiz catalogs of every language at startup, from the YAML quiz files as before
+and from the compiled artifact.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.quiz_startup --repeats 50
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Mapping
+
+from hospital_quiz_bot.app.services.quiz_compiler import compile_quiz, read_artifact, write_artifact
+from hospital_quiz_bot.app.services.quiz_service import DEFAULT_LANGUAGE, QuizCatalog, build_catalogs
+from hospital_quiz_bot.config.settings import settings
+
+
+def time_load(load: Callable[[], Mapping[str, QuizCatalog]], repeats: int) -> float:
+    """Time loading the catalogs, returning the median milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=50, help="Loads timed per path")
+    args = parser.parse_args()
+    
+    files = settings.quiz_files
+    with tempfile.TemporaryDirectory() as directory:
+        artifact_path = Path(directory) / "quizes.compiled.json"
+        write_artifact(compile_quiz(files, DEFAULT_LANGUAGE), artifact_path)
+        
+        yaml_ms = time_load(lambda: build_catalogs(compile_quiz(files, DEFAULT_LANGUAGE)), args.repeats)
+        artifact_ms = time_load(lambda: build_catalogs(read_artifact(artifact_path, files)), args.repeats)
+        
+        yaml_bytes = sum(Path(file_path).stat().st_size for file_path in files.values())
+        print(f"YAML files: {yaml_bytes} bytes, {yaml_ms:.2f} ms per load (parsing and validating)")
+        print(f"Artifact:   {artifact_path.stat().st_size} bytes, {artifact_ms:.2f} ms per load ({yaml_ms / artifact_ms:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Sectioned report latency benchmark for the Hospital Quiz Bot.
+This module compares the wall-clock latency of single-shot and sectioned report generation.
+
+Usage:
+    python -m hospital_quiz_bot.benchmarks.sectioned_latency
+    python -m hospital_quiz_bot.benchmarks.sectioned_latency --latency lognormal:0.8,0.5 --tokens-per-second 60
+    python -m hospital_quiz_bot.benchmarks.sectioned_latency --base-url http://127.0.0.1:8800/v1
+
+Without --base-url the local OpenAI stub is started in-process with the given latency and token rate.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from hospital_quiz_bot.app.services.openai_service import OpenAIService
+from hospital_quiz_bot.app.services.report_service import REPORT_SECTIONS, ReportService
+from hospital_quiz_bot.app.utils.metrics import metrics, percentile
+from hospital_quiz_bot.benchmarks.prompt_tokens import make_quiz_response
+from hospital_quiz_bot.openai_stub import StubConfig, StubServer
+
+
+async def start_stub(latency: str, tokens_per_second: float) -> web.AppRunner:
+    """Start the OpenAI stub on a free local port."""
+    server = StubServer(StubConfig(latency=latency, tokens_per_second=tokens_per_second), [], seed=0)
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def measure(report_service: ReportService, language: str, sectioned: bool, requests: int) -> List[float]:
+    """Generate the same report several times, one after another, and collect the latencies in milliseconds."""
+    quiz_response = make_quiz_response(language)
+    patient_data = report_service._format_responses_for_prompt(quiz_response)
+    sections = report_service._format_sections(quiz_response) if sectioned else None
+    
+    latencies = []
+    for _ in range(requests):
+        started = time.monotonic()
+        await report_service._generate_text(patient_data, language, sections=sections)
+        latencies.append((time.monotonic() - started) * 1000)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, List[float]]]:
+    """Run both modes for every language."""
+    runner: Optional[web.AppRunner] = None
+    base_url = args.base_url
+    if not base_url:
+        runner = await start_stub(args.latency, args.tokens_per_second)
+        host, port = runner.addresses[0][:2]
+        base_url = f"http://{host}:{port}/v1"
+    
+    service = OpenAIService(api_key=args.api_key or "benchmark", base_url=base_url)
+    results: Dict[str, Dict[str, List[float]]] = {}
+    try:
+        for language in args.language:
+            report_service = ReportService(None, language=language, openai_service=service)
+            results[language] = {
+                "single": await measure(report_service, language, False, args.requests),
+                "sectioned": await measure(report_service, language, True, args.requests),
+            }
+    finally:
+        await service.close()
+        if runner is not None:
+            await runner.cleanup()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--language", choices=["uk", "de"], nargs="+", default=["uk", "de"])
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint to use instead of starting the stub")
+    parser.add_argument("--api-key", help="API key for --base-url")
+    parser.add_argument("--requests", type=int, default=10, help="Reports per mode and language")
+    parser.add_argument("--latency", default="lognormal:0.5,0.3", help="Time to first token of the stub")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Output token rate of the stub")
+    args = parser.parse_args()
+    # The stub filler is longer than the max_tokens of a section, and every cut-off is logged as a warning
+    logging.getLogger("hospital_quiz_bot").setLevel(logging.ERROR)
+    
+    results = asyncio.run(run(args))
+    
+    print(f"Report latency over {args.requests} reports per mode")
+    print(f"{'lang':<5} {'mode':<10} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    for language, modes in results.items():
+        for mode, latencies in modes.items():
+            print(
+                f"{language:<5} {mode:<10} {percentile(latencies, 50):>10.1f} "
+                f"{percentile(latencies, 95):>10.1f} {statistics.mean(latencies):>10.1f}"
+            )
+    
+    print("\nSection p50 ms: " + ", ".join(
+        f"{name} {metrics.percentile(f'report_section_{name}_ms', 50):.1f}"
+        for name in REPORT_SECTIONS
+        if metrics.count(f"report_section_{name}_ms")
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,11 @@ from aiogram.client.default import DefaultBotProperties
 from hospital_quiz_bot.config.settings import settings
 from hospital_quiz_bot.config.logging_config import logger
 from hospital_quiz_bot.app.database.connection import init_db, close_db, get_session, async_session_factory
-from hospital_quiz_bot.app.handlers import commands, quiz, report
+from hospital_quiz_bot.app.handlers import admin, commands, quiz, report
+from hospital_quiz_bot.app.keyboards.screens import warm_screens
+from hospital_quiz_bot.app.services.openai_service import close_openai_service
+from hospital_quiz_bot.app.services.quiz_service import quiz_registry
+from hospital_quiz_bot.app.services.report_scheduler import report_scheduler
 
 
 # Create a proper async context manager for the session
@@ -61,6 +65,7 @@ async def main() -> None:
     dp = Dispatcher(storage=storage)
     
     # Register all routers
+    dp.include_router(admin.router)
     dp.include_router(commands.router)
     dp.include_router(quiz.router)
     dp.include_router(report.router)
@@ -70,12 +75,28 @@ async def main() -> None:
         session_pool=session_pool,
     )
     
+    # Build the question screens and keyboards before the first update
+    warm_screens()
+    
+    # Start the report generation workers
+    report_scheduler.start()
+    
+    # Start checking the quiz files for changes
+    quiz_registry.start()
+    
     try:
         # Start polling
         logger.info("Starting bot polling...")
         await bot.delete_webhook(drop_pending_updates=True)
         await dp.start_polling(bot)
     finally:
+        # Stop checking the quiz files and the report generation workers
+        await quiz_registry.stop()
+        await report_scheduler.stop()
+        
+        # Close the OpenAI connection pool
+        await close_openai_service()
+        
         # Close the database connection
         await close_db()
         logger.info("Database connection closed")
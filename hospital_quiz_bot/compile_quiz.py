@@ -0,0 +1,63 @@
+"""
+Quiz definition compiler for the Hospital Quiz Bot.
+This module validates the quiz file of every language and writes the compiled artifact the bot loads at startup.
+
+Usage:
+    python -m hospital_quiz_bot.compile_quiz
+    python -m hospital_quiz_bot.compile_quiz --check
+    python -m hospital_quiz_bot.compile_quiz --output /tmp/quizes.compiled.json
+
+The quiz files are those of QUIZ_FILES, and the artifact is written to QUIZ_ARTIFACT unless --output is given.
+Every file must follow the question schema, and every language must ask the questions of the default language
+in the same order, with the same types, sections, number of options and show_if conditions. Exits with status 1
+listing every problem found, without writing the artifact.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from hospital_quiz_bot.app.services.quiz_compiler import QuizDefinitionError, compile_quiz, write_artifact
+from hospital_quiz_bot.app.services.quiz_service import DEFAULT_LANGUAGE
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m hospital_quiz_bot.compile_quiz",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--output", type=Path, default=settings.quiz_artifact, help="Artifact to write")
+    parser.add_argument("--check", action="store_true", help="Only validate the quiz files")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    """Compile the quiz files and write the artifact."""
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        artifact = compile_quiz(settings.quiz_files, DEFAULT_LANGUAGE)
+    except QuizDefinitionError as e:
+        for error in e.errors:
+            logger.error(error)
+        sys.exit(1)
+    
+    questions = ", ".join(f"{len(items)} {language}" for language, items in artifact["languages"].items())
+    if args.check:
+        logger.info(f"Quiz files are valid: {questions} questions")
+        return
+    
+    write_artifact(artifact, args.output)
+    logger.info(
+        f"Wrote {args.output} ({args.output.stat().st_size} bytes) with {questions} questions "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
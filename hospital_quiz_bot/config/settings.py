@@ -3,9 +3,10 @@ Settings configuration for the Hospital Quiz Bot.
 This module loads environment variables and provides configuration settings for the bot.
 """
 
+import json
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
@@ -30,13 +31,78 @@ class DatabaseSettings(BaseModel):
     echo: bool = Field(False, description="Echo SQL statements")
 
 
+class ModelRoute(BaseModel):
+    """A model, optionally served by another OpenAI-compatible endpoint, that reports can be routed to"""
+    name: str = Field(..., description="Name of the route in logs, metrics and saved reports")
+    model: str = Field(..., description="Model to request")
+    base_url: Optional[str] = Field(None, description="Endpoint of the route; the OpenAI base URL if empty")
+    api_key: Optional[str] = Field(None, description="API key of the endpoint; the OpenAI API key if empty")
+    input_cost: float = Field(0.0, description="USD per million prompt tokens")
+    output_cost: float = Field(0.0, description="USD per million completion tokens")
+    latency_slo_ms: Optional[float] = Field(None, description="p95 report latency above which the route is skipped")
+    max_error_rate: float = Field(0.5, description="Share of failed calls above which the route is skipped")
+
+
 class OpenAISettings(BaseModel):
     """OpenAI API settings"""
     api_key: str = Field(..., description="OpenAI API key")
+    base_url: Optional[str] = Field(None, description="OpenAI-compatible endpoint to use instead of the OpenAI API")
     model: str = Field("gpt-4o-mini", description="OpenAI model to use")
+    input_cost: float = Field(0.0, description="USD per million prompt tokens of the model, when no routes are set")
+    output_cost: float = Field(0.0, description="USD per million completion tokens of the model, when no routes are set")
     temperature: float = Field(0.7, description="Temperature for response generation")
     max_tokens: int = Field(2000, description="Maximum tokens in response")
     top_p: float = Field(0.95, description="Top-p sampling parameter")
+    request_timeout: float = Field(60.0, description="Total timeout for a single API request in seconds")
+    connect_timeout: float = Field(10.0, description="Connection timeout for API requests in seconds")
+    deadline: float = Field(90.0, description="End-to-end deadline for one report, including retries, in seconds")
+    max_retries: int = Field(3, description="Maximum number of retries for transient errors")
+    backoff_base: float = Field(1.0, description="Base delay for exponential retry backoff in seconds")
+    backoff_max: float = Field(20.0, description="Maximum delay between retries in seconds")
+    breaker_failure_threshold: int = Field(5, description="Consecutive failures that open the circuit breaker")
+    breaker_reset_timeout: float = Field(30.0, description="Seconds the circuit breaker stays open before probing")
+    hedge_enabled: bool = Field(False, description="Send a second request when the first exceeds the p95 latency")
+    hedge_min_samples: int = Field(20, description="Latency samples needed before requests are hedged")
+    adaptive_max_tokens: bool = Field(True, description="Size max_tokens from the report length requested in the prompt")
+    routes: List[ModelRoute] = Field(default_factory=list, description="Routes in order of preference; just model if empty")
+    route_window: float = Field(300.0, description="Seconds of calls the latency and error rate of a route are judged on")
+    route_min_samples: int = Field(5, description="Calls needed in the window before a route can be skipped")
+    
+    def get_routes(self) -> List[ModelRoute]:
+        """Get the configured routes, or a single route for the configured model."""
+        return self.routes or [
+            ModelRoute(name=self.model, model=self.model, input_cost=self.input_cost, output_cost=self.output_cost)
+        ]
+
+
+class ReportSettings(BaseModel):
+    """Report generation settings"""
+    max_concurrent: int = Field(4, description="Maximum number of reports generated at the same time")
+    max_queue_size: int = Field(50, description="Maximum number of reports waiting for a free slot")
+    job_timeout: float = Field(180.0, description="Seconds after which a running report job is aborted, 0 for no limit")
+    claim_ttl: float = Field(300.0, description="Seconds after which another process may take over an unfinished report")
+    claim_poll_interval: float = Field(1.0, description="Seconds between checks for a report generated by another process")
+    daily_budget: float = Field(0.0, description="USD all reports of a day (UTC) may cost, 0 for no limit")
+    user_daily_budget: float = Field(0.0, description="USD the reports of one user may cost per day (UTC), 0 for no limit")
+    streaming: bool = Field(True, description="Show reports progressively while they are generated")
+    stream_edit_interval: float = Field(1.0, description="Minimum seconds between edits of a streamed message")
+    cache_enabled: bool = Field(True, description="Reuse reports generated from identical answers")
+    cache_size: int = Field(256, description="Number of reports kept in the in-memory cache")
+    cache_free_text: bool = Field(False, description="Also cache reports for answers containing free text")
+    prompt_encoding: str = Field("full", description="Patient data encoding in prompts: full, compact or grouped")
+    sectioned: bool = Field(False, description="Generate the report sections concurrently with their own prompts")
+    structured: bool = Field(False, description="Request reports as JSON with one field per section and repair failing sections")
+    prompt_variants: Dict[str, float] = Field(default_factory=dict, description="Report prompt variants by weight; no experiment if empty")
+    section_length_tolerance: float = Field(0.25, description="Share by which a structured report section may miss its length range")
+    intake_workers: int = Field(2, description="Reports of a bulk intake file queued at the same time")
+    intake_max_rows: int = Field(500, description="Maximum number of exams in a bulk intake file")
+    speculative: bool = Field(False, description="Start generating the report while the summary is being reviewed")
+    speculative_ttl: float = Field(600.0, description="Seconds an unclaimed speculative report is kept")
+    engine: str = Field("llm", description="Report engine: llm, or template to always render reports from templates")
+    template_preview: bool = Field(False, description="Show a template report while the LLM report is generated")
+    template_fallback: bool = Field(True, description="Serve template reports when the LLM is down or overloaded")
+    fallback_queue_depth: int = Field(20, description="Queued reports at which new reports fall back to templates")
+    fallback_max_wait: float = Field(120.0, description="Expected queue wait in seconds at which reports fall back to templates")
 
 
 class AppSettings(BaseModel):
@@ -44,11 +110,42 @@ class AppSettings(BaseModel):
     telegram: TelegramSettings
     database: DatabaseSettings
     openai: OpenAISettings
-    quiz_file: Path = Field(BASE_DIR / "data" / "quizes.yaml", description="Path to quiz questions file")
+    report: ReportSettings
+    quiz_files: Dict[str, Path] = Field(default_factory=dict, description="Path to the quiz questions file of each language")
+    quiz_artifact: Path = Field(BASE_DIR / "data" / "quizes.compiled.json", description="Path to the compiled quiz questions")
+    quiz_versions_dir: Path = Field(BASE_DIR / "data" / "quiz_versions", description="Directory keeping every quiz version")
+    quiz_reload_interval: float = Field(5.0, description="Seconds between checks of the quiz files for changes")
+    quiz_session_ttl: float = Field(86400.0, description="Seconds an unfinished quiz keeps its version in memory")
     prompts_file: Path = Field(BASE_DIR / "data" / "prompts.md", description="Path to prompts file")
+    prompts_reload_interval: float = Field(5.0, description="Seconds between checks of the prompts file for changes")
+    templates_dir: Path = Field(BASE_DIR / "data" / "templates", description="Path to report templates directory")
     log_level: str = Field("INFO", description="Logging level")
 
 
+def parse_routes(value: str) -> List[ModelRoute]:
+    """Parse a JSON list of routes, naming unnamed routes after their model."""
+    if not value.strip():
+        return []
+    return [ModelRoute(**{"name": route.get("model"), **route}) for route in json.loads(value)]
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """Parse a JSON object of names and weights, dropping names without a positive weight."""
+    if not value.strip():
+        return {}
+    return {name: float(weight) for name, weight in json.loads(value).items() if float(weight) > 0}
+
+
+def parse_quiz_files(value: str, default_file: Optional[str] = None) -> Dict[str, Path]:
+    """Parse a JSON object of languages and their quiz files; without one, the bundled files of uk and de."""
+    if value.strip():
+        return {language: Path(file_path) for language, file_path in json.loads(value).items()}
+    return {
+        "uk": Path(default_file or BASE_DIR / "data" / "quizes.yaml"),
+        "de": BASE_DIR / "data" / "quizes_de.yaml",
+    }
+
+
 def load_settings() -> AppSettings:
     """Load settings from environment variables"""
     return AppSettings(
@@ -63,13 +160,64 @@ def load_settings() -> AppSettings:
         ),
         openai=OpenAISettings(
             api_key=os.getenv("OPENAI_API_KEY", ""),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
             model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            input_cost=float(os.getenv("OPENAI_INPUT_COST", "0")),
+            output_cost=float(os.getenv("OPENAI_OUTPUT_COST", "0")),
             temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.7")),
             max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "2000")),
             top_p=float(os.getenv("OPENAI_TOP_P", "0.95")),
+            request_timeout=float(os.getenv("OPENAI_REQUEST_TIMEOUT", "60")),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+            deadline=float(os.getenv("OPENAI_DEADLINE", "90")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+            backoff_base=float(os.getenv("OPENAI_BACKOFF_BASE", "1.0")),
+            backoff_max=float(os.getenv("OPENAI_BACKOFF_MAX", "20")),
+            breaker_failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURE_THRESHOLD", "5")),
+            breaker_reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET_TIMEOUT", "30")),
+            hedge_enabled=os.getenv("OPENAI_HEDGE_ENABLED", "False").lower() == "true",
+            hedge_min_samples=int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20")),
+            adaptive_max_tokens=os.getenv("OPENAI_ADAPTIVE_MAX_TOKENS", "True").lower() == "true",
+            routes=parse_routes(os.getenv("OPENAI_ROUTES", "")),
+            route_window=float(os.getenv("OPENAI_ROUTE_WINDOW", "300")),
+            route_min_samples=int(os.getenv("OPENAI_ROUTE_MIN_SAMPLES", "5")),
+        ),
+        report=ReportSettings(
+            max_concurrent=int(os.getenv("REPORT_MAX_CONCURRENT", "4")),
+            max_queue_size=int(os.getenv("REPORT_MAX_QUEUE_SIZE", "50")),
+            job_timeout=float(os.getenv("REPORT_JOB_TIMEOUT", "180")),
+            claim_ttl=float(os.getenv("REPORT_CLAIM_TTL", "300")),
+            claim_poll_interval=float(os.getenv("REPORT_CLAIM_POLL_INTERVAL", "1.0")),
+            daily_budget=float(os.getenv("REPORT_DAILY_BUDGET", "0")),
+            user_daily_budget=float(os.getenv("REPORT_USER_DAILY_BUDGET", "0")),
+            streaming=os.getenv("REPORT_STREAMING", "True").lower() == "true",
+            stream_edit_interval=float(os.getenv("REPORT_STREAM_EDIT_INTERVAL", "1.0")),
+            cache_enabled=os.getenv("REPORT_CACHE_ENABLED", "True").lower() == "true",
+            cache_size=int(os.getenv("REPORT_CACHE_SIZE", "256")),
+            cache_free_text=os.getenv("REPORT_CACHE_FREE_TEXT", "False").lower() == "true",
+            prompt_encoding=os.getenv("REPORT_PROMPT_ENCODING", "full"),
+            sectioned=os.getenv("REPORT_SECTIONED", "False").lower() == "true",
+            structured=os.getenv("REPORT_STRUCTURED", "False").lower() == "true",
+            section_length_tolerance=float(os.getenv("REPORT_SECTION_LENGTH_TOLERANCE", "0.25")),
+            prompt_variants=parse_weights(os.getenv("REPORT_PROMPT_VARIANTS", "")),
+            intake_workers=int(os.getenv("REPORT_INTAKE_WORKERS", "2")),
+            intake_max_rows=int(os.getenv("REPORT_INTAKE_MAX_ROWS", "500")),
+            speculative=os.getenv("REPORT_SPECULATIVE", "False").lower() == "true",
+            speculative_ttl=float(os.getenv("REPORT_SPECULATIVE_TTL", "600")),
+            engine=os.getenv("REPORT_ENGINE", "llm"),
+            template_preview=os.getenv("REPORT_TEMPLATE_PREVIEW", "False").lower() == "true",
+            template_fallback=os.getenv("REPORT_TEMPLATE_FALLBACK", "True").lower() == "true",
+            fallback_queue_depth=int(os.getenv("REPORT_FALLBACK_QUEUE_DEPTH", "20")),
+            fallback_max_wait=float(os.getenv("REPORT_FALLBACK_MAX_WAIT", "120")),
         ),
-        quiz_file=Path(os.getenv("QUIZ_FILE", str(BASE_DIR / "data" / "quizes.yaml"))),
+        quiz_files=parse_quiz_files(os.getenv("QUIZ_FILES", ""), os.getenv("QUIZ_FILE")),
+        quiz_artifact=Path(os.getenv("QUIZ_ARTIFACT") or BASE_DIR / "data" / "quizes.compiled.json"),
+        quiz_versions_dir=Path(os.getenv("QUIZ_VERSIONS_DIR") or BASE_DIR / "data" / "quiz_versions"),
+        quiz_reload_interval=float(os.getenv("QUIZ_RELOAD_INTERVAL", "5")),
+        quiz_session_ttl=float(os.getenv("QUIZ_SESSION_TTL", "86400")),
         prompts_file=Path(os.getenv("PROMPTS_FILE", str(BASE_DIR / "data" / "prompts.md"))),
+        prompts_reload_interval=float(os.getenv("PROMPTS_RELOAD_INTERVAL", "5")),
+        templates_dir=Path(os.getenv("TEMPLATES_DIR", str(BASE_DIR / "data" / "templates"))),
         log_level=os.getenv("LOG_LEVEL", "INFO"),
     )
 
@@ -0,0 +1,81 @@
+"""
+Bulk intake for the Hospital Quiz Bot.
+This module saves a spreadsheet of knee examinations as completed quizzes and generates their reports,
+the command line equivalent of uploading the file to the bot as the admin.
+
+Usage:
+    python -m hospital_quiz_bot.intake exams.csv --output reports.csv
+    python -m hospital_quiz_bot.intake exams.xlsx --output reports.csv --language de --workers 4
+
+The file has one row per exam and one column per question id of quizes.yaml, plus optional
+exam_id and language columns. Rows that fail validation are listed in the output with their errors.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from hospital_quiz_bot.app.database.connection import init_db, close_db, async_session_factory
+from hospital_quiz_bot.app.services.intake_service import LANGUAGES, IntakeError, IntakeService
+from hospital_quiz_bot.config.settings import settings
+from hospital_quiz_bot.config.logging_config import logger
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m hospital_quiz_bot.intake",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("input", type=Path, help="CSV or XLSX file of exams")
+    parser.add_argument("--output", type=Path, required=True, help="CSV file to write the reports to")
+    parser.add_argument("--language", choices=LANGUAGES, default="uk", help="Language of rows without a language column")
+    parser.add_argument("--workers", type=int, default=settings.report.intake_workers, help="Concurrent reports")
+    parser.add_argument("--user-id", type=int, default=settings.telegram.admin_user_id,
+                        help="Telegram user the exams are saved for (defaults to ADMIN_USER_ID)")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between progress logs")
+    args = parser.parse_args(argv)
+    if args.user_id is None:
+        parser.error("--user-id is required when ADMIN_USER_ID is not set")
+    return args
+
+
+async def main(argv=None) -> None:
+    """Run the intake of a file and write the results."""
+    args = parse_args(argv)
+    last_report = time.monotonic()
+    
+    async def on_progress(done: int, total: int) -> None:
+        nonlocal last_report
+        if done == total or time.monotonic() - last_report >= args.report_interval:
+            last_report = time.monotonic()
+            logger.info(f"Generated {done}/{total} reports")
+    
+    await init_db()
+    try:
+        result = await IntakeService(async_session_factory, args.workers).run(
+            args.input.name, args.input.read_bytes(), args.user_id, args.language, on_progress
+        )
+    except IntakeError as e:
+        raise SystemExit(str(e))
+    finally:
+        await close_db()
+    
+    args.output.write_bytes(result.to_csv())
+    if result.unknown_columns:
+        logger.warning(f"Ignored columns: {', '.join(result.unknown_columns)}")
+    logger.info(
+        f"Wrote {args.output}: {result.count('generated')} generated, "
+        f"{result.count('failed')} failed, {result.count('invalid')} invalid"
+    )
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Intake interrupted")
+        sys.exit(1)
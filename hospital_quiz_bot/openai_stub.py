@@ -0,0 +1,592 @@
+"""
+Local OpenAI-compatible stub server for the Hospital Quiz Bot.
+This module provides a stand-in for the OpenAI API with configurable latency, token rates and errors,
+so the report path can be benchmarked and tested offline.
+
+Usage:
+    python -m hospital_quiz_bot.openai_stub --port 8800
+    python -m hospital_quiz_bot.openai_stub --latency lognormal:0.8,0.5 --tokens-per-second 60 --rate-limit-rate 0.05
+
+Point the bot at it with OPENAI_BASE_URL=http://127.0.0.1:8800/v1 (any API key is accepted).
+
+Endpoints:
+    POST /v1/chat/completions    chat completions, with stream=True as server-sent events
+    GET  /v1/models              the models the stub answers for
+    POST /v1/files               upload a Batch API input file
+    GET  /v1/files/{id}          file metadata; /content returns the file
+    POST /v1/batches             start a batch; GET /v1/batches/{id} polls it, POST .../cancel cancels it
+    GET  /stub/stats             request and injected error counters
+    POST /stub/config            change latency, token rate and error rates of the running server
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from hospital_quiz_bot.app.utils.tokens import count_message_tokens, count_tokens
+from hospital_quiz_bot.config.logging_config import logger
+
+# Splits generated text into the pieces that stand in for tokens when pacing output
+TOKEN_PIECE_PATTERN = re.compile(r"\S+\s*|\s+")
+
+# Separates the canned responses of a responses file
+RESPONSE_SEPARATOR = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+
+# Filler report used when no canned responses or template are given
+DEFAULT_RESPONSE = (
+    "Пацієнт самостійно прибув на огляд. Загальний стан задовільний. "
+    "Об'єм рухів у колінному суглобі збережений, ознак випоту не виявлено. "
+    "Стабільність зв'язкового апарату без патологічних змін. "
+)
+
+
+class LatencyDistribution:
+    """Time to first token, sampled from a distribution given as "kind:arg1,arg2".
+    
+    Supported kinds, all in seconds: fixed:delay, uniform:low,high, normal:mean,stddev,
+    lognormal:median,sigma and exponential:mean.
+    """
+    
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+    
+    def __init__(self, spec: str, rng: random.Random):
+        """Parse the distribution spec."""
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}', expected one of {', '.join(self.KINDS)}")
+        values = [float(value) for value in args.split(",") if value.strip()] if args else [0.0]
+        if len(values) != self.KINDS[kind]:
+            raise ValueError(f"Latency distribution '{kind}' takes {self.KINDS[kind]} argument(s)")
+        
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+        self.rng = rng
+    
+    def sample(self) -> float:
+        """Draw a latency in seconds."""
+        if self.kind == "fixed":
+            delay = self.values[0]
+        elif self.kind == "uniform":
+            delay = self.rng.uniform(*self.values)
+        elif self.kind == "normal":
+            delay = self.rng.gauss(*self.values)
+        elif self.kind == "lognormal":
+            median, sigma = self.values
+            delay = self.rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        else:
+            delay = self.rng.expovariate(1 / self.values[0]) if self.values[0] > 0 else 0.0
+        return max(0.0, delay)
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server; every field can be changed at runtime through /stub/config."""
+    latency: str = "fixed:0.2"
+    tokens_per_second: float = 80.0
+    chunk_tokens: int = 4
+    completion_tokens: int = 500
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_hang: float = 600.0
+    retry_after: float = 1.0
+    batch_delay: float = 1.0
+    template: Optional[str] = None
+    models: List[str] = field(default_factory=lambda: ["gpt-4o-mini", "gpt-4o", "gpt-4.1-mini"])
+
+
+class ResponseGenerator:
+    """Produces completion texts from canned responses, a format template or filler text."""
+    
+    def __init__(self, config: StubConfig, responses: List[str]):
+        """Initialize the generator."""
+        self.config = config
+        self.responses = responses
+        self._next = 0
+    
+    def generate(self, body: Dict[str, Any], request_number: int) -> str:
+        """Get the completion text for a chat completion request."""
+        if self.responses:
+            text = self.responses[self._next % len(self.responses)]
+            self._next += 1
+            return text
+        
+        messages = body.get("messages") or []
+        if self.config.template:
+            patient_data = messages[-1].get("content", "") if messages else ""
+            return self.config.template.format(
+                model=body.get("model", ""),
+                request_number=request_number,
+                prompt_tokens=count_message_tokens(messages, body.get("model", "")),
+                patient_data=patient_data,
+            )
+        
+        # Repeat the filler until it reaches roughly the configured length
+        repeats = max(1, math.ceil(self.config.completion_tokens / count_tokens(DEFAULT_RESPONSE, "")))
+        return (DEFAULT_RESPONSE * repeats).strip()
+
+
+class StubServer:
+    """OpenAI-compatible HTTP server with latency, token rate and error injection."""
+    
+    def __init__(self, config: StubConfig, responses: List[str], seed: Optional[int] = None):
+        """Initialize the server state."""
+        self.config = config
+        self.rng = random.Random(seed)
+        self.latency = LatencyDistribution(config.latency, self.rng)
+        self.generator = ResponseGenerator(config, responses)
+        self.stats: Counter = Counter()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._batch_tasks: Dict[str, asyncio.Task] = {}
+    
+    def create_app(self) -> web.Application:
+        """Create the aiohttp application with all routes."""
+        app = web.Application(client_max_size=200 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/v1/models", self.list_models)
+        app.router.add_post("/v1/files", self.upload_file)
+        app.router.add_get("/v1/files/{file_id}", self.get_file)
+        app.router.add_get("/v1/files/{file_id}/content", self.get_file_content)
+        app.router.add_post("/v1/batches", self.create_batch)
+        app.router.add_get("/v1/batches", self.list_batches)
+        app.router.add_get("/v1/batches/{batch_id}", self.get_batch)
+        app.router.add_post("/v1/batches/{batch_id}/cancel", self.cancel_batch)
+        app.router.add_get("/stub/stats", self.get_stats)
+        app.router.add_post("/stub/config", self.update_config)
+        app.on_shutdown.append(self._cancel_batches)
+        return app
+    
+    # Chat completions
+    
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        """Answer a chat completion request, streaming it if requested."""
+        body = await request.json()
+        self.stats["requests"] += 1
+        request_number = self.stats["requests"]
+        
+        error = self._inject_error()
+        if error == "timeout":
+            # Hang without answering, so the client's own timeout fires
+            await asyncio.sleep(self.config.timeout_hang)
+            return self._error_response(504, "Gateway timeout", "timeout")
+        if error:
+            return self._error_response(*error)
+        
+        completion = self._build_completion(body, request_number)
+        await asyncio.sleep(self.latency.sample())
+        
+        if body.get("stream"):
+            return await self._stream_completion(request, body, completion)
+        
+        await asyncio.sleep(self._generation_time(completion["usage"]["completion_tokens"]))
+        self.stats["completed"] += 1
+        return web.json_response(completion)
+    
+    def _inject_error(self) -> Optional[Any]:
+        """Decide whether the current request fails, and how."""
+        roll = self.rng.random()
+        config = self.config
+        if roll < config.rate_limit_rate:
+            self.stats["injected_429"] += 1
+            return 429, "Rate limit reached (injected by stub)", "rate_limit_exceeded"
+        roll -= config.rate_limit_rate
+        if roll < config.server_error_rate:
+            self.stats["injected_500"] += 1
+            return 500, "The server had an error processing your request (injected by stub)", "server_error"
+        roll -= config.server_error_rate
+        if roll < config.timeout_rate:
+            self.stats["injected_timeout"] += 1
+            return "timeout"
+        return None
+    
+    def _error_response(self, status: int, message: str, code: str) -> web.Response:
+        """Build an error in the OpenAI error format."""
+        headers = {"Retry-After": f"{self.config.retry_after:g}"} if status == 429 else None
+        error_type = "requests" if status == 429 else "server_error"
+        return web.json_response(
+            {"error": {"message": message, "type": error_type, "param": None, "code": code}},
+            status=status,
+            headers=headers,
+        )
+    
+    def _build_completion(self, body: Dict[str, Any], request_number: int) -> Dict[str, Any]:
+        """Generate the full completion, truncated to max_tokens like the real API."""
+        model = body.get("model", "")
+        text = self.generator.generate(body, request_number)
+        finish_reason = "stop"
+        
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and count_tokens(text, model) > max_tokens:
+            text = self._truncate(text, max_tokens, model)
+            finish_reason = "length"
+        
+        prompt_tokens = count_message_tokens(body.get("messages") or [], model)
+        completion_tokens = count_tokens(text, model)
+        return {
+            "id": f"chatcmpl-stub-{request_number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "system_fingerprint": "fp_stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text, "refusal": None},
+                "logprobs": None,
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+    
+    @staticmethod
+    def _truncate(text: str, max_tokens: int, model: str) -> str:
+        """Cut a text down to at most max_tokens."""
+        pieces = TOKEN_PIECE_PATTERN.findall(text)
+        low, high = 0, len(pieces)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens("".join(pieces[:middle]), model) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return "".join(pieces[:low])
+    
+    def _generation_time(self, completion_tokens: int) -> float:
+        """Get the time the configured token rate needs to produce a completion."""
+        rate = self.config.tokens_per_second
+        return completion_tokens / rate if rate > 0 else 0.0
+    
+    async def _stream_completion(
+        self,
+        request: web.Request,
+        body: Dict[str, Any],
+        completion: Dict[str, Any],
+    ) -> web.StreamResponse:
+        """Send a completion as server-sent events, paced at the configured token rate."""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        
+        choice = completion["choices"][0]
+        text = choice["message"]["content"]
+        pieces = TOKEN_PIECE_PATTERN.findall(text)
+        chunk_tokens = max(1, self.config.chunk_tokens)
+        # Spread the generation time of the whole completion evenly over the chunks
+        chunk_count = max(1, math.ceil(len(pieces) / chunk_tokens))
+        chunk_delay = self._generation_time(completion["usage"]["completion_tokens"]) / chunk_count
+        
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": completion["id"],
+                "object": "chat.completion.chunk",
+                "created": completion["created"],
+                "model": completion["model"],
+                "system_fingerprint": completion["system_fingerprint"],
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+            }
+        
+        try:
+            await self._send_event(response, chunk({"role": "assistant", "content": ""}))
+            for start in range(0, len(pieces), chunk_tokens):
+                await asyncio.sleep(chunk_delay)
+                await self._send_event(response, chunk({"content": "".join(pieces[start:start + chunk_tokens])}))
+            await self._send_event(response, chunk({}, choice["finish_reason"]))
+            
+            if (body.get("stream_options") or {}).get("include_usage"):
+                final = chunk({})
+                final["choices"] = []
+                final["usage"] = completion["usage"]
+                await self._send_event(response, final)
+            await response.write(b"data: [DONE]\n\n")
+            self.stats["completed"] += 1
+        except (ConnectionResetError, asyncio.CancelledError):
+            # The client closed the stream early
+            self.stats["streams_aborted"] += 1
+            raise
+        return response
+    
+    @staticmethod
+    async def _send_event(response: web.StreamResponse, data: Dict[str, Any]) -> None:
+        """Write one server-sent event."""
+        await response.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+    
+    async def list_models(self, request: web.Request) -> web.Response:
+        """List the models the stub answers for."""
+        return web.json_response({
+            "object": "list",
+            "data": [{"id": model, "object": "model", "created": 0, "owned_by": "stub"} for model in self.config.models],
+        })
+    
+    # Files
+    
+    async def upload_file(self, request: web.Request) -> web.Response:
+        """Store an uploaded file in memory."""
+        purpose = "batch"
+        filename = "upload.jsonl"
+        content = b""
+        
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "purpose":
+                purpose = (await part.text()).strip()
+            elif part.name == "file":
+                filename = part.filename or filename
+                content = await part.read()
+        
+        file = self._store_file(content, filename, purpose)
+        return web.json_response(file["meta"])
+    
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        """Keep a file and its metadata."""
+        file_id = f"file-stub-{uuid.uuid4().hex[:24]}"
+        meta = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        self.files[file_id] = {"meta": meta, "content": content}
+        return self.files[file_id]
+    
+    async def get_file(self, request: web.Request) -> web.Response:
+        """Get the metadata of a file."""
+        file = self.files.get(request.match_info["file_id"])
+        if file is None:
+            return self._not_found("file")
+        return web.json_response(file["meta"])
+    
+    async def get_file_content(self, request: web.Request) -> web.Response:
+        """Get the content of a file."""
+        file = self.files.get(request.match_info["file_id"])
+        if file is None:
+            return self._not_found("file")
+        return web.Response(body=file["content"], content_type="application/jsonl")
+    
+    @staticmethod
+    def _not_found(kind: str) -> web.Response:
+        return web.json_response(
+            {"error": {"message": f"No such {kind}", "type": "invalid_request_error", "param": None, "code": None}},
+            status=404,
+        )
+    
+    # Batches
+    
+    async def create_batch(self, request: web.Request) -> web.Response:
+        """Start processing a batch input file in the background."""
+        body = await request.json()
+        input_file_id = body.get("input_file_id")
+        if input_file_id not in self.files:
+            return self._not_found("file")
+        
+        batch_id = f"batch_stub_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": input_file_id,
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "in_progress_at": None,
+            "completed_at": None,
+            "cancelled_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        self.batches[batch_id] = batch
+        self._batch_tasks[batch_id] = asyncio.create_task(self._process_batch(batch))
+        return web.json_response(batch)
+    
+    async def _process_batch(self, batch: Dict[str, Any]) -> None:
+        """Answer every request of a batch and write the output and error files."""
+        lines = self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        requests = [json.loads(line) for line in lines if line.strip()]
+        batch["request_counts"]["total"] = len(requests)
+        
+        await asyncio.sleep(self.config.batch_delay)
+        batch["status"] = "in_progress"
+        batch["in_progress_at"] = int(time.time())
+        
+        outputs, errors = [], []
+        try:
+            for item in requests:
+                self.stats["batch_requests"] += 1
+                record, failed = self._answer_batch_request(item)
+                (errors if failed else outputs).append(json.dumps(record, ensure_ascii=False))
+                batch["request_counts"]["failed" if failed else "completed"] += 1
+                # Let polls and other requests through on large batches
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            batch["status"] = "cancelled"
+            batch["cancelled_at"] = int(time.time())
+            raise
+        
+        if outputs:
+            batch["output_file_id"] = self._store_file(
+                ("\n".join(outputs) + "\n").encode("utf-8"), "batch_output.jsonl", "batch_output"
+            )["meta"]["id"]
+        if errors:
+            batch["error_file_id"] = self._store_file(
+                ("\n".join(errors) + "\n").encode("utf-8"), "batch_errors.jsonl", "batch_output"
+            )["meta"]["id"]
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+        self._batch_tasks.pop(batch["id"], None)
+    
+    def _answer_batch_request(self, item: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Build the output record of one batch request and whether it failed."""
+        self.stats["requests"] += 1
+        record = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": item.get("custom_id"), "error": None}
+        
+        error = self._inject_error()
+        if error:
+            status, message, code = (504, "Gateway timeout", "timeout") if error == "timeout" else error
+            record["response"] = {
+                "status_code": status,
+                "request_id": record["id"],
+                "body": {"error": {"message": message, "type": "server_error", "param": None, "code": code}},
+            }
+            return record, True
+        
+        completion = self._build_completion(item.get("body") or {}, self.stats["requests"])
+        record["response"] = {"status_code": 200, "request_id": record["id"], "body": completion}
+        self.stats["completed"] += 1
+        return record, False
+    
+    async def list_batches(self, request: web.Request) -> web.Response:
+        """List all batches."""
+        return web.json_response({"object": "list", "data": list(self.batches.values()), "has_more": False})
+    
+    async def get_batch(self, request: web.Request) -> web.Response:
+        """Get the status of a batch."""
+        batch = self.batches.get(request.match_info["batch_id"])
+        if batch is None:
+            return self._not_found("batch")
+        return web.json_response(batch)
+    
+    async def cancel_batch(self, request: web.Request) -> web.Response:
+        """Cancel a running batch."""
+        batch = self.batches.get(request.match_info["batch_id"])
+        if batch is None:
+            return self._not_found("batch")
+        
+        task = self._batch_tasks.pop(batch["id"], None)
+        if task and not task.done():
+            batch["status"] = "cancelling"
+            task.cancel()
+        return web.json_response(batch)
+    
+    async def _cancel_batches(self, app: web.Application) -> None:
+        for task in self._batch_tasks.values():
+            task.cancel()
+    
+    # Control
+    
+    async def get_stats(self, request: web.Request) -> web.Response:
+        """Get the request and injected error counters."""
+        return web.json_response({"stats": dict(self.stats), "config": asdict(self.config)})
+    
+    async def update_config(self, request: web.Request) -> web.Response:
+        """Change the configuration of the running server."""
+        changes = await request.json()
+        known = {config_field.name for config_field in fields(StubConfig)}
+        unknown = set(changes) - known
+        if unknown:
+            return web.json_response({"error": f"Unknown settings: {', '.join(sorted(unknown))}"}, status=400)
+        
+        if "latency" in changes:
+            try:
+                self.latency = LatencyDistribution(changes["latency"], self.rng)
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+        for name, value in changes.items():
+            setattr(self.config, name, value)
+        
+        logger.info(f"Stub configuration changed: {changes}")
+        return web.json_response(asdict(self.config))
+
+
+def load_responses(path: Optional[Path]) -> List[str]:
+    """Load canned responses from a file, separated by lines of dashes."""
+    if path is None:
+        return []
+    with open(path, "r", encoding="utf-8") as file:
+        return [response.strip() for response in RESPONSE_SEPARATOR.split(file.read()) if response.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    defaults = StubConfig()
+    parser = argparse.ArgumentParser(
+        prog="python -m hospital_quiz_bot.openai_stub",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible latencies and errors")
+    parser.add_argument("--latency", default=defaults.latency,
+                        help="Time to first token, e.g. fixed:0.2, uniform:0.1,1, normal:0.8,0.2, lognormal:0.8,0.5, exponential:0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="Output token rate; 0 answers instantly")
+    parser.add_argument("--chunk-tokens", type=int, default=defaults.chunk_tokens, help="Tokens per streamed chunk")
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens,
+                        help="Approximate length of the filler response")
+    parser.add_argument("--responses", type=Path, help="File of canned responses separated by lines of dashes, used in turn")
+    parser.add_argument("--template",
+                        help="Response format string with {model}, {request_number}, {prompt_tokens} and {patient_data}")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="Share of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=defaults.server_error_rate, help="Share of requests answered with 500")
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate, help="Share of requests that hang")
+    parser.add_argument("--timeout-hang", type=float, default=defaults.timeout_hang, help="Seconds a hanging request waits")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after, help="Retry-After of 429 responses in seconds")
+    parser.add_argument("--batch-delay", type=float, default=defaults.batch_delay, help="Seconds before a batch starts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    """Run the stub server."""
+    args = parse_args(argv)
+    config = StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        chunk_tokens=args.chunk_tokens,
+        completion_tokens=args.completion_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_hang=args.timeout_hang,
+        retry_after=args.retry_after,
+        batch_delay=args.batch_delay,
+        template=args.template,
+    )
+    server = StubServer(config, load_responses(args.responses), seed=args.seed)
+    
+    logger.info(f"OpenAI stub listening on http://{args.host}:{args.port}/v1 ({config})")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+Bulk report regeneration for the Hospital Quiz Bot.
+This module regenerates the reports of completed quizzes, e.g. after the prompts have changed.
+
+Usage:
+    python -m hospital_quiz_bot.regenerate run --workers 8
+    python -m hospital_quiz_bot.regenerate run --retry-failed
+    python -m hospital_quiz_bot.regenerate export --output batch_input.jsonl
+    python -m hospital_quiz_bot.regenerate ingest --input batch_output.jsonl
+
+Every mode keeps a checkpoint file and continues where it stopped when run with --resume. A resumed run only
+goes on past the last row reached; the rows that failed are listed in the checkpoint, and run --retry-failed
+regenerates just those.
+Use --base-url to run against a local OpenAI-compatible server instead of the real API.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, Set, Tuple
+
+from hospital_quiz_bot.app.database.connection import init_db, close_db, async_session_factory
+from hospital_quiz_bot.app.database.repository import QuizResponseRepository
+from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.services.model_router import model_router
+from hospital_quiz_bot.app.services.openai_service import OpenAIService, ReportUsage
+from hospital_quiz_bot.app.services.report_service import ReportService
+from hospital_quiz_bot.app.services.usage_service import UsageService
+from hospital_quiz_bot.config.logging_config import logger
+
+# Prefix of the Batch API custom_id of each request
+CUSTOM_ID_PREFIX = "quiz_response-"
+
+# Share of the regular token prices the Batch API charges
+BATCH_PRICE_FACTOR = 0.5
+
+
+class Checkpoint:
+    """Progress of a regeneration run, persisted as JSON after every batch."""
+    
+    def __init__(self, path: Path, mode: str, resume: bool):
+        """Load the checkpoint from disk, or start a new one."""
+        self.path = path
+        self.data: Dict[str, Any] = {"mode": mode, "last_id": 0, "line": 0, "processed": 0, "failed_ids": []}
+        
+        if resume and path.exists():
+            with open(path, "r", encoding="utf-8") as file:
+                saved = json.load(file)
+            if saved.get("mode") != mode:
+                raise SystemExit(f"Checkpoint {path} belongs to mode '{saved.get('mode')}', not '{mode}'")
+            self.data.update(saved)
+            logger.info(f"Resuming from checkpoint {path}: {self.data}")
+    
+    def save(self) -> None:
+        """Write the checkpoint atomically."""
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.data, file)
+        os.replace(tmp_path, self.path)
+
+
+class ThroughputReporter:
+    """Logs the processing rate at a fixed interval."""
+    
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.count = 0
+    
+    def tick(self, count: int = 1) -> None:
+        """Record processed items and log the rate if the interval has passed."""
+        self.count += count
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            logger.info(f"Processed {self.count} reports ({self.rate():.2f}/s)")
+    
+    def rate(self) -> float:
+        """Get the average number of items per second."""
+        elapsed = time.monotonic() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+    
+    def summary(self) -> str:
+        """Get a summary of the run."""
+        elapsed = time.monotonic() - self.started
+        return f"{self.count} reports in {elapsed:.1f}s ({self.rate():.2f}/s)"
+
+
+class Watermark:
+    """Highest ID below which every dispatched row has finished, for out-of-order completion."""
+    
+    def __init__(self, start: int):
+        self.value = start
+        self._dispatched: Deque[int] = deque()
+        self._done: Set[int] = set()
+    
+    def dispatch(self, row_id: int) -> None:
+        self._dispatched.append(row_id)
+    
+    def complete(self, row_id: int) -> None:
+        self._done.add(row_id)
+        while self._dispatched and self._dispatched[0] in self._done:
+            self.value = self._dispatched.popleft()
+            self._done.discard(self.value)
+
+
+def _make_openai_service(args: argparse.Namespace) -> OpenAIService:
+    """Create the OpenAI service, using a dummy key for local endpoints."""
+    api_key = args.api_key or (None if not args.base_url else os.getenv("OPENAI_API_KEY") or "local")
+    return OpenAIService(api_key=api_key, base_url=args.base_url)
+
+
+async def run_pool(args: argparse.Namespace) -> None:
+    """Regenerate reports through a bounded pool of concurrent API calls."""
+    openai_service = _make_openai_service(args)
+    if args.retry_failed and not args.checkpoint.exists():
+        raise SystemExit(f"No checkpoint {args.checkpoint} to retry the failed reports of")
+    checkpoint = Checkpoint(args.checkpoint, "run", args.resume or args.retry_failed)
+    # Reports that fail again are listed anew
+    retry_ids = sorted(set(checkpoint.data["failed_ids"])) if args.retry_failed else []
+    if args.retry_failed:
+        checkpoint.data["failed_ids"] = []
+    watermark = Watermark(checkpoint.data["last_id"])
+    reporter = ThroughputReporter(args.report_interval)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.workers * 2)
+    
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            
+            quiz_response_id, user_id, language, patient_data = item
+            decisions = []
+            usage = ReportUsage()
+            try:
+                # Regenerated reports count against the budgets like any other; rejected ones stay in failed_ids
+                async with async_session_factory() as session:
+                    await UsageService(session).check_budget(user_id)
+                started = time.monotonic()
+                report = await openai_service.complete_report(
+                    patient_data, language, on_route=decisions.append, usage=usage
+                )
+                usage.latency_ms = (time.monotonic() - started) * 1000
+                async with async_session_factory() as session:
+                    quiz_repo = QuizResponseRepository(session)
+                    await quiz_repo.update_report(
+                        quiz_response_id,
+                        report,
+                        decisions[-1].route.config.model,
+                        usage.prompt_tokens,
+                        usage.completion_tokens,
+                        usage.cached_tokens,
+                        usage.cost,
+                        usage.latency_ms,
+                    )
+                    await quiz_repo.commit()
+                checkpoint.data["processed"] += 1
+            except Exception as e:
+                logger.error(f"Failed to regenerate report {quiz_response_id}: {str(e)}")
+                checkpoint.data["failed_ids"].append(quiz_response_id)
+            
+            watermark.complete(quiz_response_id)
+            # Retried rows lie below the last row reached, which must not move back
+            checkpoint.data["last_id"] = max(checkpoint.data["last_id"], watermark.value)
+            reporter.tick()
+            if reporter.count % args.batch_size == 0:
+                checkpoint.save()
+    
+    async def read_failed(quiz_repo: QuizResponseRepository) -> AsyncIterator[QuizResponse]:
+        for quiz_response_id in retry_ids:
+            quiz_response = await quiz_repo.get_by_id(quiz_response_id)
+            # End the read transaction before handing the row out, as stream_completed does on SQLite
+            await quiz_repo.commit()
+            if quiz_response is not None:
+                yield quiz_response
+    
+    workers = [asyncio.create_task(worker()) for _ in range(args.workers)]
+    
+    dispatched = 0
+    dispatched_ids: Set[int] = set()
+    async with async_session_factory() as session:
+        report_service = ReportService(session, openai_service=openai_service)
+        quiz_repo = QuizResponseRepository(session)
+        
+        if args.retry_failed:
+            logger.info(f"Retrying {len(retry_ids)} failed reports")
+            rows = read_failed(quiz_repo)
+        else:
+            rows = quiz_repo.stream_completed(
+                after_id=checkpoint.data["last_id"],
+                language=args.language,
+                batch_size=args.batch_size,
+            )
+        async for quiz_response in rows:
+            if args.limit and dispatched >= args.limit:
+                break
+            watermark.dispatch(quiz_response.id)
+            patient_data = report_service._format_responses_for_prompt(quiz_response)
+            await queue.put((quiz_response.id, quiz_response.user_id, quiz_response.language or "uk", patient_data))
+            dispatched += 1
+            dispatched_ids.add(quiz_response.id)
+    
+    # Failed reports left out by --limit stay listed for the next retry
+    checkpoint.data["failed_ids"].extend(
+        quiz_response_id for quiz_response_id in retry_ids if quiz_response_id not in dispatched_ids
+    )
+    
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    
+    checkpoint.save()
+    logger.info(f"Regenerated {reporter.summary()}, failed: {len(checkpoint.data['failed_ids'])}")
+
+
+async def run_export(args: argparse.Namespace) -> None:
+    """Write the chat completion requests of all reports as a Batch API input file."""
+    openai_service = _make_openai_service(args)
+    checkpoint = Checkpoint(args.checkpoint, "export", args.resume)
+    reporter = ThroughputReporter(args.report_interval)
+    
+    file_mode = "a" if args.resume else "w"
+    with open(args.output, file_mode, encoding="utf-8") as output:
+        async with async_session_factory() as session:
+            report_service = ReportService(session, openai_service=openai_service)
+            quiz_repo = QuizResponseRepository(session)
+            
+            async for quiz_response in quiz_repo.stream_completed(
+                after_id=checkpoint.data["last_id"],
+                language=args.language,
+                batch_size=args.batch_size,
+            ):
+                if args.limit and reporter.count >= args.limit:
+                    break
+                
+                patient_data = report_service._format_responses_for_prompt(quiz_response)
+                request = {
+                    "custom_id": f"{CUSTOM_ID_PREFIX}{quiz_response.id}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": openai_service.build_request_body(patient_data, quiz_response.language or "uk"),
+                }
+                output.write(json.dumps(request, ensure_ascii=False) + "\n")
+                
+                checkpoint.data["last_id"] = quiz_response.id
+                checkpoint.data["processed"] += 1
+                reporter.tick()
+                if reporter.count % args.batch_size == 0:
+                    output.flush()
+                    checkpoint.save()
+    
+    checkpoint.save()
+    logger.info(f"Exported {reporter.summary()} to {args.output}")
+
+
+def get_batch_usage(body: Dict[str, Any]) -> Tuple[int, int, int, float]:
+    """Get the prompt, completion and cached tokens of a Batch API response and its estimated cost in USD.
+    
+    The cost uses the prices of the route of the model that answered, or of the preferred route.
+    """
+    usage = body.get("usage") or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    
+    # Responses name the dated model version, e.g. gpt-4o-mini-2024-07-18
+    model = body.get("model") or ""
+    route = next(
+        (route for route in model_router.routes if model.startswith(route.config.model)),
+        model_router.primary,
+    )
+    cost = BATCH_PRICE_FACTOR * (
+        prompt_tokens * route.config.input_cost + completion_tokens * route.config.output_cost
+    ) / 1_000_000
+    return prompt_tokens, completion_tokens, cached_tokens, cost
+
+
+async def run_ingest(args: argparse.Namespace) -> None:
+    """Store the reports from a Batch API output file."""
+    checkpoint = Checkpoint(args.checkpoint, "ingest", args.resume)
+    reporter = ThroughputReporter(args.report_interval)
+    
+    async with async_session_factory() as session:
+        quiz_repo = QuizResponseRepository(session)
+        
+        with open(args.input, "r", encoding="utf-8") as batch_output:
+            for line_number, line in enumerate(batch_output, start=1):
+                if line_number <= checkpoint.data["line"] or not line.strip():
+                    continue
+                
+                record = json.loads(line)
+                custom_id = record.get("custom_id", "")
+                response = record.get("response") or {}
+                try:
+                    if record.get("error") or response.get("status_code") != 200:
+                        raise ValueError(record.get("error") or f"status {response.get('status_code')}")
+                    quiz_response_id = int(custom_id[len(CUSTOM_ID_PREFIX):])
+                    body = response["body"]
+                    report = body["choices"][0]["message"]["content"]
+                    await quiz_repo.update_report(quiz_response_id, report, body.get("model"), *get_batch_usage(body))
+                    checkpoint.data["processed"] += 1
+                except Exception as e:
+                    logger.error(f"Skipping batch result {custom_id or line_number}: {str(e)}")
+                    checkpoint.data["failed_ids"].append(custom_id or line_number)
+                
+                checkpoint.data["line"] = line_number
+                reporter.tick()
+                if reporter.count % args.batch_size == 0:
+                    await quiz_repo.commit()
+                    checkpoint.save()
+        
+        await quiz_repo.commit()
+    
+    checkpoint.save()
+    logger.info(f"Ingested {reporter.summary()}, failed: {len(checkpoint.data['failed_ids'])}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m hospital_quiz_bot.regenerate",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--checkpoint", type=Path, help="Checkpoint file (default: regenerate_<mode>.checkpoint.json)")
+    common.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    common.add_argument("--batch-size", type=int, default=100, help="Rows per cursor fetch and checkpoint")
+    common.add_argument("--report-interval", type=float, default=10.0, help="Seconds between throughput logs")
+    
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument("--language", choices=["uk", "de"], help="Only regenerate reports in this language")
+    source.add_argument("--limit", type=int, default=0, help="Maximum number of reports")
+    source.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. http://127.0.0.1:8800/v1")
+    source.add_argument("--api-key", help="API key (defaults to OPENAI_API_KEY)")
+    
+    run_parser = subparsers.add_parser("run", parents=[common, source], help="Regenerate through the API")
+    run_parser.add_argument("--workers", type=int, default=4, help="Concurrent API calls")
+    run_parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only regenerate the reports that failed in the checkpoint, in any language",
+    )
+    
+    export_parser = subparsers.add_parser("export", parents=[common, source], help="Write a Batch API input file")
+    export_parser.add_argument("--output", type=Path, required=True)
+    
+    ingest_parser = subparsers.add_parser("ingest", parents=[common], help="Store a Batch API output file")
+    ingest_parser.add_argument("--input", type=Path, required=True)
+    
+    args = parser.parse_args(argv)
+    if args.checkpoint is None:
+        args.checkpoint = Path(f"regenerate_{args.mode}.checkpoint.json")
+    return args
+
+
+async def main(argv=None) -> None:
+    """Run the selected regeneration mode."""
+    args = parse_args(argv)
+    await init_db()
+    try:
+        if args.mode == "run":
+            await run_pool(args)
+        elif args.mode == "export":
+            await run_export(args)
+        else:
+            await run_ingest(args)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Regeneration interrupted; run again with --resume to continue")
+        sys.exit(1)
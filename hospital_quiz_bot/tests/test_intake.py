@@ -0,0 +1,138 @@
+"""
+Tests for the bulk intake of the Hospital Quiz Bot.
+Rows are checked as the quiz would check their answers, only the questions the quiz would ask are required,
+and the reports go through the shared report queue.
+"""
+
+import asyncio
+from typing import Dict, List, Tuple
+
+import pytest
+
+from hospital_quiz_bot.app.services import intake_service
+from hospital_quiz_bot.app.services.intake_service import IntakeExam, IntakeService, read_table
+from hospital_quiz_bot.app.services.quiz_service import QuizCatalog, get_catalog
+from hospital_quiz_bot.app.services.report_scheduler import ReportScheduler
+
+
+def answer_row(catalog: QuizCatalog, choice: int = 0) -> Dict[str, str]:
+    """Answer the questions the quiz asks when every choice question gets the option at an index."""
+    row: Dict[str, str] = {}
+    index = 0
+    while index is not None:
+        question = catalog.questions[index]
+        options = question.get("options")
+        row[question["id"]] = options[min(choice, len(options) - 1)] if options else "0"
+        index = catalog.get_next_index(index, row)
+    return row
+
+
+def find_skipped(catalog: QuizCatalog) -> Tuple[Dict[str, str], str]:
+    """Find answers that skip a question, with the id of a skipped question."""
+    for choice in range(3):
+        row = answer_row(catalog, choice)
+        skipped = [question["id"] for question in catalog.questions if question["id"] not in row]
+        if skipped:
+            return row, skipped[0]
+    pytest.skip("the quiz has no conditional questions")
+
+
+def test_complete_row_is_valid():
+    catalog = get_catalog("uk")
+    row = {"exam_id": "A-1", **answer_row(catalog)}
+    
+    result = IntakeService(None).validate([row])
+    
+    exam = result.exams[0]
+    assert exam.status == "pending"
+    assert exam.error is None
+    assert exam.exam_id == "A-1"
+    assert exam.quiz_version == catalog.version
+    assert exam.responses == answer_row(catalog)
+    assert result.unknown_columns == []
+
+
+def test_missing_and_invalid_answers_are_reported():
+    catalog = get_catalog("uk")
+    row = answer_row(catalog)
+    first, second = list(row)[:2]
+    row[first] = ""
+    row[second] = "maybe"
+    
+    exam = IntakeService(None).validate([row]).exams[0]
+    
+    assert exam.status == "invalid"
+    assert f"{first}: missing" in exam.error
+    assert f"{second}: invalid answer 'maybe'" in exam.error
+
+
+def test_skipped_questions_are_not_required():
+    catalog = get_catalog("uk")
+    row, skipped = find_skipped(catalog)
+    
+    exam = IntakeService(None).validate([row]).exams[0]
+    assert exam.status == "pending"
+    
+    # An answer to a skipped question is ignored rather than saved
+    exam = IntakeService(None).validate([{**row, skipped: "answer"}]).exams[0]
+    assert exam.status == "pending"
+    assert skipped not in exam.responses
+
+
+def test_rows_are_read_in_their_own_language():
+    rows = [
+        {"language": "DE", **answer_row(get_catalog("de"))},
+        {"language": "xx", **answer_row(get_catalog("uk"))},
+        {},
+        answer_row(get_catalog("de")),
+    ]
+    
+    exams = IntakeService(None).validate(rows, language="de").exams
+    
+    # Empty rows are dropped but keep their place in the row numbers
+    assert [exam.row for exam in exams] == [2, 3, 5]
+    assert [exam.language for exam in exams] == ["de", "xx", "de"]
+    assert [exam.status for exam in exams] == ["pending", "invalid", "pending"]
+    assert exams[1].error == "unsupported language 'xx'"
+
+
+def test_unknown_columns_are_listed():
+    row = {**answer_row(get_catalog("uk")), "comment": "", "Doctor": "Ivanenko"}
+    
+    result = IntakeService(None).validate([row])
+    
+    assert result.unknown_columns == ["Doctor", "comment"]
+
+
+@pytest.mark.parametrize("delimiter", [",", ";", "\t"])
+def test_csv_delimiters_are_detected(delimiter):
+    content = "\ufeffexam_id{0}can_walk\nA-1{0}Так\n".format(delimiter).encode("utf-8")
+    
+    assert read_table("exams.csv", content) == [{"exam_id": "A-1", "can_walk": "Так"}]
+
+
+@pytest.mark.asyncio
+async def test_reports_go_through_the_report_queue(monkeypatch):
+    scheduler = ReportScheduler(max_concurrent=1, max_queue_size=1)
+    monkeypatch.setattr(intake_service, "report_scheduler", scheduler)
+    monkeypatch.setattr(intake_service, "QUEUE_RETRY_DELAY", 0.001)
+    owners: List[int] = []
+    progress: List[Tuple[int, int]] = []
+    
+    class Service(IntakeService):
+        async def _generate_report(self, exam: IntakeExam) -> None:
+            owners.extend(job.user_id for job, _ in scheduler._running.values())
+            await asyncio.sleep(0)
+            exam.status = "generated"
+    
+    async def on_progress(done: int, total: int) -> None:
+        progress.append((done, total))
+    
+    exams = [IntakeExam(row=row, exam_id=str(row), language="uk", session_id=f"s{row}") for row in range(2, 12)]
+    # More workers than the queue has room for, so some submissions wait for the queue to drain
+    await Service(None, workers=4).generate(exams, on_progress)
+    await scheduler.stop()
+    
+    assert all(exam.status == "generated" for exam in exams)
+    assert set(owners) == {intake_service.INTAKE_OWNER}
+    assert progress[-1] == (10, 10)
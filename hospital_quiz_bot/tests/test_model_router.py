@@ -0,0 +1,96 @@
+"""
+Tests for the model router of the Hospital Quiz Bot.
+Calls go to the preferred route that meets its limits, to the least bad route when none does,
+and only open breakers make the router give up.
+"""
+
+import time
+
+from hospital_quiz_bot.app.services.model_router import ModelRouter, RouteState
+from hospital_quiz_bot.config.settings import ModelRoute
+
+MIN_SAMPLES = 4
+
+
+def make_router() -> ModelRouter:
+    """Build a router with a primary and a fallback route, both with a latency SLO of one second."""
+    return ModelRouter(
+        [
+            ModelRoute(name="primary", model="gpt-4o-mini", latency_slo_ms=1000, max_error_rate=0.5),
+            ModelRoute(name="fallback", model="local", latency_slo_ms=1000, max_error_rate=0.5),
+        ],
+        window=60,
+        min_samples=MIN_SAMPLES,
+    )
+
+
+def add_samples(route: RouteState, latency_ms: float, failures: int = 0) -> None:
+    """Add a window of calls to a route without touching its breaker."""
+    now = time.monotonic()
+    for index in range(MIN_SAMPLES):
+        route.samples.append((now, latency_ms, index >= failures))
+
+
+def open_breaker(route: RouteState) -> None:
+    """Fail calls on a route until its breaker opens."""
+    for _ in range(route.breaker.failure_threshold):
+        route.breaker.record_failure()
+
+
+def test_healthy_primary_is_preferred():
+    router = make_router()
+    add_samples(router.primary, latency_ms=200)
+    
+    decision = router.choose()
+    
+    assert decision.route is router.primary
+    assert decision.reason == "preferred"
+
+
+def test_slow_primary_falls_back():
+    router = make_router()
+    add_samples(router.primary, latency_ms=5000)
+    
+    decision = router.choose()
+    
+    assert decision.route is router.routes[1]
+    assert decision.reason == "primary_latency"
+
+
+def test_least_bad_route_is_used_when_none_meets_its_limits():
+    router = make_router()
+    primary, fallback = router.routes
+    add_samples(primary, latency_ms=3000, failures=3)
+    add_samples(fallback, latency_ms=5000)
+    
+    decision = router.choose()
+    
+    # A low error rate counts before a low latency
+    assert decision.route is fallback
+    assert decision.reason == "least_bad"
+
+
+def test_least_bad_skips_routes_with_open_breakers():
+    router = make_router()
+    primary, fallback = router.routes
+    add_samples(primary, latency_ms=5000)
+    open_breaker(fallback)
+    
+    decision = router.choose()
+    
+    assert decision.route is primary
+    assert decision.reason == "least_bad"
+
+
+def test_router_is_unavailable_only_when_every_breaker_rejects():
+    router = make_router()
+    primary, fallback = router.routes
+    add_samples(primary, latency_ms=5000, failures=4)
+    assert not router.is_unavailable()
+    
+    open_breaker(primary)
+    assert not router.is_unavailable()
+    
+    open_breaker(fallback)
+    assert router.is_unavailable()
+    assert router.choose() is None
@@ -0,0 +1,75 @@
+"""
+Tests for the quiz catalogs of the Hospital Quiz Bot.
+Concurrent sessions in different languages must only ever see the questions of their own language.
+"""
+
+import asyncio
+import random
+from typing import List
+
+import pytest
+
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, get_catalog
+
+SESSIONS = 200
+
+
+async def run_session(language: str, seed: int) -> List[str]:
+    """Walk through a quiz like a user of a language, yielding to the other sessions between steps.
+    
+    Returns the mismatches found: questions or answer checks that did not belong to the session language.
+    """
+    rng = random.Random(seed)
+    expected = get_catalog(language)
+    mismatches = []
+    for index in range(expected.get_total_questions()):
+        # Handlers look the catalog up again on every update
+        catalog = get_catalog(language)
+        question = catalog.get_question_by_index(index)
+        await asyncio.sleep(0)
+        
+        if catalog.language != language or question is not expected.questions[index]:
+            mismatches.append(f"{language} session got question {question['id']} of {catalog.language}")
+        answer = rng.choice(question["options"]) if question.get("options") else "0/120"
+        await asyncio.sleep(0)
+        
+        if not get_catalog(language).is_valid_answer(question["id"], answer):
+            mismatches.append(f"{language} session rejected its own answer '{answer}' to {question['id']}")
+        if catalog.format_question_text(question) != expected.format_question_text(expected.questions[index]):
+            mismatches.append(f"{language} session got the text of another language for {question['id']}")
+    return mismatches
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_see_only_their_language():
+    languages = list(QUIZ_FILES)
+    assert len(languages) > 1
+    
+    results = await asyncio.gather(*(
+        run_session(languages[number % len(languages)], number) for number in range(SESSIONS)
+    ))
+    
+    assert [mismatch for result in results for mismatch in result] == []
+
+
+def test_catalogs_differ_by_language():
+    catalogs = {language: get_catalog(language) for language in QUIZ_FILES}
+    
+    for language, catalog in catalogs.items():
+        assert catalog.language == language
+        assert catalog.questions
+    texts = {language: catalog.questions[0]["text"] for language, catalog in catalogs.items()}
+    assert len(set(texts.values())) == len(texts)
+
+
+def test_catalog_questions_are_read_only():
+    question = get_catalog(next(iter(QUIZ_FILES))).questions[0]
+    
+    with pytest.raises(TypeError):
+        question["text"] = "changed"
+    with pytest.raises(AttributeError):
+        question["options"].append("changed")
+
+
+def test_unsupported_language_gets_default_catalog():
+    assert get_catalog("xx") is get_catalog("uk")
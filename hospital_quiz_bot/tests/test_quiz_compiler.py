@@ -0,0 +1,174 @@
+"""
+Tests for the quiz definition compiler of the Hospital Quiz Bot.
+Invalid quiz files are rejected with every problem found, languages must ask the same questions,
+and the show_if conditions compile into the table the quiz walks.
+"""
+
+import copy
+from typing import Any, Dict, List
+
+import pytest
+import yaml
+
+from hospital_quiz_bot.app.services.quiz_compiler import (
+    ARTIFACT_FORMAT,
+    QuizDefinitionError,
+    check_alignment,
+    compile_graph,
+    compile_quiz,
+    validate_questions,
+)
+
+
+def question(question_id: str, question_type: str = "single_choice", **fields: Any) -> Dict[str, Any]:
+    """Build a valid question, choice questions answered with yes or no."""
+    built = {
+        "id": question_id,
+        "text": f"{question_id}?",
+        "label": question_id,
+        "section": "examination",
+        "type": question_type,
+    }
+    if question_type in ("single_choice", "optional_text"):
+        built["options"] = ["Так", "Ні"]
+    if question_type == "optional_text":
+        built["follow_up_text"] = "Опишіть"
+    built.update(fields)
+    return built
+
+
+def make_questions() -> List[Dict[str, Any]]:
+    """Build a quiz with a question shown after one answer and two shown after another."""
+    return [
+        question("can_walk"),
+        question("walk_distance", show_if={"can_walk": "Так"}),
+        question("pain"),
+        question("pain_place", show_if={"pain": "Так"}),
+        question("pain_level", show_if={"pain": ["Так"]}),
+        question("notes", "text_input", placeholder="0/120"),
+    ]
+
+
+def translate(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Get the German version of questions, with the conditions naming the German options."""
+    translated = copy.deepcopy(questions)
+    for item in translated:
+        item["text"] = f"{item['id']} (de)?"
+        if "options" in item:
+            item["options"] = ["Ja", "Nein"]
+        if "follow_up_text" in item:
+            item["follow_up_text"] = "Beschreiben Sie"
+        for question_id, value in item.get("show_if", {}).items():
+            item["show_if"][question_id] = ["Ja"] if isinstance(value, list) else "Ja"
+    return translated
+
+
+def test_valid_questions_have_no_problems():
+    assert validate_questions("uk", {"questions": make_questions()}) == []
+
+
+@pytest.mark.parametrize("data, problem", [
+    (None, "non-empty 'questions' list"),
+    ({"questions": []}, "non-empty 'questions' list"),
+    ({"questions": [question("Can walk")]}, "lowercase letters"),
+    ({"questions": [question("pain"), question("pain")]}, "duplicate id"),
+    ({"questions": [question("pain", section="legs")]}, "section must be one of"),
+    ({"questions": [question("pain", "slider")]}, "type must be one of"),
+    ({"questions": [question("pain", options=["Так"])]}, "at least two options"),
+    ({"questions": [question("pain", options=["Так", "Так"])]}, "duplicate options"),
+    ({"questions": [question("pain", colour="red")]}, "unknown fields colour"),
+    ({"questions": [question("notes", "text_input", options=["a", "b"])]}, "has no options"),
+    ({"questions": [question("pain", placeholder="0")]}, "only text_input questions have a placeholder"),
+    ({"questions": [question("pain", "optional_text", follow_up_text=None)]}, "needs a follow_up_text"),
+])
+def test_invalid_questions_are_rejected(data, problem):
+    errors = validate_questions("uk", data)
+    
+    assert any(problem in error for error in errors), errors
+
+
+@pytest.mark.parametrize("show_if, problem", [
+    ("Так", "show_if must map question ids"),
+    ({"pain": "Так"}, "not an earlier question"),
+    ({"notes": "Так"}, "not a single_choice question"),
+    ({"can_walk": "Може"}, "does not have: Може"),
+    ({"can_walk": []}, "does not have: none"),
+])
+def test_invalid_conditions_are_rejected(show_if, problem):
+    questions = [
+        question("can_walk"),
+        question("notes", "text_input"),
+        question("walk_distance", show_if=show_if),
+        question("pain"),
+    ]
+    
+    errors = validate_questions("uk", {"questions": questions})
+    
+    assert len(errors) == 1
+    assert problem in errors[0]
+    assert "walk_distance" in errors[0]
+
+
+def test_aligned_languages_pass():
+    questions = make_questions()
+    
+    assert check_alignment({"uk": questions, "de": translate(questions)}, "uk") == []
+
+
+def test_misaligned_languages_are_reported():
+    questions = make_questions()
+    missing = translate(questions)[:-1]
+    reordered = translate(questions)
+    reordered[0], reordered[2] = reordered[2], reordered[0]
+    reshaped = translate(questions)
+    reshaped[2]["section"] = "conclusion"
+    recondition = translate(questions)
+    recondition[1]["show_if"] = {"can_walk": "Nein"}
+    
+    def problems(other: List[Dict[str, Any]]) -> List[str]:
+        return check_alignment({"uk": questions, "de": other}, "uk")
+    
+    assert problems(missing) == ["de: missing questions notes of uk"]
+    assert problems(reordered) == ["de: questions are not in the order of uk"]
+    assert problems(reshaped) == ["de: question pain has section conclusion, uk has examination"]
+    assert problems(recondition) == [
+        "de: question walk_distance has show_if on options {'can_walk': [1]}, uk has {'can_walk': [0]}"
+    ]
+
+
+def test_graph_lists_the_questions_that_can_follow_and_precede():
+    graph = compile_graph(make_questions())
+    
+    assert graph["conditions"] == [{}, {"can_walk": [0]}, {}, {"pain": [0]}, {"pain": [0]}, {}]
+    assert graph["next"] == [[1, 2], [2], [3, 4, 5], [4, 5], [5], []]
+    # The entry after the last question leads back from the end of the quiz
+    assert graph["previous"] == [[], [0], [1, 0], [2], [3, 2], [4, 3, 2], [5]]
+
+
+def test_compile_quiz_builds_the_artifact(tmp_path):
+    questions = make_questions()
+    files = {"uk": tmp_path / "uk.yaml", "de": tmp_path / "de.yaml"}
+    files["uk"].write_text(yaml.safe_dump({"questions": questions}, allow_unicode=True), encoding="utf-8")
+    files["de"].write_text(yaml.safe_dump({"questions": translate(questions)}, allow_unicode=True), encoding="utf-8")
+    
+    artifact = compile_quiz(files, "uk")
+    
+    assert artifact["format"] == ARTIFACT_FORMAT
+    assert set(artifact["languages"]) == {"uk", "de"}
+    assert artifact["graph"] == compile_graph(questions)
+    assert compile_quiz(files, "uk")["version"] == artifact["version"]
+
+
+def test_compile_quiz_collects_the_problems_of_every_file(tmp_path):
+    files = {"uk": tmp_path / "uk.yaml", "de": tmp_path / "de.yaml", "en": tmp_path / "en.yaml"}
+    files["uk"].write_text("questions: [unclosed", encoding="utf-8")
+    files["de"].write_text(yaml.safe_dump({"questions": [question("Pain")]}), encoding="utf-8")
+    
+    with pytest.raises(QuizDefinitionError) as raised:
+        compile_quiz(files, "uk")
+    
+    errors = raised.value.errors
+    assert len(errors) == 3
+    assert "invalid YAML" in errors[0]
+    assert "lowercase letters" in errors[1]
+    assert "file not found" in errors[2]
@@ -0,0 +1,119 @@
+"""
+Tests for walking the question graph of the Hospital Quiz Bot.
+Questions whose show_if condition does not hold are skipped going forward and back, and answers
+to questions that a changed answer now skips are dropped.
+"""
+
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from hospital_quiz_bot.app.services.quiz_service import QUIZ_FILES, QuizCatalog, get_catalog
+
+
+def question(question_id: str, **fields: Any) -> Dict[str, Any]:
+    """Build a yes or no question."""
+    return {
+        "id": question_id,
+        "text": f"{question_id}?",
+        "label": question_id,
+        "section": "examination",
+        "type": "single_choice",
+        "options": ["Так", "Ні"],
+        **fields,
+    }
+
+
+def make_catalog() -> QuizCatalog:
+    """Build a catalog with a question shown after one answer and two shown after another."""
+    questions: List[Dict[str, Any]] = [
+        question("can_walk"),
+        question("walk_distance", show_if={"can_walk": "Так"}),
+        question("pain"),
+        question("pain_place", show_if={"pain": "Так"}),
+        question("pain_level", show_if={"pain": "Так"}),
+        question("swelling"),
+    ]
+    return QuizCatalog.from_questions("uk", questions)
+
+
+def walk(catalog: QuizCatalog, responses: Dict[str, str]) -> List[str]:
+    """Get the ids of the questions asked, in order, for a set of answers."""
+    asked = []
+    index = 0
+    while index is not None:
+        asked.append(catalog.questions[index]["id"])
+        index = catalog.get_next_index(index, responses)
+    return asked
+
+
+def walk_back(catalog: QuizCatalog, responses: Dict[str, str]) -> List[str]:
+    """Get the ids of the questions the back button goes through from the end of the quiz."""
+    asked = []
+    index = catalog.get_previous_index(catalog.get_total_questions(), responses)
+    while index is not None:
+        asked.append(catalog.questions[index]["id"])
+        index = catalog.get_previous_index(index, responses)
+    return asked
+
+
+@pytest.mark.parametrize("responses, expected", [
+    (
+        {"can_walk": "Так", "pain": "Так"},
+        ["can_walk", "walk_distance", "pain", "pain_place", "pain_level", "swelling"],
+    ),
+    ({"can_walk": "Ні", "pain": "Так"}, ["can_walk", "pain", "pain_place", "pain_level", "swelling"]),
+    ({"can_walk": "Так", "pain": "Ні"}, ["can_walk", "walk_distance", "pain", "swelling"]),
+    ({"can_walk": "Ні", "pain": "Ні"}, ["can_walk", "pain", "swelling"]),
+])
+def test_skipped_questions_are_not_asked(responses, expected):
+    catalog = make_catalog()
+    
+    assert walk(catalog, responses) == expected
+    assert walk_back(catalog, responses) == expected[::-1]
+
+
+def test_unanswered_conditions_skip_their_questions():
+    catalog = make_catalog()
+    
+    assert catalog.get_next_index(0, {}) == 2
+    assert catalog.get_next_index(2, {"can_walk": "Так"}) == 5
+    assert catalog.get_next_index(5, {"pain": "Так"}) is None
+    assert catalog.get_previous_index(0, {}) is None
+
+
+def test_answers_to_skipped_questions_are_dropped():
+    catalog = make_catalog()
+    # The patient first said they can walk, then went back and changed the answer
+    responses = {
+        "swelling": "Ні",
+        "pain": "Ні",
+        "walk_distance": "Так",
+        "pain_place": "Так",
+        "can_walk": "Ні",
+    }
+    
+    asked = catalog.get_asked_responses(responses)
+    
+    assert list(asked.items()) == [("can_walk", "Ні"), ("pain", "Ні"), ("swelling", "Ні")]
+
+
+@pytest.mark.parametrize("language", list(QUIZ_FILES))
+def test_back_retraces_every_step_of_the_shipped_quiz(language):
+    catalog = get_catalog(language)
+    rng = random.Random(language)
+    
+    for _ in range(200):
+        responses: Dict[str, str] = {}
+        index = 0
+        while index is not None:
+            item = catalog.questions[index]
+            responses[item["id"]] = rng.choice(item["options"]) if item.get("options") else "0"
+            following = catalog.get_next_index(index, responses)
+            assert catalog.is_asked(index, responses)
+            assert catalog.get_previous_index(
+                following if following is not None else catalog.get_total_questions(), responses
+            ) == index
+            index = following
+        assert catalog.get_asked_responses(responses) == responses
@@ -0,0 +1,81 @@
+"""
+Tests for the report cache keys of the Hospital Quiz Bot.
+A cached report is only reused for the same answers written the same way: the key changes with the language,
+the quiz version and the patient data encoding, and answers with free text are not cached.
+"""
+
+import dataclasses
+from typing import Optional, Sequence
+
+import pytest
+
+from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.services import report_service
+from hospital_quiz_bot.app.services.quiz_service import get_catalog
+from hospital_quiz_bot.app.services.report_service import ReportService
+from hospital_quiz_bot.config.settings import settings
+
+RESPONSES = {"can_walk": "Так", "additional_info": "Ні"}
+
+
+class FingerprintService:
+    """Stands in for the OpenAI service, with a fingerprint made of the language and the prompts."""
+    
+    def get_fingerprint(self, language: str = "uk", prompts: Sequence[str] = ()) -> str:
+        return f"{language}:{','.join(prompts)}"
+
+
+@pytest.fixture(autouse=True)
+def cache_settings(monkeypatch):
+    monkeypatch.setattr(settings.report, "cache_enabled", True)
+    monkeypatch.setattr(settings.report, "cache_free_text", False)
+    monkeypatch.setattr(settings.report, "prompt_encoding", "full")
+    monkeypatch.setattr(settings.report, "sectioned", False)
+    monkeypatch.setattr(settings.report, "structured", False)
+
+
+def get_key(language: str = "uk", responses: Optional[dict] = None) -> Optional[str]:
+    """Get the cache key of a completed quiz response."""
+    quiz_response = QuizResponse(responses=responses or RESPONSES, language=language, is_complete=True)
+    return ReportService(None, language, openai_service=FingerprintService())._get_cache_key(quiz_response)
+
+
+def test_same_answers_get_the_same_key():
+    assert get_key() == get_key()
+    assert get_key() is not None
+
+
+def test_key_changes_with_the_language():
+    assert get_key("uk") != get_key("de")
+
+
+def test_key_changes_with_the_quiz_version(monkeypatch):
+    before = get_key()
+    monkeypatch.setattr(
+        report_service,
+        "get_catalog",
+        lambda language, version=None: dataclasses.replace(get_catalog(language, version), version="0123456789ab"),
+    )
+    
+    assert get_key() != before
+
+
+def test_key_changes_with_the_encoding(monkeypatch):
+    full = get_key()
+    monkeypatch.setattr(settings.report, "prompt_encoding", "compact")
+    
+    assert get_key() != full
+
+
+def test_free_text_answers_are_not_cached(monkeypatch):
+    free_text = {**RESPONSES, "additional_info": "Пацієнт скаржиться на біль уночі"}
+    assert get_key(responses=free_text) is None
+    
+    monkeypatch.setattr(settings.report, "cache_free_text", True)
+    assert get_key(responses=free_text) is not None
+
+
+def test_disabled_cache_has_no_keys(monkeypatch):
+    monkeypatch.setattr(settings.report, "cache_enabled", False)
+    
+    assert get_key() is None
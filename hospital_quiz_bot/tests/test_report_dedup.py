@@ -0,0 +1,142 @@
+"""
+Tests for the de-duplication of report generation in the Hospital Quiz Bot.
+Concurrent requests for one report run it once: within a process through SingleFlight, and across
+processes through the claim on the quiz response, which expires so a crashed process does not block it.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from hospital_quiz_bot.app.database.repository import QuizResponseRepository
+from hospital_quiz_bot.app.models.base import Base
+from hospital_quiz_bot.app.models.quiz_response import QuizResponse
+from hospital_quiz_bot.app.models.user import User
+from hospital_quiz_bot.app.services.single_flight import FlightAbortedError, SingleFlight
+
+CLAIM_TTL = 300
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_quiz_response(session: AsyncSession) -> int:
+    """Add a completed quiz response without a report, returning its id."""
+    user = User(telegram_id=1)
+    session.add(user)
+    await session.flush()
+    quiz_response = QuizResponse(user_id=user.id, session_id="session", responses={}, is_complete=True)
+    session.add(quiz_response)
+    await session.flush()
+    return quiz_response.id
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    flights = SingleFlight("test")
+    runs: List[str] = []
+    release = asyncio.Event()
+    
+    async def generate() -> str:
+        runs.append("run")
+        await release.wait()
+        return "report"
+    
+    callers = [asyncio.ensure_future(flights.run("session", generate)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flights.is_running("session")
+    release.set()
+    
+    assert await asyncio.gather(*callers) == ["report"] * 5
+    assert runs == ["run"]
+    assert not flights.is_running("session")
+
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_a_cancelled_run():
+    flights = SingleFlight("test")
+    runs: List[str] = []
+    
+    async def generate() -> str:
+        runs.append("run")
+        await asyncio.sleep(0.01 if len(runs) > 1 else 60)
+        return "report"
+    
+    first = asyncio.ensure_future(flights.run("session", generate))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(flights.run("session", generate))
+    await asyncio.sleep(0)
+    first.cancel()
+    
+    assert await second == "report"
+    assert runs == ["run", "run"]
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flights = SingleFlight("test")
+    
+    async def fail() -> str:
+        await asyncio.sleep(0)
+        raise ValueError("no report")
+    
+    results = await asyncio.gather(*(flights.run("session", fail) for _ in range(3)), return_exceptions=True)
+    
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not any(isinstance(result, FlightAbortedError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_only_one_claim_wins_until_it_expires(session):
+    repository = QuizResponseRepository(session)
+    quiz_response_id = await add_quiz_response(session)
+    
+    assert await repository.claim_report(quiz_response_id, CLAIM_TTL)
+    assert not await repository.claim_report(quiz_response_id, CLAIM_TTL)
+    
+    # A claim older than the TTL belongs to a process that is gone
+    await session.execute(
+        update(QuizResponse).where(QuizResponse.id == quiz_response_id).values(
+            report_started_at=datetime.utcnow() - timedelta(seconds=CLAIM_TTL + 1)
+        )
+    )
+    assert await repository.claim_report(quiz_response_id, CLAIM_TTL)
+    
+    quiz_response = await repository.get_by_id(quiz_response_id)
+    await session.refresh(quiz_response)
+    assert quiz_response.report_attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_released_claim_can_be_taken_again(session):
+    repository = QuizResponseRepository(session)
+    quiz_response_id = await add_quiz_response(session)
+    
+    assert await repository.claim_report(quiz_response_id, CLAIM_TTL)
+    await repository.release_report_claim(quiz_response_id)
+    assert await repository.claim_report(quiz_response_id, CLAIM_TTL)
+
+
+@pytest.mark.asyncio
+async def test_reports_that_exist_are_not_claimed(session):
+    repository = QuizResponseRepository(session)
+    quiz_response_id = await add_quiz_response(session)
+    await session.execute(
+        update(QuizResponse).where(QuizResponse.id == quiz_response_id).values(report="Report")
+    )
+    
+    assert not await repository.claim_report(quiz_response_id, CLAIM_TTL)
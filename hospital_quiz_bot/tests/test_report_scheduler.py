@@ -0,0 +1,109 @@
+"""
+Tests for the report scheduler of the Hospital Quiz Bot.
+Jobs of different users take turns, a full queue rejects new jobs, and cancelled or slow jobs free their slot.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from hospital_quiz_bot.app.services.report_scheduler import QueueFullError, ReportScheduler
+
+
+def record(order: List[str], name: str):
+    """Get a job factory that appends its name to the order it ran in."""
+    async def job() -> None:
+        order.append(name)
+        await asyncio.sleep(0)
+    return job
+
+
+async def wait_idle(scheduler: ReportScheduler) -> None:
+    """Wait until the scheduler has no queued or running jobs."""
+    while scheduler.queue_depth or scheduler.in_flight:
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_users_take_turns():
+    scheduler = ReportScheduler(max_concurrent=1, max_queue_size=10)
+    order: List[str] = []
+    blocker = asyncio.Event()
+    
+    # Hold the only worker so every job below is queued before any of them runs
+    scheduler.submit(0, "blocker", blocker.wait)
+    await asyncio.sleep(0)
+    for number in range(3):
+        scheduler.submit(1, f"a{number}", record(order, f"a{number}"))
+    scheduler.submit(2, "b0", record(order, "b0"))
+    scheduler.submit(3, "c0", record(order, "c0"))
+    blocker.set()
+    await wait_idle(scheduler)
+    await scheduler.stop()
+    
+    assert order == ["a0", "b0", "c0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_jobs():
+    scheduler = ReportScheduler(max_concurrent=1, max_queue_size=2)
+    blocker = asyncio.Event()
+    
+    scheduler.submit(1, "running", blocker.wait)
+    await asyncio.sleep(0)
+    assert scheduler.submit(2, "first", blocker.wait) == 0
+    assert scheduler.submit(3, "second", blocker.wait) == 1
+    
+    with pytest.raises(QueueFullError):
+        scheduler.submit(4, "third", blocker.wait)
+    assert not scheduler.is_active("third")
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_cancel_frees_the_slot():
+    scheduler = ReportScheduler(max_concurrent=1, max_queue_size=10)
+    order: List[str] = []
+    started = asyncio.Event()
+    
+    async def slow() -> None:
+        started.set()
+        await asyncio.sleep(60)
+        order.append("slow")
+    
+    scheduler.submit(1, "slow", slow)
+    scheduler.submit(2, "queued", record(order, "queued"))
+    scheduler.submit(3, "next", record(order, "next"))
+    await started.wait()
+    
+    assert scheduler.cancel("queued", "user")
+    assert scheduler.cancel("slow", "user")
+    assert not scheduler.cancel("missing", "user")
+    await wait_idle(scheduler)
+    await scheduler.stop()
+    
+    assert order == ["next"]
+    assert not scheduler.is_active("slow")
+
+
+@pytest.mark.asyncio
+async def test_job_timeout_aborts_the_job():
+    scheduler = ReportScheduler(max_concurrent=1, max_queue_size=10, job_timeout=0.05)
+    timed_out = asyncio.Event()
+    finished: List[str] = []
+    
+    async def hang() -> None:
+        await asyncio.sleep(60)
+        finished.append("hang")
+    
+    async def on_timeout() -> None:
+        timed_out.set()
+    
+    scheduler.submit(1, "hang", hang, on_timeout)
+    await asyncio.wait_for(timed_out.wait(), timeout=5)
+    await wait_idle(scheduler)
+    await scheduler.stop()
+    
+    assert finished == []
+    assert scheduler.in_flight == 0
@@ -0,0 +1,126 @@
+"""
+Tests for the resilience utilities of the Hospital Quiz Bot.
+The circuit breaker opens after repeated failures and lets one probe through after the cool-down,
+retries wait at least as long as the server asks, and hedges are only fired through a closed breaker.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from hospital_quiz_bot.app.services import resilience
+from hospital_quiz_bot.app.services.resilience import CircuitBreaker, backoff_delay, get_retry_after, hedged
+
+
+class Clock:
+    """A monotonic clock the tests move by hand."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def rate_limit_error(headers: dict) -> Exception:
+    """Build an API error carrying a 429 response with the given headers."""
+    error = Exception("Rate limit reached")
+    error.response = SimpleNamespace(status_code=429, headers=headers)
+    return error
+
+
+def test_breaker_opens_after_the_threshold(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    assert breaker.is_rejecting()
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_the_cool_down(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    
+    clock.now += 30
+    assert not breaker.is_rejecting()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    assert breaker.is_rejecting()
+    
+    # A probe that ended without an outcome hands the probe to the next call
+    breaker.release_probe()
+    assert breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_backoff_delay_honors_retry_after(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    
+    assert backoff_delay(0, base=1, maximum=10) == 1
+    assert backoff_delay(3, base=1, maximum=10) == 8
+    assert backoff_delay(5, base=1, maximum=10) == 10
+    assert backoff_delay(0, base=1, maximum=10, retry_after=20) == 20
+    assert backoff_delay(3, base=1, maximum=10, retry_after=2) == 8
+
+
+def test_retry_after_headers_are_read():
+    assert get_retry_after(rate_limit_error({"retry-after": "7"})) == 7
+    assert get_retry_after(rate_limit_error({"retry-after-ms": "1500", "retry-after": "7"})) == 1.5
+    assert get_retry_after(rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert get_retry_after(rate_limit_error({})) is None
+    assert get_retry_after(ValueError("no response")) is None
+
+
+@pytest.mark.asyncio
+async def test_hedge_is_fired_only_through_a_closed_breaker():
+    calls: List[int] = []
+    
+    async def call() -> int:
+        calls.append(len(calls))
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return len(calls)
+    
+    closed = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    assert await hedged(call, 0.01, "test", closed) == 2
+    assert calls == [0, 1]
+    
+    calls.clear()
+    opened = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    opened.record_failure()
+    assert await hedged(call, 0.01, "test", opened) == 1
+    assert calls == [0]